@@ -0,0 +1,76 @@
+# alias.py
+# tabel alias kode -> id barang. Penjualan menyimpan id barang yang tidak pernah berubah; kode hanya
+# label yang bisa berganti (reindex, edit kategori). Setiap kali kode berganti pemilik barunya dicatat,
+# jadi kode lama (label tercetak, nota lama) tetap bisa di-resolve O(1) ke barang terakhir yang memakainya.
+# Entri disimpan di storage sebagai koleksi 'alias': {'id', 'kode', 'barang_id'}.
+from model import Alias
+
+
+class TabelAlias:
+    def __init__(self):
+        self.entri = []       # [Alias, ...] urut id (disimpan ke storage / snapshot)
+        self._kode = {}       # barang id -> kode saat ini (hanya barang yang masih ada)
+        self._dihapus = {}    # barang id -> kode terakhir barang yang sudah dihapus
+        self._terakhir = {}   # kode -> barang id pemilik terakhir (walau kodenya sudah pindah / barang dihapus)
+
+    @classmethod
+    def dari_entri(cls, entri, ada):
+        # entri: dict dari storage; ada: id barang yang masih ada (alias barang terhapus tidak aktif lagi)
+        t = cls()
+        for e in sorted(entri, key=lambda e: e['id']):
+            t._pasang(Alias(e['id'], e['kode'].upper(), e['barang_id']))  # field 'versi' entri lama diabaikan
+        for barang_id in [i for i in t._kode if i not in ada]:
+            t.lepas(barang_id)
+        return t
+
+    def _pasang(self, e):
+        self.entri.append(e)
+        self._kode[e.barang_id] = e.kode
+        self._terakhir[e.kode] = e.barang_id
+
+    # ----------------------------
+    # tulis
+    # ----------------------------
+    def catat(self, pasangan):
+        # pasangan: [(barang_id, kode baru), ...] dari satu perubahan; return entri Alias baru untuk disimpan
+        pasangan = [(barang_id, kode.upper()) for barang_id, kode in pasangan
+                    if self._kode.get(barang_id) != kode.upper()]
+        if not pasangan:
+            return []
+        n = self.entri[-1].id if self.entri else 0
+        for i, (barang_id, kode) in enumerate(pasangan, start=n + 1):
+            self._pasang(Alias(i, kode, barang_id))
+        return self.entri[-len(pasangan):]
+
+    def potong(self, n, ada):
+        # rollback transaksi admin: buang entri setelah n pertama, map dibangun ulang di objek yang sama
+        # (resolver ledger / arsip menunjuk method objek ini)
+        if len(self.entri) <= n:
+            return
+        entri = self.entri[:n]
+        self.__init__()
+        for e in entri:
+            self._pasang(e)
+        for barang_id in [i for i in self._kode if i not in ada]:
+            self.lepas(barang_id)
+
+    def lepas(self, barang_id):
+        # barang dihapus: tidak punya kode aktif lagi, riwayatnya tetap bisa di-resolve
+        kode = self._kode.pop(barang_id, None)
+        if kode is not None:
+            self._dihapus[barang_id] = kode
+
+    # ----------------------------
+    # baca
+    # ----------------------------
+    def kode(self, barang_id):
+        # kode aktif barang, None kalau barang sudah dihapus / tidak dikenal
+        return self._kode.get(barang_id)
+
+    def kode_terakhir(self, barang_id):
+        # kode aktif, atau kode terakhir sebelum barang dihapus
+        return self._kode.get(barang_id) or self._dihapus.get(barang_id)
+
+    def resolve(self, kode):
+        # pemilik saat ini, atau barang terakhir yang pernah memakai kode itu
+        return self._terakhir.get(kode.upper())
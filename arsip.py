@@ -0,0 +1,216 @@
+# arsip.py
+# arsip penjualan periode tertutup (per bulan): file biner lebar-tetap dibaca lewat mmap.
+# Hanya periode berjalan yang tinggal di LedgerPenjualan (RAM); bulan yang sudah lewat dipindah ke sini.
+#
+# penjualan_YYYY-MM.bin  : header + kolom kontigu (little-endian)
+#     id q | item i | jumlah i | harga q | total q | ts q      (n baris, urut ts)
+# penjualan_YYYY-MM.items.json : [[kode, nama, barang_id], ...] tabel intern untuk kolom item
+# Arsip tidak pernah ditulis ulang karena reindex: baris menunjuk id barang, kode tampil di-resolve lewat
+# kode_kini (tabel alias) seperti LedgerPenjualan.
+#
+# Kolom dibuka sebagai memoryview di atas mmap (zero-copy), jadi bisa dipakai langsung oleh
+# agregasi rekap (rekap_paralel.agregasi_partisi) seperti kolom ledger biasa.
+import json
+import mmap
+import os
+import struct
+from array import array
+from bisect import bisect_left
+from datetime import datetime
+
+from model import Penjualan
+
+MAGIC = b"KPBXARS1"
+HEADER = struct.Struct("<8sIIqq")  # magic, jumlah baris, jumlah item, ts min, ts max
+KOLOM = (('id', 'q'), ('item', 'i'), ('jumlah', 'i'), ('harga', 'q'), ('total', 'q'), ('ts', 'q'))
+_PREFIX = "penjualan_"
+
+
+def periode_ts(ts):
+    return datetime.fromtimestamp(ts).strftime("%Y-%m")
+
+
+def _fsync_dir(direktori):
+    try:
+        fd = os.open(direktori, os.O_RDONLY)
+    except OSError:
+        return  # Windows: direktori tidak bisa dibuka, rename sudah cukup
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _tulis_atomik(path, data):
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class ArsipPeriode:
+    def __init__(self, path):
+        self.path = path
+        self.path_items = path[:-4] + ".items.json"
+        self.periode = os.path.basename(path)[len(_PREFIX):-4]
+        with open(self.path_items, "r", encoding="utf-8") as f:
+            items = json.load(f)
+        self._kode = [it[0] for it in items]
+        self._nama = [it[1] for it in items]
+        self._barang = [it[2] if len(it) > 2 else None for it in items]  # arsip lama: belum ada id barang
+        self.kode_kini = None
+        self._f = open(path, "rb")
+        self._mm = mmap.mmap(self._f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.n, _, self.ts_min, self.ts_max = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"bukan file arsip penjualan: {path}")
+        self._buf = memoryview(self._mm)
+        off = HEADER.size
+        for nama, tc in KOLOM:
+            size = struct.calcsize(tc)
+            setattr(self, nama, self._buf[off:off + self.n * size].cast(tc))
+            off += self.n * size
+
+    @staticmethod
+    def tulis(path, rows):
+        # rows: [(id, kode, nama, jumlah, harga, total, ts, barang_id)] -> file arsip (diurutkan ts, lalu id)
+        rows = sorted(rows, key=lambda r: (r[6], r[0]))
+        items, idx = [], {}
+        kolom = {nama: array(tc) for nama, tc in KOLOM}
+        for id, kode, nama, jumlah, harga, total, ts, barang_id in rows:
+            key = (barang_id, kode, nama)
+            if key not in idx:
+                idx[key] = len(items)
+                items.append([kode, nama, barang_id])
+            for col, v in (('id', id), ('item', idx[key]), ('jumlah', jumlah), ('harga', harga),
+                           ('total', total), ('ts', ts)):
+                kolom[col].append(v)
+        header = HEADER.pack(MAGIC, len(rows), len(items), rows[0][6] if rows else 0, rows[-1][6] if rows else 0)
+        # tabel item dulu: file .bin baru hanya terlihat kalau tabelnya sudah ada
+        _tulis_atomik(path[:-4] + ".items.json", json.dumps(items, ensure_ascii=False).encode("utf-8"))
+        _tulis_atomik(path, header + b"".join(kolom[nama].tobytes() for nama, _ in KOLOM))
+        _fsync_dir(os.path.dirname(path) or ".")
+
+    def tutup(self):
+        for nama, _ in KOLOM:
+            getattr(self, nama).release()
+        self._buf.release()
+        self._mm.close()
+        self._f.close()
+
+    # ----------------------------
+    # baca (interface sama dengan LedgerPenjualan)
+    # ----------------------------
+    def __len__(self):
+        return self.n
+
+    def tabel_kunci(self):
+        return [k if b is None else b for b, k in zip(self._barang, self._kode)]
+
+    def kode(self, it):
+        b = self._barang[it]
+        kode = self.kode_kini(b) if b is not None and self.kode_kini else None
+        return kode or self._kode[it]
+
+    def row(self, i):
+        it = self.item[i]
+        return Penjualan(self.id[i], self.kode(it), self._nama[it], self.jumlah[i],
+                         self.harga[i], self.total[i], self.ts[i], self._barang[it])
+
+    def rows_tuple(self):
+        # bentuk mentah (kode saat terjual) untuk ditulis ulang ke arsip
+        for i in range(self.n):
+            it = self.item[i]
+            yield (self.id[i], self._kode[it], self._nama[it], self.jumlah[i], self.harga[i], self.total[i],
+                   self.ts[i], self._barang[it])
+
+    def rentang_waktu(self, t0=None, t1=None):
+        lo = 0 if t0 is None else bisect_left(self.ts, t0)
+        hi = self.n if t1 is None else bisect_left(self.ts, t1)
+        return lo, hi
+
+    def rows_waktu(self, t0=None, t1=None):
+        lo, hi = self.rentang_waktu(t0, t1)
+        for i in range(lo, hi):
+            yield self.row(i)
+
+    def total_waktu(self, t0=None, t1=None):
+        lo, hi = self.rentang_waktu(t0, t1)
+        return sum(self.total[lo:hi])
+
+    def lengkapi_barang(self, resolve):
+        # migrasi arsip lama tanpa id barang: cukup tulis ulang tabel item kecilnya, kolom biner tidak berubah
+        berubah = False
+        for i, (b, kode) in enumerate(zip(self._barang, self._kode)):
+            if b is None and resolve(kode) is not None:
+                self._barang[i] = resolve(kode)
+                berubah = True
+        if berubah:
+            _tulis_atomik(self.path_items, json.dumps([list(x) for x in zip(self._kode, self._nama, self._barang)],
+                                                      ensure_ascii=False).encode("utf-8"))
+
+
+class ArsipPenjualan:
+    # kumpulan arsip per bulan dalam satu direktori, urut periode
+    def __init__(self, direktori):
+        self.direktori = direktori
+        self.kode_kini = None
+        os.makedirs(direktori, exist_ok=True)
+        self.segmen = []
+        for nama in sorted(os.listdir(direktori)):
+            if nama.startswith(_PREFIX) and nama.endswith(".bin"):
+                self.segmen.append(ArsipPeriode(os.path.join(direktori, nama)))
+
+    def __len__(self):
+        return sum(len(s) for s in self.segmen)
+
+    def _path(self, periode):
+        return os.path.join(self.direktori, f"{_PREFIX}{periode}.bin")
+
+    def periode(self, periode):
+        return next((s for s in self.segmen if s.periode == periode), None)
+
+    def tambah(self, periode, rows):
+        # rows: [(id, kode, nama, jumlah, harga, total, ts, barang_id)]; digabung dengan arsip periode yang sudah ada
+        # (id yang sudah terarsip dilewati, jadi aman diulang setelah crash di tengah rotasi)
+        lama = self.periode(periode)
+        if lama:
+            ids = set(lama.id)
+            rows = list(lama.rows_tuple()) + [r for r in rows if r[0] not in ids]
+            self.segmen.remove(lama)
+            lama.tutup()
+        ArsipPeriode.tulis(self._path(periode), rows)
+        seg = ArsipPeriode(self._path(periode))
+        seg.kode_kini = self.kode_kini
+        self.segmen.append(seg)
+        self.segmen.sort(key=lambda s: s.periode)
+
+    def max_id(self):
+        return max((max(s.id) for s in self.segmen if len(s)), default=0)
+
+    def segmen_waktu(self, t0=None, t1=None):
+        # segmen yang beririsan dengan [t0, t1)
+        return [s for s in self.segmen if len(s) and (t0 is None or s.ts_max >= t0) and (t1 is None or s.ts_min < t1)]
+
+    def rows_waktu(self, t0=None, t1=None):
+        for s in self.segmen_waktu(t0, t1):
+            yield from s.rows_waktu(t0, t1)
+
+    def total_waktu(self, t0=None, t1=None):
+        return sum(s.total_waktu(t0, t1) for s in self.segmen_waktu(t0, t1))
+
+    def pasang_resolver(self, kode_kini):
+        self.kode_kini = kode_kini
+        for s in self.segmen:
+            s.kode_kini = kode_kini
+
+    def lengkapi_barang(self, resolve):
+        for s in self.segmen:
+            s.lengkapi_barang(resolve)
+
+    def tutup(self):
+        for s in self.segmen:
+            s.tutup()
+        self.segmen = []
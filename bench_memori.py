@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# bench_memori.py
+# perbandingan memori 1 juta baris penjualan: dict (bentuk lama), record __slots__ (model.py), ledger kolumnar
+#   python bench_memori.py
+#   python bench_memori.py --rows 200000
+import argparse
+import gc
+import time
+import tracemalloc
+
+from ledger import LedgerPenjualan
+from model import Penjualan, dari_epoch
+
+N_BARANG = 5000
+
+
+def _sumber(n):
+    # (id, kode, nama, jumlah, harga, total, ts, barang_id); kode & nama diambil dari katalog kecil seperti data asli
+    katalog = [(f"MA{i:03d}", f"Barang {i}", 1000 + i) for i in range(1, N_BARANG + 1)]
+    t0 = 1_700_000_000
+    for i in range(n):
+        kode, nama, harga = katalog[i % N_BARANG]
+        jumlah = 1 + i % 3
+        yield i + 1, kode, nama, jumlah, harga, jumlah * harga, t0 + i, i % N_BARANG + 1
+
+
+def buat_dict(n):
+    return [{'id': id, 'kode_barang': kode, 'nama_barang': nama, 'jumlah': j, 'harga_satuan': h,
+             'total_harga': t, 'created_at': dari_epoch(ts), 'barang_id': b} for id, kode, nama, j, h, t, ts, b in _sumber(n)]
+
+
+def buat_record(n):
+    return [Penjualan(*row) for row in _sumber(n)]
+
+
+def buat_ledger(n):
+    led = LedgerPenjualan()
+    for row in _sumber(n):
+        led.tambah(*row)
+    return led
+
+
+def ukur(fungsi, n):
+    gc.collect()
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    data = fungsi(n)
+    durasi = time.perf_counter() - t0
+    dipakai = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del data
+    return dipakai, durasi
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark memori baris penjualan")
+    ap.add_argument("--rows", type=int, default=1_000_000)
+    args = ap.parse_args()
+
+    print(f"{args.rows:,} baris penjualan ({N_BARANG:,} barang berbeda)")
+    print(f"{'Bentuk':<22} {'Memori':>10} {'Byte/baris':>11} {'Waktu isi':>10}")
+    for label, fungsi in (("dict", buat_dict), ("record __slots__", buat_record), ("ledger kolumnar", buat_ledger)):
+        dipakai, durasi = ukur(fungsi, args.rows)
+        print(f"{label:<22} {dipakai / 2**20:>8.1f}MB {dipakai / args.rows:>11.0f} {durasi:>9.2f}s")
+
+
+if __name__ == "__main__":
+    main()
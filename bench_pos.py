@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+# bench_pos.py
+# benchmark & load generator SimplePOS: katalog sintetis + riwayat penjualan, operasi diukur lewat menu asli
+# (input() diganti skrip, layar dibuang), hasil throughput & latensi p50/p99 ditulis ke JSON.
+#   python bench_pos.py
+#   python bench_pos.py --barang 1000,100000,1000000 --penjualan 1000000 --output hasil_bench.json
+#   python bench_pos.py --storage wal      -> termasuk fsync WAL (direktori sementara)
+#   python bench_pos.py --banding hasil_rilis_lalu.json   -> exit 1 kalau ada operasi melambat
+import argparse
+import builtins
+import json
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import program_utama
+from ledger import LedgerPenjualan
+from penyimpanan import buat_storage
+from program_utama import SimplePOS
+
+HARI_RIWAYAT = 120  # riwayat penjualan disebar ke N hari terakhir
+
+
+# ----------------------------
+# harness non-interaktif
+# ----------------------------
+class _Buang:
+    # stdout pengganti: output menu tetap dirender (bagian dari biaya) tapi tidak ditampilkan
+    def write(self, s):
+        return len(s)
+
+    def flush(self):
+        pass
+
+
+class Harness:
+    # jalankan method menu SimplePOS dengan jawaban input() yang sudah ditentukan
+    def __init__(self):
+        self._jawaban = iter(())
+
+    def _input(self, prompt=""):
+        try:
+            return next(self._jawaban)
+        except StopIteration:
+            raise RuntimeError(f"skrip input habis di prompt: {prompt!r}")
+
+    def jalankan(self, fungsi, jawaban, *args):
+        self._jawaban = iter(jawaban)
+        input_asli, stdout_asli = builtins.input, sys.stdout
+        builtins.input, sys.stdout = self._input, _Buang()
+        try:
+            t0 = time.perf_counter()
+            fungsi(*args)
+            durasi = time.perf_counter() - t0
+        finally:
+            builtins.input, sys.stdout = input_asli, stdout_asli
+        sisa = list(self._jawaban)
+        if sisa:
+            raise RuntimeError(f"skrip input tidak terpakai: {sisa!r}")
+        return durasi
+
+
+# ----------------------------
+# data sintetis
+# ----------------------------
+def kode_kategori(i):
+    return "K" + chr(65 + i // 26 % 26) + chr(65 + i % 26)
+
+
+def buat_pos(n_barang, n_kategori, n_penjualan, storage=None, seed=1):
+    program_utama.DBLESS_SAMPLE = False
+    rnd = random.Random(seed)
+    pos = SimplePOS(storage)
+    kats = [pos._buat_kategori(f"Kategori {i}", kode_kategori(i), sync=False) for i in range(n_kategori)]
+    per_kat = [[] for _ in kats]
+    for i in range(n_barang):
+        per_kat[i % n_kategori].append((f"Barang {i}", 10 ** 9, rnd.randint(1, 500) * 500))
+    for kat, rows in zip(kats, per_kat):
+        if rows:
+            pos._buat_barang_batch(kat, rows, sync=False)
+    pos._commit()
+    # riwayat langsung ke ledger (urut waktu) supaya cepat; rollup dibangun ulang sekali
+    barang = pos.barang
+    akhir = int(time.time())
+    awal = akhir - HARI_RIWAYAT * 86400
+    langkah = (akhir - awal) / max(n_penjualan, 1)
+    led = LedgerPenjualan()
+    for i in range(n_penjualan):
+        b = barang[rnd.randrange(len(barang))]
+        j = rnd.randint(1, 3)
+        led.tambah(i + 1, b.kode, b.nama, j, b.harga, j * b.harga, awal + int(i * langkah), b.id)
+    led.kode_kini = pos.alias.kode
+    pos.penjualan = led
+    pos._sync_counters()
+    pos._rebuild_rollup()
+    return pos
+
+
+# ----------------------------
+# skenario (tiap fungsi return list durasi detik per operasi)
+# ----------------------------
+def persentil(data, q):
+    data = sorted(data)
+    return data[min(len(data) - 1, int(q * len(data)))]
+
+
+def uji_lookup(pos, h, ulang, rnd):
+    kodes = [b.kode for b in pos.barang]
+    hasil = []
+    for _ in range(ulang):
+        kode = kodes[rnd.randrange(len(kodes))]
+        t0 = time.perf_counter()
+        pos._barang_by_kode(kode)
+        hasil.append(time.perf_counter() - t0)
+    return hasil
+
+
+def uji_tambah_barang(pos, h, ulang, rnd):
+    kats = pos.kategori
+    return [h.jalankan(pos.tambah_barang, [f"Bench {i}", "100", "5000", ""], kats[rnd.randrange(len(kats))].id)
+            for i in range(ulang)]
+
+
+def uji_hapus_barang(pos, h, ulang, rnd):
+    # hapus barang acak di kategori acak; barang setelahnya di kategori itu ikut di-reindex
+    hasil = []
+    for _ in range(ulang):
+        kat = pos.kategori[rnd.randrange(len(pos.kategori))]
+        items = pos._barang_in_kategori(kat.id)
+        if not items:
+            continue
+        kode = items[rnd.randrange(len(items))].kode
+        hasil.append(h.jalankan(pos.hapus_barang, [kode, "y", ""], kat.id))
+    return hasil
+
+
+def uji_edit_kategori(pos, h, ulang, rnd):
+    # ganti kode kategori bolak-balik (Kxx <-> Xxx), semua kode barang di kategori itu ditulis ulang
+    hasil = []
+    for _ in range(ulang):
+        kat = pos.kategori[rnd.randrange(len(pos.kategori))]
+        baru = ("X" if kat.kode.startswith("K") else "K") + kat.kode[1:]
+        hasil.append(h.jalankan(pos.edit_kategori, [str(kat.id), "", baru, ""]))
+    return hasil
+
+
+def uji_cetak_nota(pos, h, ulang, rnd):
+    hasil = []
+    for _ in range(ulang):
+        for _ in range(rnd.randint(1, 5)):
+            pos._tambah_ke_keranjang(pos.keranjang, pos.barang[rnd.randrange(len(pos.barang))], rnd.randint(1, 3))
+        hasil.append(h.jalankan(pos.cetak_nota, [""]))
+    return hasil
+
+
+def _uji_rekap(jawaban):
+    def uji(pos, h, ulang, rnd):
+        return [h.jalankan(pos.rekap_penjualan, jawaban + ["0"]) for _ in range(ulang)]
+    return uji
+
+
+# (nama, fungsi, pembagi ulang) -- operasi berat diulang lebih sedikit
+SKENARIO = [
+    ("lookup_kode", uji_lookup, 1),
+    ("tambah_barang", uji_tambah_barang, 1),
+    ("hapus_barang_reindex", uji_hapus_barang, 4),
+    ("edit_kategori_rekode", uji_edit_kategori, 4),
+    ("cetak_nota", uji_cetak_nota, 1),
+    ("rekap_harian", _uji_rekap(["1", "n", ""]), 10),
+    ("rekap_mingguan", _uji_rekap(["2", "n", ""]), 10),
+    ("rekap_bulanan", _uji_rekap(["3", ""]), 20),
+    ("rekap_semua", _uji_rekap(["4", ""]), 50),
+]
+
+
+def jalankan(n_barang, args):
+    tmp = tempfile.mkdtemp(prefix="bench_pos_") if args.storage else None
+    try:
+        t0 = time.perf_counter()
+        pos = buat_pos(n_barang, args.kategori, args.penjualan, buat_storage(args.storage, tmp) if tmp else None)
+        siap = time.perf_counter() - t0
+        h = Harness()
+        rnd = random.Random(2)
+        hasil = []
+        for nama, fungsi, pembagi in SKENARIO:
+            if args.hanya and nama not in args.hanya:
+                continue
+            durasi = fungsi(pos, h, max(1, args.ulang // pembagi), rnd)
+            total = sum(durasi)
+            hasil.append({
+                'barang': n_barang,
+                'penjualan': args.penjualan,
+                'operasi': nama,
+                'n': len(durasi),
+                'ops_per_detik': round(len(durasi) / total, 1) if total else None,
+                'p50_ms': round(persentil(durasi, 0.50) * 1000, 4),
+                'p99_ms': round(persentil(durasi, 0.99) * 1000, 4),
+            })
+        if pos.storage:
+            pos.storage.close()
+        return siap, hasil
+    finally:
+        if tmp:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+
+def banding(lama_path, hasil, toleransi):
+    # bandingkan p50 dengan hasil sebelumnya (barang & operasi sama); return daftar regresi
+    with open(lama_path, encoding="utf-8") as f:
+        lama = {(r['barang'], r['operasi']): r for r in json.load(f)['hasil']}
+    regresi = []
+    for r in hasil:
+        dulu = lama.get((r['barang'], r['operasi']))
+        if dulu and dulu['p50_ms'] and r['p50_ms'] > dulu['p50_ms'] * (1 + toleransi):
+            regresi.append((r['barang'], r['operasi'], dulu['p50_ms'], r['p50_ms']))
+    return regresi
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark operasi inti SimplePOS")
+    ap.add_argument("--barang", default="1000,100000", help="ukuran katalog, pisah koma (mis. 1000,100000,1000000)")
+    ap.add_argument("--kategori", type=int, default=50)
+    ap.add_argument("--penjualan", type=int, default=100000, help="baris riwayat penjualan sintetis")
+    ap.add_argument("--ulang", type=int, default=200, help="pengulangan per operasi (operasi berat dibagi)")
+    ap.add_argument("--storage", choices=["wal", "sqlite"], default=None)
+    ap.add_argument("--hanya", nargs="*", help="jalankan operasi tertentu saja")
+    ap.add_argument("--output", default="hasil_bench.json")
+    ap.add_argument("--banding", help="file hasil sebelumnya untuk cek regresi p50")
+    ap.add_argument("--toleransi", type=float, default=0.25, help="batas melambat sebelum dianggap regresi (0.25 = 25%%)")
+    args = ap.parse_args()
+
+    laporan = {
+        'waktu': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'parameter': vars(args),
+        'hasil': [],
+    }
+    print(f"{'Barang':>9} {'Operasi':<22} {'n':>5} {'Ops/detik':>12} {'p50 ms':>10} {'p99 ms':>10}")
+    for n_barang in [int(x) for x in args.barang.split(",")]:
+        siap, hasil = jalankan(n_barang, args)
+        laporan['hasil'] += hasil
+        for r in hasil:
+            print(f"{r['barang']:>9,} {r['operasi']:<22} {r['n']:>5} {r['ops_per_detik'] or 0:>12,.1f} "
+                  f"{r['p50_ms']:>10.3f} {r['p99_ms']:>10.3f}")
+        print(f"{'':>9} (data sintetis siap dalam {siap:.1f}s)")
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(laporan, f, indent=2)
+    print(f"\nHasil tersimpan di {args.output}")
+    if args.banding:
+        regresi = banding(args.banding, laporan['hasil'], args.toleransi)
+        for n_barang, operasi, dulu, kini in regresi:
+            print(f"REGRESI {operasi} ({n_barang:,} barang): p50 {dulu:.3f} ms -> {kini:.3f} ms")
+        if regresi:
+            sys.exit(1)
+        print("Tidak ada regresi.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+# cabang.py
+# mode multi-toko: tiap outlet menjalankan SimplePOS sendiri (KOPBOX_TOKO=<kode> -> data_kopbox/toko/<kode>),
+# agregator di kantor pusat menggabungkan penjualan semua toko secara incremental.
+#   python cabang.py sinkron                   -> satu kali sinkron
+#   python cabang.py sinkron --pantau 30       -> sinkron di background tiap 30 detik
+#   python cabang.py rekap --dim bulan         -> rekap gabungan (hari|minggu|bulan|toko|kode|kategori)
+#
+# Tiap toko dibaca di proses terpisah (ProcessPoolExecutor): hanya penjualan dengan id > watermark toko itu
+# yang dibaca & diagregasi (lihat penyimpanan.baca_penjualan_baru), hasil parsial digabung di proses utama.
+# Kode barang dibuat per toko, jadi MA001 di toko A belum tentu barang yang sama dengan MA001 di toko B:
+# barang digabung per (kode, nama); kode yang dipakai untuk nama berbeda di toko lain ditandai bentrok.
+# Riwayat yang dihapus / di-rekode di toko setelah tersinkron tidak mengubah agregat (pusat menyimpan
+# penjualan sebagaimana terjadi).
+import argparse
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from ledger import RollupPenjualan
+from model import ke_epoch
+from penyimpanan import baca_penjualan_baru
+
+DIMENSI = ('hari', 'minggu', 'bulan', 'toko', 'kode', 'kategori')
+FILE_AGREGAT = "agregat.json"
+
+_PREFIX = re.compile(r"[A-Za-z]+")
+
+
+def daftar_toko(root):
+    if not os.path.isdir(root):
+        return []
+    return sorted(d for d in os.listdir(root) if os.path.isdir(os.path.join(root, d)))
+
+
+def _tambah(data, dim, key, omzet, qty, trx):
+    b = data[dim].get(key)
+    if b is None:
+        b = data[dim][key] = [0, 0, 0]
+    b[0] += omzet
+    b[1] += qty
+    b[2] += trx
+
+
+def jenis_storage(direktori):
+    # backend toko dikenali dari file yang ada, jadi toko boleh memakai backend berbeda
+    return "sqlite" if os.path.exists(os.path.join(direktori, "kopbox.db")) else "wal"
+
+
+def agregasi_toko(toko, direktori, wm):
+    # dijalankan di proses worker: baca delta satu toko lalu agregasi parsial
+    # return (toko, parsial {dim: {key: [omzet, qty, trx]}}, watermark baru, jumlah baris baru)
+    rows, wm = baca_penjualan_baru(jenis_storage(direktori), direktori, wm)
+    parsial = {d: {} for d in DIMENSI}
+    kunci = {}  # cache kunci waktu per detik (nota yang sama punya created_at sama)
+    for r in rows:
+        t = r['created_at']
+        if t not in kunci:
+            kunci[t] = RollupPenjualan.kunci_waktu(ke_epoch(t))
+        hari, minggu, bulan = kunci[t]
+        kode = r['kode_barang']
+        m = _PREFIX.match(kode)
+        omzet, qty = r['total_harga'], r['jumlah']
+        for dim, key in (('hari', hari), ('minggu', minggu), ('bulan', bulan), ('toko', toko),
+                         ('kode', (kode, r['nama_barang'])), ('kategori', m.group(0) if m else kode)):
+            _tambah(parsial, dim, key, omzet, qty, 1)
+    return toko, parsial, wm, len(rows)
+
+
+class Agregator:
+    def __init__(self, root, workers=None):
+        self.root = root
+        self.workers = workers
+        self.path = os.path.join(root, FILE_AGREGAT)
+        self.watermark = {}                      # toko -> watermark baca_penjualan_baru
+        self.data = {d: {} for d in DIMENSI}     # dim -> key -> [omzet, qty, trx]
+        self.muat()
+
+    # ----------------------------
+    # state agregator (disimpan supaya restart tetap incremental)
+    # ----------------------------
+    def muat(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+        self.watermark = state['watermark']
+        for dim, key, omzet, qty, trx in state['data']:
+            self.data[dim][tuple(key) if dim == 'kode' else key] = [omzet, qty, trx]
+
+    def simpan(self):
+        rows = [[dim, list(key) if dim == 'kode' else key] + v
+                for dim, isi in self.data.items() for key, v in isi.items()]
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({'watermark': self.watermark, 'data': rows}, f, separators=(",", ":"))
+        os.replace(tmp, self.path)
+
+    # ----------------------------
+    # sinkron
+    # ----------------------------
+    def sinkron(self):
+        # return {toko: jumlah penjualan baru}
+        tokos = daftar_toko(self.root)
+        if not tokos:
+            return {}
+        tugas = [(t, os.path.join(self.root, t), self.watermark.get(t)) for t in tokos]
+        with ProcessPoolExecutor(max_workers=min(len(tugas), self.workers or os.cpu_count() or 1)) as ex:
+            hasil = list(ex.map(agregasi_toko, *zip(*tugas)))
+        baru = {}
+        for toko, parsial, wm, n in hasil:
+            for dim, isi in parsial.items():
+                for key, (omzet, qty, trx) in isi.items():
+                    _tambah(self.data, dim, key, omzet, qty, trx)
+            self.watermark[toko] = wm
+            baru[toko] = n
+        if any(baru.values()) or not os.path.exists(self.path):
+            self.simpan()
+        return baru
+
+    def pantau(self, interval, cetak=print):
+        while True:
+            t0 = time.perf_counter()
+            baru = self.sinkron()
+            cetak(f"[{time.strftime('%H:%M:%S')}] {sum(baru.values()):,} penjualan baru dari "
+                  f"{len(baru)} toko ({time.perf_counter() - t0:.2f}s)")
+            time.sleep(interval)
+
+    # ----------------------------
+    # rekap gabungan
+    # ----------------------------
+    def bentrok(self):
+        # {kode: [nama, ...]} untuk kode yang dipakai barang berbeda di toko berbeda
+        nama = {}
+        for kode, n in self.data['kode']:
+            nama.setdefault(kode, []).append(n)
+        return {k: sorted(v) for k, v in nama.items() if len(v) > 1}
+
+    def rekap(self, dim):
+        # [(label, omzet, qty, trx)] urut key
+        if dim != 'kode':
+            return [(str(k), v[0], v[1], v[2]) for k, v in sorted(self.data[dim].items(), key=lambda x: str(x[0]))]
+        bentrok = self.bentrok()
+        return [(f"{kode} - {nama}" + (" [kode bentrok]" if kode in bentrok else ""), v[0], v[1], v[2])
+                for (kode, nama), v in sorted(self.data['kode'].items())]
+
+
+def main():
+    from program_utama import STORAGE_PATH
+
+    ap = argparse.ArgumentParser(description="Agregator penjualan multi-toko KOPBOX POS")
+    ap.add_argument("aksi", choices=["sinkron", "rekap"])
+    ap.add_argument("--root", default=os.path.join(STORAGE_PATH, "toko"))
+    ap.add_argument("--pantau", type=float, help="sinkron berulang tiap N detik")
+    ap.add_argument("--workers", type=int)
+    ap.add_argument("--dim", choices=DIMENSI, default="toko")
+    ap.add_argument("--top", type=int, help="hanya N baris omzet terbesar")
+    args = ap.parse_args()
+
+    agg = Agregator(args.root, args.workers)
+    if args.aksi == "sinkron":
+        if args.pantau:
+            try:
+                agg.pantau(args.pantau)
+            except KeyboardInterrupt:
+                pass
+        else:
+            baru = agg.sinkron()
+            for toko, n in baru.items():
+                print(f"{toko:<12} {n:>10,} penjualan baru")
+        return
+    rows = agg.rekap(args.dim)
+    if args.top:
+        rows = sorted(rows, key=lambda r: -r[1])[:args.top]
+    print(f"{'Key':<50} {'Trx':>8} {'Qty':>10} {'Omzet':>16}")
+    print("-" * 88)
+    for label, omzet, qty, trx in rows:
+        print(f"{label[:50]:<50} {trx:>8,} {qty:>10,} Rp {omzet:>13,}")
+    print("-" * 88)
+    print(f"{'TOTAL':<50} {'':>8} {'':>10} Rp {sum(r[1] for r in rows):>13,}")
+    bentrok = agg.bentrok()
+    if bentrok and args.dim == 'kode':
+        print(f"\n{len(bentrok)} kode dipakai barang berbeda antar toko (dipisah per nama).")
+
+
+if __name__ == "__main__":
+    main()
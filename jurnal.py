@@ -0,0 +1,86 @@
+# jurnal.py
+# transaksi & jurnal undo/redo untuk operasi admin katalog (kategori / barang).
+# Satu transaksi = satu operasi admin (hapus kategori, edit kategori, reindex, impor, ...):
+#   - perubahan di memori dicatat sebagai diff ringkas per record, bukan salinan data:
+#       ('ubah', koleksi, id, ((field, lama, baru), ...))
+#       ('tambah' | 'hapus', koleksi, nilai slot record, ekstra)
+#       ('seq_local', kategori_id, lama, baru)
+#   - op storage ditahan dulu, saat commit ditulis sebagai satu op 'batch' (satu baris WAL / satu commit
+#     SQLite): crash di tengah operasi tidak pernah meninggalkan katalog setengah jadi
+#   - rollback = terapkan kebalikan diff di memori; op storage yang ditahan dibuang
+# Jurnal menyimpan diff transaksi yang sudah commit (dibatasi jumlah transaksi & total diff).
+from collections import deque
+
+KOLEKSI_KATALOG = ('kategori', 'barang', 'alias')
+
+
+class Transaksi:
+    __slots__ = ('judul', 'diff', 'log', 'n_alias')
+
+    def __init__(self, judul, n_alias=0):
+        self.judul = judul    # None = tidak masuk jurnal (undo / redo / rollback)
+        self.diff = []
+        self.log = []         # op storage yang ditahan sampai commit
+        self.n_alias = n_alias  # jumlah entri alias saat transaksi dimulai (rollback memotong ke sini)
+
+    @staticmethod
+    def op_katalog(op):
+        # op storage yang ikut transaksi; penjualan & delta stok dari kasir langsung ke storage
+        return op[0] == 'kode' or (op[0] in ('put', 'del') and op[1] in KOLEKSI_KATALOG)
+
+
+def kebalikan(diff):
+    # diff yang membatalkan diff (urutan dibalik)
+    hasil = []
+    for d in reversed(diff):
+        jenis = d[0]
+        if jenis == 'ubah':
+            hasil.append(('ubah', d[1], d[2], tuple((f, baru, lama) for f, lama, baru in d[3])))
+        elif jenis == 'tambah':
+            hasil.append(('hapus',) + d[1:])
+        elif jenis == 'hapus':
+            hasil.append(('tambah',) + d[1:])
+        elif jenis == 'seq_local':
+            hasil.append(('seq_local', d[1], d[3], d[2]))
+    return hasil
+
+
+class Jurnal:
+    def __init__(self, maks=50, maks_diff=200_000):
+        self.maks_diff = maks_diff    # transaksi lebih besar dari ini tetap atomik, tapi tidak bisa di-undo
+        self.undo = deque(maxlen=maks)   # (judul, diff) terbaru di kanan
+        self.redo = []
+        self._n_diff = 0
+
+    def _buang_lama(self):
+        while self.undo and (self._n_diff > self.maks_diff or len(self.undo) == self.undo.maxlen):
+            self._n_diff -= len(self.undo.popleft()[1])
+
+    def catat(self, tx):
+        # transaksi baru yang sudah commit; redo tidak berlaku lagi
+        if tx.judul is None or not tx.diff:
+            return
+        self.redo.clear()
+        if len(tx.diff) > self.maks_diff:
+            self.undo.clear()
+            self._n_diff = 0
+            return
+        self._n_diff += len(tx.diff)
+        self._buang_lama()
+        self.undo.append((tx.judul, tuple(tx.diff)))
+
+    def ambil_undo(self):
+        judul, diff = self.undo.pop()
+        self._n_diff -= len(diff)
+        return judul, diff
+
+    def selesai_undo(self, entri):
+        self.redo.append(entri)
+
+    def ambil_redo(self):
+        return self.redo.pop()
+
+    def selesai_redo(self, entri):
+        self._n_diff += len(entri[1])
+        self._buang_lama()
+        self.undo.append(entri)
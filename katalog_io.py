@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+# katalog_io.py
+# impor / ekspor katalog barang, penjualan & rekap secara streaming (CSV, JSONL, atau laporan teks .txt;
+# akhiran .gz = gzip). Ekspor berupa pipeline generator: baris sumber -> potongan CHUNK baris ->
+# formatter -> satu write besar per potongan, jadi memori tetap walau riwayatnya jutaan baris.
+#   python katalog_io.py impor katalog_supplier.csv [--error error.csv]
+#   python katalog_io.py ekspor-barang barang.jsonl
+#   python katalog_io.py ekspor-penjualan penjualan.csv.gz [--dari 2024-01-01 --sampai 2024-01-31]
+#   python katalog_io.py ekspor-ringkasan ringkasan.txt --dim bulan
+import csv
+import gzip
+import io
+import itertools
+import json
+import os
+import re
+
+KOLOM_BARANG = ('kode', 'kategori', 'nama', 'stok', 'harga', 'created_at')
+KOLOM_PENJUALAN = ('id', 'barang_id', 'kode_barang', 'nama_barang', 'jumlah', 'harga_satuan', 'total_harga', 'created_at')
+KOLOM_RINGKASAN = ('key', 'label', 'trx', 'qty', 'omzet')
+CHUNK = 1000          # baris yang diproses (dan dialokasikan id-nya) per batch / ditulis per write saat ekspor
+BUFFER = 1 << 20      # buffer tulis ekspor
+GZIP_LEVEL = 6        # cukup rapat, tetap cepat untuk ekspor akhir bulan
+
+# laporan teks: lebar kolom & kolom uang (ditulis dengan pemisah ribuan)
+LEBAR = {'id': 8, 'barang_id': 9, 'kode_barang': 10, 'nama_barang': 30, 'jumlah': 6, 'harga_satuan': 12,
+         'total_harga': 14, 'created_at': 19, 'key': 12, 'label': 40, 'trx': 8, 'qty': 10, 'omzet': 16,
+         'kode': 8, 'kategori': 8, 'nama': 30, 'stok': 8, 'harga': 12}
+UANG = ('harga_satuan', 'total_harga', 'omzet', 'harga')
+
+_PREFIX = re.compile(r"[A-Za-z]+")
+
+
+def _gz(path):
+    return path.lower().endswith(".gz")
+
+
+def _format(path):
+    p = path.lower()[:-3] if _gz(path) else path.lower()
+    if p.endswith((".jsonl", ".ndjson")):
+        return "jsonl"
+    return "txt" if p.endswith(".txt") else "csv"
+
+
+def _buka(path, mode, gz):
+    if gz:
+        return gzip.open(path, mode + "t", compresslevel=GZIP_LEVEL, encoding="utf-8", newline="")
+    return open(path, mode, encoding="utf-8", newline="", buffering=BUFFER)
+
+
+def baca_rows(path):
+    # generator (no_baris, dict) -- file dibaca baris per baris, tidak dimuat semua
+    with _buka(path, "r", _gz(path)) as f:
+        if _format(path) == "jsonl":
+            for no, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    yield no, json.loads(line)
+                except ValueError:
+                    yield no, None
+        else:
+            for no, row in enumerate(csv.DictReader(f), start=2):
+                yield no, row
+
+
+def _validasi(row, kategori_by_kode):
+    # return (kategori, nama, stok, harga) atau raise ValueError(pesan)
+    if not isinstance(row, dict):
+        raise ValueError("Baris bukan JSON object yang valid.")
+    kode = str(row.get('kode') or '').strip()
+    m = _PREFIX.match(kode)
+    if not m:
+        raise ValueError("Kode kosong / tidak diawali huruf.")
+    kat = kategori_by_kode.get(m.group(0).upper())
+    if not kat:
+        raise ValueError(f"Kategori dengan kode {m.group(0).upper()} tidak ditemukan.")
+    nama = str(row.get('nama') or '').strip()
+    if not nama:
+        raise ValueError("Nama tidak boleh kosong.")
+    try:
+        stok = int(str(row.get('stok')).strip())
+        harga = int(str(row.get('harga')).strip())
+    except ValueError:
+        raise ValueError("Stok/Harga harus angka.")
+    if stok < 0 or harga < 0:
+        raise ValueError("Stok/Harga tidak boleh negatif.")
+    return kat, nama, stok, harga
+
+
+def _simpan_chunk(pos, chunk, judul):
+    # chunk: [(kat, nama, stok, harga)]; dikelompokkan per kategori supaya id dialokasikan per blok.
+    # Satu transaksi per chunk (pos.transaksi): op & diff yang ditahan di memori maksimal CHUNK baris
+    per_kat = {}
+    for kat, nama, stok, harga in chunk:
+        per_kat.setdefault(kat['id'], (kat, []))[1].append((nama, stok, harga))
+    with pos.transaksi(judul, sync=False):
+        for kat, rows in per_kat.values():
+            pos._buat_barang_batch(kat, rows, sync=False)
+
+
+def impor_barang(pos, path, on_error=None):
+    # kolom: kode (cukup prefix kategori, mis. MA atau MA123), nama, stok, harga.
+    # kode barang baru tetap dialokasikan POS; baris yang tidak valid dilewati & dilaporkan lewat on_error(no, pesan).
+    # Tiap CHUNK baris di-commit sebagai satu transaksi: crash / error di tengah file hanya membatalkan chunk
+    # yang sedang berjalan (chunk sebelumnya tetap masuk), dan undo membatalkan impor per chunk
+    kategori_by_kode = {k['kode'].upper(): k for k in pos.kategori}
+    nama = os.path.basename(path)
+    ok = gagal = 0
+    chunk = []
+    for no, row in baca_rows(path):
+        try:
+            chunk.append(_validasi(row, kategori_by_kode))
+        except ValueError as e:
+            gagal += 1
+            if on_error:
+                on_error(no, str(e))
+            continue
+        if len(chunk) >= CHUNK:
+            _simpan_chunk(pos, chunk, f"impor {nama} ({ok + 1}-{ok + len(chunk)})")
+            ok += len(chunk)
+            chunk = []
+    if chunk:
+        _simpan_chunk(pos, chunk, f"impor {nama} ({ok + 1}-{ok + len(chunk)})")
+        ok += len(chunk)
+    pos._commit()
+    return {'ok': ok, 'gagal': gagal}
+
+
+# ----------------------------
+# pipeline ekspor: potongan -> formatter -> write
+# ----------------------------
+def _potong(rows, n=CHUNK):
+    # generator list maksimal n baris; yang ada di memori cuma satu potongan
+    it = iter(rows)
+    while True:
+        buf = list(itertools.islice(it, n))
+        if not buf:
+            return
+        yield buf
+
+
+def _csv(kolom, rows):
+    # formatter: generator (teks, jumlah baris)
+    s = io.StringIO()
+    w = csv.writer(s)
+    w.writerow(kolom)
+    yield s.getvalue(), 0
+    for buf in _potong(rows):
+        s.seek(0)
+        s.truncate()
+        w.writerows([r[k] for k in kolom] for r in buf)
+        yield s.getvalue(), len(buf)
+
+
+def _jsonl(kolom, rows):
+    dumps = json.dumps
+    for buf in _potong(rows):
+        yield "".join(dumps({k: r[k] for k in kolom}, ensure_ascii=False) + "\n" for r in buf), len(buf)
+
+
+def _sel(kolom, nilai, lebar):
+    if isinstance(nilai, int):
+        return f"{nilai:>{lebar},}" if kolom in UANG else f"{nilai:>{lebar}}"
+    nilai = "" if nilai is None else str(nilai)
+    return f"{nilai[:lebar]:<{lebar}}"
+
+
+def _teks(kolom, rows, judul, kolom_total):
+    # laporan teks lebar tetap (seperti layar rekap); total dijumlah sambil jalan, bukan dari list penuh
+    lebar = [LEBAR.get(k, 12) for k in kolom]
+    garis = "-" * (sum(lebar) + len(lebar) - 1)
+    kepala = " ".join(f"{k[:w]:>{w}}" if k in UANG or k in ('jumlah', 'trx', 'qty', 'stok') else f"{k[:w]:<{w}}"
+                      for k, w in zip(kolom, lebar))
+    yield f"{judul}\n{garis}\n{kepala}\n{garis}\n", 0
+    total = 0
+    for buf in _potong(rows):
+        out = []
+        for r in buf:
+            out.append(" ".join(_sel(k, r[k], w) for k, w in zip(kolom, lebar)))
+            if kolom_total:
+                total += r[kolom_total]
+        yield "\n".join(out) + "\n", len(buf)
+    yield garis + "\n" + (f"TOTAL: Rp {total:,}\n" if kolom_total else ""), 0
+
+
+def _tulis(path, kolom, rows, judul=None, kolom_total=None):
+    # ditulis ke <path>.tmp lalu di-rename: file yang diambil akunting tidak pernah setengah jadi
+    fmt = _format(path)
+    if fmt == "jsonl":
+        potongan = _jsonl(kolom, rows)
+    elif fmt == "txt":
+        potongan = _teks(kolom, rows, judul or os.path.basename(path), kolom_total)
+    else:
+        potongan = _csv(kolom, rows)
+    tmp = path + ".tmp"
+    n = 0
+    try:
+        with _buka(tmp, "w", _gz(path)) as f:
+            for teks, k in potongan:
+                f.write(teks)
+                n += k
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+    return n
+
+
+def ekspor_barang(pos, path):
+    def rows():
+        for kat in sorted(pos.kategori, key=lambda x: x['id']):
+            for b in pos._barang_in_kategori(kat['id']):
+                yield dict(b, kategori=kat['kode'])
+    return _tulis(path, KOLOM_BARANG, rows())
+
+
+def ekspor_penjualan(pos, path, t0=None, t1=None, judul="REKAP PENJUALAN"):
+    # rentang [t0, t1) epoch; arsip + ledger di-stream urut waktu
+    return _tulis(path, KOLOM_PENJUALAN, pos._riwayat_rows(t0, t1), judul, 'total_harga')
+
+
+def ekspor_ringkasan(pos, path, dim, judul=None):
+    # dim: hari / minggu / bulan / kode / kategori (rollup, O(jumlah bucket))
+    label = {'kode': pos._label_kode, 'kategori': pos._label_kategori}.get(dim, str)
+    rows = ({'key': pos.alias.kode_terakhir(k) if dim == 'kode' and isinstance(k, int) else k,
+             'label': label(k), 'trx': t, 'qty': q, 'omzet': o}
+            for k, o, q, t in pos.rollup.ringkas(dim))
+    return _tulis(path, KOLOM_RINGKASAN, rows, judul or f"RINGKASAN PENJUALAN PER {dim.upper()}", 'omzet')
+
+
+def main():
+    import argparse
+    from datetime import datetime, timedelta
+    from ledger import RollupPenjualan
+    from model import epoch_tanggal
+    from penyimpanan import buat_storage
+    from program_utama import STORAGE_BACKEND, SimplePOS, storage_path
+
+    ap = argparse.ArgumentParser(description="Impor/ekspor katalog & rekap KOPBOX POS (CSV/JSONL/TXT, .gz opsional)")
+    ap.add_argument("aksi", choices=["impor", "ekspor-barang", "ekspor-penjualan", "ekspor-ringkasan"])
+    ap.add_argument("file")
+    ap.add_argument("--error", help="tulis baris gagal ke file ini (default: tampil di layar)")
+    ap.add_argument("--dari", help="ekspor-penjualan: tanggal mulai YYYY-MM-DD")
+    ap.add_argument("--sampai", help="ekspor-penjualan: tanggal akhir YYYY-MM-DD (inklusif)")
+    ap.add_argument("--dim", choices=RollupPenjualan.DIMENSI, default="hari", help="ekspor-ringkasan: group by")
+    args = ap.parse_args()
+    try:
+        t0 = epoch_tanggal(datetime.strptime(args.dari, "%Y-%m-%d").date()) if args.dari else None
+        t1 = epoch_tanggal(datetime.strptime(args.sampai, "%Y-%m-%d").date() + timedelta(days=1)) if args.sampai else None
+    except ValueError:
+        ap.error("format tanggal harus YYYY-MM-DD")
+
+    pos = SimplePOS(buat_storage(STORAGE_BACKEND, storage_path()))
+    try:
+        if args.aksi == "impor":
+            ferr = open(args.error, "w", encoding="utf-8") if args.error else None
+            def on_error(no, pesan):
+                if ferr:
+                    ferr.write(f"{no},{pesan}\n")
+                else:
+                    print(f"baris {no}: {pesan}")
+            hasil = impor_barang(pos, args.file, on_error)
+            if ferr:
+                ferr.close()
+            print(f"Impor selesai: {hasil['ok']} barang masuk, {hasil['gagal']} baris gagal.")
+        elif args.aksi == "ekspor-barang":
+            print(f"{ekspor_barang(pos, args.file)} barang diekspor ke {args.file}.")
+        elif args.aksi == "ekspor-penjualan":
+            print(f"{ekspor_penjualan(pos, args.file, t0, t1)} baris penjualan diekspor ke {args.file}.")
+        else:
+            print(f"{ekspor_ringkasan(pos, args.file, args.dim)} baris ringkasan diekspor ke {args.file}.")
+    finally:
+        pos.tutup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,305 @@
+# ledger.py
+# ledger penjualan kolumnar: satu array bertipe per kolom, (id barang, kode, nama) di-intern.
+# Baris menunjuk id barang yang tidak pernah berubah; kode yang tersimpan adalah kode saat terjual,
+# kode yang tampil di-resolve lewat kode_kini (tabel alias) jadi reindex tidak menyentuh ledger.
+from array import array
+from bisect import bisect_left
+from datetime import datetime
+
+from model import Penjualan, ke_epoch
+
+try:
+    import numpy as np
+except ImportError:  # numpy opsional; tanpa numpy agregasi pakai array + sum bawaan
+    np = None
+
+def _rows_storage(n, id, item, jumlah, harga, total, ts, barang, kode, nama):
+    for i in range(n):
+        it = item[i]
+        yield Penjualan(id[i], kode[it], nama[it], jumlah[i], harga[i], total[i], ts[i], barang[it]).ke_dict()
+
+
+class LedgerPenjualan:
+    def __init__(self, rows=()):
+        self.id = array('q')
+        self.item = array('l')      # index ke tabel intern (id barang, kode, nama)
+        self.jumlah = array('l')
+        self.harga = array('q')     # harga satuan
+        self.total = array('q')
+        self.ts = array('q')        # epoch detik
+        self._barang = []           # id barang per item intern (None: data lama yang belum punya id)
+        self._kode = []
+        self._nama = []
+        self._item_idx = {}
+        self.kode_kini = None       # fungsi id barang -> kode aktif (None kalau barang sudah dihapus)
+        # time index: normalnya baris masuk urut waktu sehingga kolom ts bisa langsung di-bisect;
+        # kalau ada baris mundur (jam diubah / data impor) dibuat permutasi urut waktu secara lazy
+        self._acak = False
+        self._order = None
+        self._ts_urut = None
+        self.extend(rows)
+
+    # ----------------------------
+    # intern kode/nama barang
+    # ----------------------------
+    def _intern(self, barang_id, kode, nama):
+        key = (barang_id, kode, nama)
+        idx = self._item_idx.get(key)
+        if idx is None:
+            idx = len(self._kode)
+            self._item_idx[key] = idx
+            self._barang.append(barang_id)
+            self._kode.append(kode)
+            self._nama.append(nama)
+        return idx
+
+    def tabel_kunci(self):
+        # kunci barang per item intern: id barang, atau kode (string) untuk data lama tanpa id
+        return [k if b is None else b for b, k in zip(self._barang, self._kode)]
+
+    def lengkapi_barang(self, resolve):
+        # migrasi data lama: item tanpa id barang diisi resolve(kode); return baris yang berubah (untuk disimpan ulang)
+        ubah = set()
+        for idx, (b, kode) in enumerate(zip(self._barang, self._kode)):
+            if b is None:
+                baru = resolve(kode)
+                if baru is not None:
+                    self._barang[idx] = baru
+                    self._item_idx.setdefault((baru, kode, self._nama[idx]), idx)
+                    ubah.add(idx)
+        return [self.row(i) for i, it in enumerate(self.item) if it in ubah] if ubah else []
+
+    def __getstate__(self):
+        # resolver tidak ikut di-pickle (warm start), dipasang ulang oleh pemilik ledger
+        state = dict(self.__dict__)
+        state['kode_kini'] = None
+        return state
+
+    # ----------------------------
+    # tulis
+    # ----------------------------
+    def tambah(self, id, kode, nama, jumlah, harga, total, ts, barang_id=None):
+        if self.ts and ts < self.ts[-1]:
+            self._acak = True
+        if self._acak:
+            self._order = None
+        self.id.append(id)
+        self.item.append(self._intern(barang_id, kode, nama))
+        self.jumlah.append(jumlah)
+        self.harga.append(harga)
+        self.total.append(total)
+        self.ts.append(ts)
+
+    def append(self, rec, ts=None):
+        # rec: Penjualan atau dict penjualan (bentuk storage); ts bisa diberikan supaya created_at tidak di-parse ulang
+        if isinstance(rec, Penjualan):
+            self.tambah(rec.id, rec.kode_barang, rec.nama_barang, rec.jumlah,
+                        rec.harga_satuan, rec.total_harga, rec.created_at if ts is None else ts, rec.barang_id)
+            return
+        self.tambah(rec['id'], rec['kode_barang'], rec['nama_barang'], rec['jumlah'], rec['harga_satuan'],
+                    rec['total_harga'], ke_epoch(rec['created_at']) if ts is None else ts, rec.get('barang_id'))
+
+    def extend(self, rows):
+        for rec in rows:
+            self.append(rec)
+
+    def _keep(self, keep):
+        # keep: list index baris yang dipertahankan
+        for nama in ('id', 'item', 'jumlah', 'harga', 'total', 'ts'):
+            col = getattr(self, nama)
+            setattr(self, nama, array(col.typecode, [col[i] for i in keep]))
+        self._acak = any(self.ts[i] > self.ts[i + 1] for i in range(len(self.ts) - 1))
+        self._order = None
+
+    def ambil_sebelum(self, t):
+        # keluarkan baris dengan ts < t (untuk diarsip); return [(id, kode, nama, jumlah, harga, total, ts, barang_id), ...]
+        pos = self.posisi_waktu(None, t)
+        if not len(pos):
+            return []
+        keluar = []
+        for i in pos:
+            it = self.item[i]
+            keluar.append((self.id[i], self._kode[it], self._nama[it], self.jumlah[i], self.harga[i], self.total[i],
+                           self.ts[i], self._barang[it]))
+        if isinstance(pos, range):
+            self._keep(range(pos.stop, len(self)))
+        else:
+            buang = set(pos)
+            self._keep([i for i in range(len(self)) if i not in buang])
+        return keluar
+
+    # ----------------------------
+    # baca
+    # ----------------------------
+    def __len__(self):
+        return len(self.id)
+
+    def kode(self, it):
+        # kode tampil item intern: kode aktif barangnya, atau kode saat terjual kalau barang sudah dihapus
+        b = self._barang[it]
+        kode = self.kode_kini(b) if b is not None and self.kode_kini else None
+        return kode or self._kode[it]
+
+    def row(self, i):
+        it = self.item[i]
+        return Penjualan(self.id[i], self.kode(it), self._nama[it], self.jumlah[i],
+                         self.harga[i], self.total[i], self.ts[i], self._barang[it])
+
+    def rows(self, start=0, stop=None):
+        stop = len(self) if stop is None else stop
+        for i in range(start, stop):
+            yield self.row(i)
+
+    def __iter__(self):
+        return self.rows()
+
+    def max_id(self):
+        return max(self.id, default=0)
+
+    def potret(self):
+        # baris [0, n) saat ini sebagai dict storage, dibaca belakangan dari thread lain (snapshot latar) tanpa
+        # menyalin kolom: kolom hanya di-append dan arsip mengganti array (isi lama tidak diubah), jadi baris
+        # yang sudah ada tetap. Kode = kode saat terjual, sama dengan op 'put' di log
+        return _rows_storage(len(self), self.id, self.item, self.jumlah, self.harga, self.total, self.ts,
+                             self._barang, self._kode, self._nama)
+
+    # ----------------------------
+    # query rentang waktu [t0, t1) lewat binary search
+    # ----------------------------
+    def _urutan(self):
+        if not self._acak:
+            return None
+        if self._order is None:
+            order = sorted(range(len(self.ts)), key=self.ts.__getitem__)
+            self._order = array('q', order)
+            self._ts_urut = array('q', (self.ts[i] for i in order))
+        return self._order
+
+    def rentang_waktu(self, t0=None, t1=None):
+        # (lo, hi) di urutan waktu (kolom ts langsung, atau permutasi _order kalau baris acak)
+        order = self._urutan()
+        ts = self.ts if order is None else self._ts_urut
+        lo = 0 if t0 is None else bisect_left(ts, t0)
+        hi = len(ts) if t1 is None else bisect_left(ts, t1)
+        return lo, hi
+
+    def posisi_waktu(self, t0=None, t1=None):
+        # posisi baris (urut waktu) dengan t0 <= ts < t1
+        lo, hi = self.rentang_waktu(t0, t1)
+        order = self._order if self._acak else None
+        if order is None:
+            return range(lo, hi)
+        return order[lo:hi]
+
+    def rows_waktu(self, t0=None, t1=None):
+        for i in self.posisi_waktu(t0, t1):
+            yield self.row(i)
+
+    def total_waktu(self, t0=None, t1=None):
+        pos = self.posisi_waktu(t0, t1)
+        if isinstance(pos, range):
+            return self.total_harga(pos.start, pos.stop)
+        return sum(self.total[i] for i in pos)
+
+    # ----------------------------
+    # agregasi (vectorized bila numpy ada)
+    # ----------------------------
+    def _np(self, col):
+        return np.frombuffer(col, dtype=np.dtype(col.typecode)) if len(col) else np.zeros(0, dtype=np.int64)
+
+    def total_harga(self, start=0, stop=None):
+        stop = len(self) if stop is None else stop
+        if np is not None:
+            return int(self._np(self.total)[start:stop].sum())
+        return sum(self.total[start:stop])
+
+    def total_jumlah(self, start=0, stop=None):
+        stop = len(self) if stop is None else stop
+        if np is not None:
+            return int(self._np(self.jumlah)[start:stop].sum())
+        return sum(self.jumlah[start:stop])
+
+
+# ============================================================
+#  rollup penjualan: omzet / qty / jumlah transaksi per bucket
+# ============================================================
+# satu transaksi = satu baris penjualan (sama dengan yang tampil di rekap)
+class RollupPenjualan:
+    DIMENSI = ('hari', 'minggu', 'bulan', 'kode', 'kategori')
+
+    def __init__(self):
+        # data[dimensi][key] = [omzet, qty, trx]
+        self.data = {d: {} for d in self.DIMENSI}
+        # dimensi 'kode' di-key kunci barang (id barang, atau kode untuk data lama), label dibuat saat tampil
+        self._kat_kode = {}  # kunci barang -> kategori_id saat terjual
+
+    def __getstate__(self):
+        # pickle (warm start): nilai bucket diratakan ke satu array per dimensi, jauh lebih cepat dibaca
+        # daripada ribuan list kecil
+        data = {}
+        for dim, isi in self.data.items():
+            nilai = array('q')
+            for b in isi.values():
+                nilai.extend(b)
+            data[dim] = (list(isi), nilai)
+        return data, self._kat_kode
+
+    def __setstate__(self, state):
+        data, self._kat_kode = state
+        self.data = {}
+        for dim, (keys, nilai) in data.items():
+            it = iter(nilai)
+            self.data[dim] = dict(zip(keys, map(list, zip(it, it, it))))
+
+    @classmethod
+    def dari_ledger(cls, ledger, kategori_kode, arsip=()):
+        # kategori_kode: fungsi kunci barang -> kategori_id (None kalau barang sudah tidak ada)
+        # arsip: segmen arsip.ArsipPeriode (kolom item/jumlah/total/ts yang sama) ikut dihitung
+        r = cls()
+        kat = {}
+        for sumber in list(arsip) + [ledger]:
+            kunci = sumber.tabel_kunci()
+            for it, j, t, ts in zip(sumber.item, sumber.jumlah, sumber.total, sumber.ts):
+                k = kunci[it]
+                if k not in kat:
+                    kat[k] = kategori_kode(k)
+                r.catat(ts, [(k, kat[k], j, t)])
+        return r
+
+    @staticmethod
+    def kunci_waktu(ts):
+        d = datetime.fromtimestamp(ts)
+        iso = d.isocalendar()
+        return d.strftime("%Y-%m-%d"), f"{iso[0]}-W{iso[1]:02d}", d.strftime("%Y-%m")
+
+    def _tambah(self, dim, key, omzet, qty, trx):
+        b = self.data[dim].get(key)
+        if b is None:
+            b = self.data[dim][key] = [0, 0, 0]
+        b[0] += omzet
+        b[1] += qty
+        b[2] += trx
+        if b[2] <= 0:
+            del self.data[dim][key]
+
+    def catat(self, ts, lines, tanda=1):
+        # lines: [(kunci barang, kategori_id, jumlah, total), ...] dari satu nota (ts sama)
+        hari, minggu, bulan = self.kunci_waktu(ts)
+        for kunci, kategori_id, jumlah, total in lines:
+            if tanda > 0:
+                self._kat_kode[kunci] = kategori_id
+            else:
+                kategori_id = self._kat_kode.get(kunci)
+            for dim, key in (('hari', hari), ('minggu', minggu), ('bulan', bulan), ('kode', kunci), ('kategori', kategori_id)):
+                self._tambah(dim, key, tanda * total, tanda * jumlah, tanda)
+
+    def kategori_terjual(self, kunci):
+        # kategori_id barang saat terakhir terjual (None kalau belum pernah tercatat)
+        return self._kat_kode.get(kunci)
+
+    def ringkas(self, dim):
+        # [(key, omzet, qty, trx), ...] urut key
+        return [(k, v[0], v[1], v[2]) for k, v in sorted(self.data[dim].items(), key=lambda x: str(x[0]))]
+
+    def get(self, dim, key):
+        return tuple(self.data[dim].get(key, (0, 0, 0)))
@@ -0,0 +1,241 @@
+# metrik.py
+# instrumentasi SimplePOS: timer & counter per operasi, profil cProfile/tracemalloc on-demand,
+# ekspor format teks Prometheus ke file atau socket HTTP (/metrics).
+# Saat nonaktif tidak ada wrapper sama sekali (method asli class yang dipanggil), jadi overhead nol.
+# cProfile/pstats/http.server baru diimpor saat dipakai supaya tidak menambah waktu start POS.
+import os
+import threading
+import time
+import tracemalloc
+from collections import deque
+
+# operasi -> nama method SimplePOS yang diukur
+OPERASI = {
+    'lookup': '_barang_by_kode',
+    'cari': '_sumber_jual',
+    'keranjang_tambah': '_tambah_ke_keranjang',
+    'rollback_item': '_kembalikan_item',
+    'commit_nota': '_commit_keranjang',
+    'rekap': '_rekap_rentang',
+    'ringkasan': '_print_ringkasan',
+}
+SAMPEL = 4096  # latensi terakhir per operasi yang disimpan untuk p50/p99
+
+
+def persentil(data, q):
+    if not data:
+        return 0.0
+    data = sorted(data)
+    return data[min(len(data) - 1, int(q * len(data)))]
+
+
+def memori_rss():
+    # RSS proses (byte); /proc di Linux, selain itu puncak RSS dari resource, None kalau tidak tersedia
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return rss if os.uname().sysname == "Darwin" else rss * 1024
+    except (ImportError, AttributeError):
+        return None
+
+
+class Rekaman:
+    __slots__ = ('n', 'total', 'gagal', 'sampel', '_lock')
+
+    def __init__(self):
+        self.n = 0
+        self.total = 0.0
+        self.gagal = 0
+        self.sampel = deque(maxlen=SAMPEL)
+        self._lock = threading.Lock()
+
+    def catat(self, durasi, gagal=False):
+        with self._lock:
+            self.n += 1
+            self.total += durasi
+            self.sampel.append(durasi)
+            if gagal:
+                self.gagal += 1
+
+    def ringkas(self):
+        # (n, gagal, rata2, p50, p99) dalam detik
+        with self._lock:
+            sampel = list(self.sampel)
+            n, total, gagal = self.n, self.total, self.gagal
+        return n, gagal, total / n if n else 0.0, persentil(sampel, 0.50), persentil(sampel, 0.99)
+
+
+class Metrik:
+    def __init__(self):
+        self.rekaman = {nama: Rekaman() for nama in OPERASI}
+        self._terpasang = {}     # id(pos) -> pos
+        self._profil = None
+        self._server = None
+
+    # ----------------------------
+    # pasang / lepas instrumentasi (bisa diubah saat jalan)
+    # ----------------------------
+    def aktif(self, pos):
+        return id(pos) in self._terpasang
+
+    def pasang(self, pos):
+        if self.aktif(pos):
+            return
+        for nama, method in OPERASI.items():
+            # atribut instance menimpa method class; dilepas dengan menghapus atribut itu lagi
+            setattr(pos, method, self._bungkus(self.rekaman[nama], getattr(pos, method)))
+        self._terpasang[id(pos)] = pos
+
+    def lepas(self, pos):
+        if self._terpasang.pop(id(pos), None) is None:
+            return
+        for method in OPERASI.values():
+            pos.__dict__.pop(method, None)
+
+    @staticmethod
+    def _bungkus(rek, fungsi):
+        perf = time.perf_counter
+
+        def diukur(*args, **kwargs):
+            t0 = perf()
+            gagal = True
+            try:
+                hasil = fungsi(*args, **kwargs)
+                gagal = False
+                return hasil
+            finally:
+                rek.catat(perf() - t0, gagal)
+        return diukur
+
+    def reset(self):
+        self.rekaman = {nama: Rekaman() for nama in OPERASI}
+        for pos in list(self._terpasang.values()):
+            self.lepas(pos)
+            self.pasang(pos)
+
+    # ----------------------------
+    # profil cProfile / tracemalloc
+    # ----------------------------
+    def profil_jalan(self):
+        return self._profil is not None
+
+    def mulai_profil(self):
+        if self._profil is None:
+            import cProfile
+            self._profil = cProfile.Profile()
+            self._profil.enable()
+
+    def stop_profil(self, path=None, top=15):
+        # return teks fungsi termahal (cumulative); path: simpan .prof untuk snakeviz/pstats
+        if self._profil is None:
+            return ""
+        import io
+        import pstats
+        self._profil.disable()
+        prof, self._profil = self._profil, None
+        if path:
+            prof.dump_stats(path)
+        out = io.StringIO()
+        pstats.Stats(prof, stream=out).sort_stats("cumulative").print_stats(top)
+        return out.getvalue()
+
+    @staticmethod
+    def mulai_tracemalloc():
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @staticmethod
+    def stop_tracemalloc(top=10):
+        # return [(lokasi, byte, jumlah blok)] alokasi terbesar sejak tracing dimulai
+        if not tracemalloc.is_tracing():
+            return []
+        stats = tracemalloc.take_snapshot().statistics("lineno")[:top]
+        tracemalloc.stop()
+        return [(str(s.traceback[0]), s.size, s.count) for s in stats]
+
+    @staticmethod
+    def memori():
+        # {'rss': byte, 'traced': byte, 'traced_puncak': byte} (traced hanya kalau tracemalloc jalan)
+        hasil = {'rss': memori_rss()}
+        if tracemalloc.is_tracing():
+            hasil['traced'], hasil['traced_puncak'] = tracemalloc.get_traced_memory()
+        return hasil
+
+    # ----------------------------
+    # ekspor Prometheus
+    # ----------------------------
+    def teks_prometheus(self, pos=None):
+        out = [
+            "# HELP kopbox_operasi_detik Latensi operasi SimplePOS (detik).",
+            "# TYPE kopbox_operasi_detik summary",
+        ]
+        ringkas = {nama: rek.ringkas() for nama, rek in self.rekaman.items()}
+        for nama, (n, gagal, rata, p50, p99) in ringkas.items():
+            rek = self.rekaman[nama]
+            out.append(f'kopbox_operasi_detik{{operasi="{nama}",quantile="0.5"}} {p50:.9f}')
+            out.append(f'kopbox_operasi_detik{{operasi="{nama}",quantile="0.99"}} {p99:.9f}')
+            out.append(f'kopbox_operasi_detik_sum{{operasi="{nama}"}} {rek.total:.9f}')
+            out.append(f'kopbox_operasi_detik_count{{operasi="{nama}"}} {n}')
+        out.append("# HELP kopbox_operasi_gagal_total Operasi yang berakhir dengan exception.")
+        out.append("# TYPE kopbox_operasi_gagal_total counter")
+        for nama, (n, gagal, rata, p50, p99) in ringkas.items():
+            out.append(f'kopbox_operasi_gagal_total{{operasi="{nama}"}} {gagal}')
+        out.append("# HELP kopbox_memori_bytes Pemakaian memori proses.")
+        out.append("# TYPE kopbox_memori_bytes gauge")
+        for jenis, nilai in self.memori().items():
+            if nilai is not None:
+                out.append(f'kopbox_memori_bytes{{jenis="{jenis}"}} {nilai}')
+        if pos is not None:
+            out.append("# HELP kopbox_data Jumlah data di memori.")
+            out.append("# TYPE kopbox_data gauge")
+            out.append(f'kopbox_data{{koleksi="kategori"}} {len(pos.kategori)}')
+            out.append(f'kopbox_data{{koleksi="barang"}} {len(pos.barang)}')
+            out.append(f'kopbox_data{{koleksi="penjualan"}} {len(pos.penjualan)}')
+        return "\n".join(out) + "\n"
+
+    def tulis_file(self, path, pos=None):
+        # tulis ke file sementara lalu rename, supaya node_exporter (textfile collector) tidak membaca setengah file
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(self.teks_prometheus(pos))
+        os.replace(tmp, path)
+
+    def layani(self, port, pos=None, host="127.0.0.1"):
+        # endpoint GET /metrics di thread terpisah
+        if self._server:
+            return self._server
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        metrik = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrik.teks_prometheus(pos).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self._server
+
+    def berhenti(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+METRIK = Metrik()
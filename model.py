@@ -0,0 +1,113 @@
+# model.py
+# record ringkas (__slots__) untuk Kategori, Barang, CartLine & Penjualan (+ Keranjang: list CartLine).
+# Tetap bisa diakses gaya dict (r['kode']) supaya kode UI lama jalan; hot path pakai atribut (r.kode).
+from datetime import datetime
+
+FMT_WAKTU = "%Y-%m-%d %H:%M:%S"
+
+
+def ke_epoch(s):
+    return int(datetime.strptime(s, FMT_WAKTU).timestamp())
+
+
+def dari_epoch(ts):
+    return datetime.fromtimestamp(ts).strftime(FMT_WAKTU)
+
+
+def epoch_tanggal(d):
+    # epoch awal hari (00:00 waktu lokal) untuk objek date
+    return int(datetime(d.year, d.month, d.day).timestamp())
+
+
+class Record:
+    # field waktu disimpan int epoch; lewat akses dict tampil/diisi sebagai string "YYYY-mm-dd HH:MM:SS"
+    __slots__ = ()
+    _WAKTU = ()
+
+    def __init__(self, *args, **kwargs):
+        for nama, nilai in zip(self.__slots__, args):
+            setattr(self, nama, nilai)
+        for nama, nilai in kwargs.items():
+            setattr(self, nama, nilai)
+
+    def __reduce__(self):
+        # pickle ringkas (warm start): cukup tuple nilai slot, dibuat ulang lewat __init__
+        return self.__class__, tuple(getattr(self, k) for k in self.__slots__)
+
+    @classmethod
+    def dari_dict(cls, d):
+        r = cls.__new__(cls)
+        for nama in cls.__slots__:
+            nilai = d[nama]
+            if nama in cls._WAKTU and isinstance(nilai, str):
+                nilai = ke_epoch(nilai)
+            setattr(r, nama, nilai)
+        return r
+
+    def ke_dict(self):
+        return {k: self[k] for k in self.__slots__}
+
+    def keys(self):
+        return self.__slots__
+
+    def __getitem__(self, key):
+        try:
+            nilai = getattr(self, key)
+        except AttributeError:
+            raise KeyError(key)
+        return dari_epoch(nilai) if key in self._WAKTU else nilai
+
+    def __setitem__(self, key, nilai):
+        if key in self._WAKTU and isinstance(nilai, str):
+            nilai = ke_epoch(nilai)
+        setattr(self, key, nilai)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __eq__(self, other):
+        if isinstance(other, Record):
+            other = other.ke_dict()
+        return self.ke_dict() == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"{type(self).__name__}({', '.join(f'{k}={getattr(self, k)!r}' for k in self.__slots__)})"
+
+
+class Kategori(Record):
+    __slots__ = ('id', 'nama', 'kode', 'created_at')
+    _WAKTU = ('created_at',)
+
+
+class Barang(Record):
+    __slots__ = ('id', 'kategori_id', 'local_id', 'kode', 'nama', 'stok', 'harga', 'created_at')
+    _WAKTU = ('created_at',)
+
+
+class CartLine(Record):
+    __slots__ = ('barang_id', 'kode_barang', 'nama', 'jumlah', 'harga_satuan', 'total')
+
+
+class Keranjang(list):
+    # list CartLine + kunci reservasi stok keranjang ini (reservasi.py)
+    __slots__ = ('kunci',)
+
+    def __init__(self, kunci, items=()):
+        super().__init__(items)
+        self.kunci = kunci
+
+
+class Penjualan(Record):
+    # view satu baris ledger penjualan
+    __slots__ = ('id', 'kode_barang', 'nama_barang', 'jumlah', 'harga_satuan', 'total_harga', 'created_at', 'barang_id')
+    _WAKTU = ('created_at',)
+
+
+class Alias(Record):
+    # satu entri tabel alias (alias.py): mulai entri ini kode menunjuk barang_id
+    __slots__ = ('id', 'kode', 'barang_id')
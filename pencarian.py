@@ -0,0 +1,173 @@
+# pencarian.py
+# index pencarian barang: prefix kode (sorted array + bisect) dan trigram nama (toleran typo)
+from bisect import bisect_left, insort
+
+AMBANG = (0.7, 0.4)   # porsi minimal trigram query yang harus cocok, dilonggarkan bertahap
+BATAS_PENDING = 64    # lebih dari ini perubahan kode di-merge dengan sort ulang, bukan insort satu-satu
+
+
+def trigram(teks):
+    t = f"  {teks.lower().strip()} "
+    return {t[i:i + 3] for i in range(len(t) - 2)}
+
+
+class IndexPencarian:
+    def __init__(self):
+        self._kode = []           # kode terurut (untuk prefix search)
+        self._kode_id = {}        # kode -> barang id
+        self._pending = {}        # kode -> True (tambah) / False (hapus), di-merge saat query
+        self._gram = {}           # trigram -> set(barang id)
+        self._nama = {}           # barang id -> (nama lower, set trigram)
+        self._nama_tunda = None   # setelah unpickle: [(barang id, nama lower)], trigram dibangun saat dibutuhkan
+
+    # ----------------------------
+    # pickle (warm start): trigram tidak ikut disimpan, dibangun ulang saat pertama dipakai
+    # ----------------------------
+    def __getstate__(self):
+        self._merge_kode()
+        nama = self._nama_tunda if self._nama_tunda is not None else [(i, n) for i, (n, _) in self._nama.items()]
+        return self._kode, self._kode_id, nama
+
+    def __setstate__(self, state):
+        self._kode, self._kode_id, self._nama_tunda = state
+        self._pending = {}
+        self._gram = {}
+        self._nama = {}
+
+    def _siapkan_nama(self):
+        if self._nama_tunda is not None:
+            tunda, self._nama_tunda = self._nama_tunda, None
+            for barang_id, nama in tunda:
+                self._set_nama(barang_id, nama)
+
+    # ----------------------------
+    # update incremental
+    # ----------------------------
+    def tambah(self, b):
+        self._siapkan_nama()
+        self._set_kode(b['kode'].upper(), b['id'])
+        self._set_nama(b['id'], b['nama'])
+
+    def hapus(self, b):
+        self._siapkan_nama()
+        kode = b['kode'].upper()
+        if self._kode_id.get(kode) == b['id']:
+            del self._kode_id[kode]
+            self._pending[kode] = False
+        lama = self._nama.pop(b['id'], None)
+        if lama:
+            self._buang_gram(b['id'], lama[1])
+
+    def ganti_kode(self, barang_id, lama, baru):
+        lama, baru = lama.upper(), baru.upper()
+        if self._kode_id.get(lama) == barang_id:
+            del self._kode_id[lama]
+            self._pending[lama] = False
+        self._set_kode(baru, barang_id)
+
+    def ganti_nama(self, barang_id, nama):
+        self._siapkan_nama()
+        lama = self._nama.get(barang_id)
+        if lama and lama[0] == nama.lower():
+            return
+        if lama:
+            self._buang_gram(barang_id, lama[1])
+        self._set_nama(barang_id, nama)
+
+    def _set_kode(self, kode, barang_id):
+        self._kode_id[kode] = barang_id
+        self._pending[kode] = True
+
+    def _set_nama(self, barang_id, nama):
+        grams = trigram(nama)
+        self._nama[barang_id] = (nama.lower(), grams)
+        for g in grams:
+            self._gram.setdefault(g, set()).add(barang_id)
+
+    def _buang_gram(self, barang_id, grams):
+        for g in grams:
+            ids = self._gram.get(g)
+            if ids:
+                ids.discard(barang_id)
+                if not ids:
+                    del self._gram[g]
+
+    def _merge_kode(self):
+        if not self._pending:
+            return
+        if len(self._pending) > BATAS_PENDING:
+            self._kode = sorted(self._kode_id)
+        else:
+            for kode, ada in self._pending.items():
+                i = bisect_left(self._kode, kode)
+                terdaftar = i < len(self._kode) and self._kode[i] == kode
+                if kode in self._kode_id and not terdaftar:
+                    insort(self._kode, kode)
+                elif kode not in self._kode_id and terdaftar:
+                    del self._kode[i]
+        self._pending = {}
+
+    # ----------------------------
+    # query
+    # ----------------------------
+    def cari_kode(self, prefix, limit=20):
+        self._merge_kode()
+        prefix = prefix.upper()
+        hasil = []
+        i = bisect_left(self._kode, prefix)
+        while i < len(self._kode) and len(hasil) < limit and self._kode[i].startswith(prefix):
+            hasil.append(self._kode_id[self._kode[i]])
+            i += 1
+        return hasil
+
+    def cari_nama(self, q, limit=20):
+        # [(skor, barang id)] urut skor; skor = porsi trigram query yang ada di nama (+ bonus substring)
+        self._siapkan_nama()
+        q = q.lower().strip()
+        qg = trigram(q)
+        if not q or not qg:
+            return []
+        postings = sorted((self._gram.get(g, set()) for g in qg), key=len)
+        # jalur cepat: nama yang memuat semua trigram (irisan set, mulai dari posting terkecil)
+        hasil = self._skor(q, qg, set(postings[0]).intersection(*postings[1:]), len(qg))
+        for ambang in AMBANG:
+            if len(hasil) >= limit:
+                break
+            # toleran typo: item yang berbagi >= minimal trigram pasti muncul di salah satu
+            # (len - minimal + 1) posting terkecil, jadi posting besar tidak perlu disentuh
+            minimal = max(1, int(len(qg) * ambang + 0.999))
+            kandidat = set()
+            for ids in postings[:len(qg) - minimal + 1]:
+                kandidat.update(ids)
+            hasil = self._skor(q, qg, kandidat, minimal)
+        hasil.sort(key=lambda x: (-x[0], x[1]))
+        return hasil[:limit]
+
+    def _skor(self, q, qg, kandidat, minimal):
+        hasil = []
+        for bid in kandidat:
+            nama, grams = self._nama[bid]
+            cocok = len(qg & grams)
+            if cocok < minimal:
+                continue
+            skor = cocok / len(qg)
+            if nama.startswith(q):
+                skor += 1.0
+            elif q in nama:
+                skor += 0.5
+            hasil.append((skor, bid))
+        return hasil
+
+    def cari(self, q, limit=20):
+        # gabungan: kode yang diawali q dulu, lalu nama yang mirip; return list barang id tanpa duplikat
+        ids = self.cari_kode(q.strip(), limit)
+        if len(ids) >= limit:
+            return ids
+        sudah = set(ids)
+        for _, bid in self.cari_nama(q, limit):
+            if len(ids) >= limit:
+                break
+            if bid not in sudah:
+                ids.append(bid)
+                sudah.add(bid)
+        return ids
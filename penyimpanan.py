@@ -0,0 +1,540 @@
+# penyimpanan.py
+# backend penyimpanan untuk SimplePOS: append-only log (WAL) + snapshot, atau SQLite lokal
+import hashlib
+import hmac
+import json
+import os
+import pickle
+import sqlite3
+import threading
+
+from arsip import ArsipPeriode
+
+KOLEKSI = ('kategori', 'barang', 'penjualan', 'alias')  # alias: tabel kode -> id barang (alias.py)
+
+
+# ============================================================
+#  operasi mutasi (dipakai bersama oleh replay WAL & SQLite)
+# ============================================================
+# ('put', koleksi, rec)        -> insert / replace record by id
+# ('del', koleksi, [id, ...])  -> hapus record
+# ('kode', barang_id, local_id, kode) -> ganti local_id & kode barang (reindex / edit kategori)
+# ('stok', barang_id, delta)   -> stok barang += delta (penjualan final)
+# ('batch', [op, ...])         -> beberapa op sebagai satu kesatuan (transaksi admin, jurnal.py); di WAL satu
+#     baris, jadi baris yang terpotong saat crash membuang seluruh batch
+def state_kosong():
+    return {'seq': {k: 0 for k in KOLEKSI}, **{k: {} for k in KOLEKSI}}
+
+
+def apply_op(state, op):
+    jenis = op[0]
+    if jenis == 'put':
+        koleksi, rec = op[1], op[2]
+        state[koleksi][rec['id']] = rec
+        state['seq'][koleksi] = max(state['seq'][koleksi], rec['id'])
+    elif jenis == 'del':
+        koleksi, ids = op[1], op[2]
+        for i in ids:
+            state[koleksi].pop(i, None)
+    elif jenis == 'kode':
+        b = state['barang'].get(op[1])
+        if b:
+            b['local_id'] = op[2]
+            b['kode'] = op[3]
+    elif jenis == 'stok':
+        b = state['barang'].get(op[1])
+        if b:
+            b['stok'] += op[2]
+    elif jenis == 'batch':
+        for sub in op[1]:
+            apply_op(state, tuple(sub))
+    else:
+        raise ValueError(f"operasi tidak dikenal: {jenis}")
+
+
+def state_ke_list(state):
+    hasil = {'seq': dict(state['seq'])}
+    for k in KOLEKSI:
+        hasil[k] = [state[k][i] for i in sorted(state[k])]
+    return hasil
+
+
+# ============================================================
+#  WAL: append-only log dengan group-commit fsync + snapshot
+# ============================================================
+class WalStorage:
+    def __init__(self, direktori, snapshot_every=5000):
+        self.direktori = direktori
+        self.snapshot_every = snapshot_every
+        self.path_log = os.path.join(direktori, "wal.log")
+        self.path_old = os.path.join(direktori, "wal.old")   # segmen log yang sedang dibuatkan snapshot latar
+        self.path_snapshot = os.path.join(direktori, "snapshot.json")
+        os.makedirs(direktori, exist_ok=True)
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        self._lsn = 0          # lsn terakhir yang ditulis ke buffer
+        self._synced = 0       # lsn terakhir yang sudah di-fsync
+        self._syncing = False  # ada thread yang sedang fsync (leader group commit)
+        self._snapshot_lsn = 0
+        self._f = None
+
+    def load(self):
+        state, ada_data, valid_end = self._baca_state()
+        if valid_end is not None:
+            with open(self.path_log, "r+b") as f:
+                f.truncate(valid_end)
+        self._synced = self._lsn
+        self._f = open(self.path_log, "a", encoding="utf-8")
+        return state_ke_list(state) if ada_data else None
+
+    def _baca_state(self):
+        # snapshot + replay ekor log; return (state, ada_data, byte log yang valid / None kalau log belum ada)
+        state = state_kosong()
+        if os.path.exists(self.path_snapshot):
+            with open(self.path_snapshot, "r", encoding="utf-8") as f:
+                snap = json.load(f)
+            self._snapshot_lsn = snap['lsn']
+            state['seq'].update(snap['seq'])
+            for k in KOLEKSI:
+                state[k] = {rec['id']: rec for rec in snap.get(k, [])}  # snapshot lama belum punya 'alias'
+        self._lsn = self._snapshot_lsn
+        # replay hanya ekor log setelah snapshot: wal.old (kalau snapshot latar belum selesai) lalu wal.log
+        self._replay(self.path_old, state)
+        valid_end = self._replay(self.path_log, state)
+        return state, os.path.exists(self.path_snapshot) or self._lsn > self._snapshot_lsn, valid_end
+
+    def _replay(self, path, state):
+        # return byte log yang valid, None kalau file tidak ada
+        if not os.path.exists(path):
+            return None
+        valid_end = 0
+        with open(path, "rb") as f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    break  # baris terakhir terpotong (crash saat menulis)
+                if not line.endswith(b"\n"):
+                    break
+                valid_end += len(line)
+                if rec['lsn'] <= self._lsn:
+                    continue
+                apply_op(state, tuple(rec['op']))
+                self._lsn = rec['lsn']
+        return valid_end
+
+    # ----------------------------
+    # warm start (lihat tulis_warm / baca_warm)
+    # ----------------------------
+    def tanda(self):
+        # identitas file data: kalau sama dengan saat warm snapshot ditulis, isi storage tidak berubah sejak itu
+        return [_identitas(self.path_snapshot), _identitas(self.path_old), _identitas(self.path_log)]
+
+    def keadaan(self):
+        return {'lsn': self._lsn, 'snapshot_lsn': self._snapshot_lsn}
+
+    def buka(self, keadaan):
+        # pengganti load() saat warm start: log hanya dibuka untuk append, tidak dibaca
+        self._lsn = self._synced = keadaan['lsn']
+        self._snapshot_lsn = keadaan['snapshot_lsn']
+        self._f = open(self.path_log, "a", encoding="utf-8")
+
+    def baca_penjualan(self):
+        # penjualan di storage tanpa mengubah state storage yang sedang terbuka (cadangan lazy load ledger)
+        lsn, snapshot_lsn = self._lsn, self._snapshot_lsn
+        with self._lock:
+            self._f.flush()
+            try:
+                state = self._baca_state()[0]
+            finally:
+                self._lsn, self._snapshot_lsn = lsn, snapshot_lsn
+        return state_ke_list(state)['penjualan']
+
+    def append(self, *op):
+        with self._lock:
+            self._lsn += 1
+            self._f.write(json.dumps({'lsn': self._lsn, 'op': op}, separators=(",", ":")) + "\n")
+            return self._lsn
+
+    def commit(self, lsn=None):
+        # group commit: satu thread (leader) fsync, thread lain yang lsn-nya ikut tercakup cukup menunggu
+        with self._cond:
+            if lsn is None:
+                lsn = self._lsn
+            while self._synced < lsn:
+                if self._syncing:
+                    self._cond.wait()
+                    continue
+                self._syncing = True
+                target = self._lsn
+                self._f.flush()
+                fd = self._f.fileno()
+                self._lock.release()
+                try:
+                    os.fsync(fd)
+                finally:
+                    self._lock.acquire()
+                    self._syncing = False
+                self._synced = max(self._synced, target)
+                self._cond.notify_all()
+
+    def perlu_snapshot(self):
+        return self._lsn - self._snapshot_lsn >= self.snapshot_every
+
+    def _tulis_snapshot(self, state, lsn):
+        # ke file .tmp + fsync; dipasang (os.replace) oleh pemanggil
+        tmp = self.path_snapshot + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(dict(state, lsn=lsn), f, separators=(",", ":"))
+            f.flush()
+            os.fsync(f.fileno())
+        return tmp
+
+    def snapshot(self, state):
+        # langsung: state {'seq':..., 'kategori':[...], 'barang':[...], 'penjualan':[...]} sesuai lsn saat ini
+        with self._cond:
+            while self._syncing:
+                self._cond.wait()
+            self._f.flush()
+            os.fsync(self._f.fileno())
+            os.replace(self._tulis_snapshot(state, self._lsn), self.path_snapshot)
+            # log lama (termasuk segmen snapshot latar yang gagal) sudah tercakup snapshot, mulai log baru
+            _hapus(self.path_old)
+            self._f.close()
+            self._f = open(self.path_log, "w", encoding="utf-8")
+            self._snapshot_lsn = self._synced = self._lsn
+
+    # snapshot latar (dua tahap): potong_log() singkat di bawah lock pemanggil bersama pengambilan state,
+    # lalu snapshot_potongan() -- serialisasi & fsync -- boleh di thread lain sementara append jalan terus
+    def potong_log(self):
+        # log sampai lsn saat ini di-fsync & dipindah ke wal.old, append berikutnya masuk wal.log baru.
+        # Return lsn potongan, None kalau wal.old masih ada (snapshot latar sebelumnya belum / gagal selesai)
+        with self._cond:
+            if os.path.exists(self.path_old):
+                return None
+            while self._syncing:
+                self._cond.wait()
+            self._f.flush()
+            os.fsync(self._f.fileno())
+            self._f.close()
+            os.replace(self.path_log, self.path_old)
+            self._f = open(self.path_log, "a", encoding="utf-8")
+            self._synced = self._lsn
+            return self._lsn
+
+    def snapshot_potongan(self, state, lsn):
+        # state sesuai lsn dari potong_log(); sesudah snapshot terpasang wal.old tidak dibutuhkan lagi.
+        # Pasang & hapus di bawah lock supaya baca_penjualan() selalu melihat snapshot + segmen yang cocok
+        tmp = self._tulis_snapshot(state, lsn)
+        with self._lock:
+            os.replace(tmp, self.path_snapshot)
+            _hapus(self.path_old)
+            self._snapshot_lsn = max(self._snapshot_lsn, lsn)
+
+    def close(self):
+        if self._f:
+            self.commit()
+            self._f.close()
+            self._f = None
+
+
+# ============================================================
+#  SQLite lokal (interface sama dengan WalStorage)
+# ============================================================
+class SqliteStorage:
+    def __init__(self, path):
+        self.path = path
+        self.direktori = os.path.dirname(path) or "."
+        self._lock = threading.Lock()
+        self._db = None
+
+    def _sambung(self):
+        self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level="DEFERRED")
+        self._db.execute("PRAGMA journal_mode=WAL")
+        # FULL: commit() di-fsync seperti WalStorage, jadi nota yang sudah dicetak tetap ada walau listrik
+        # mati. NORMAL (fsync hanya saat checkpoint) bisa kehilangan commit terakhir
+        self._db.execute("PRAGMA synchronous=FULL")
+
+    def load(self):
+        self._sambung()
+        for k in KOLEKSI:
+            self._db.execute(f"CREATE TABLE IF NOT EXISTS {k} (id INTEGER PRIMARY KEY, data TEXT NOT NULL)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS seq (koleksi TEXT PRIMARY KEY, nilai INTEGER NOT NULL)")
+        self._db.commit()
+        state = {'seq': {k: 0 for k in KOLEKSI}}
+        ada_data = False
+        for k in KOLEKSI:
+            state[k] = [json.loads(d) for (d,) in self._db.execute(f"SELECT data FROM {k} ORDER BY id")]
+            ada_data = ada_data or bool(state[k])
+        for koleksi, nilai in self._db.execute("SELECT koleksi, nilai FROM seq"):
+            state['seq'][koleksi] = nilai
+            ada_data = True
+        return state if ada_data else None
+
+    def append(self, *op):
+        # satu op (termasuk seluruh isi 'batch') dijalankan di bawah satu lock, jadi commit dari
+        # thread lain tidak pernah menyimpan batch setengah jalan
+        with self._lock:
+            self._append(op)
+
+    def _append(self, op):
+        jenis = op[0]
+        if jenis == 'put':
+            koleksi, rec = op[1], op[2]
+            self._db.execute(f"INSERT OR REPLACE INTO {koleksi} (id, data) VALUES (?, ?)", (rec['id'], json.dumps(rec)))
+            self._db.execute(
+                "INSERT INTO seq (koleksi, nilai) VALUES (?, ?) "
+                "ON CONFLICT(koleksi) DO UPDATE SET nilai = max(nilai, excluded.nilai)",
+                (koleksi, rec['id']))
+        elif jenis == 'del':
+            self._db.executemany(f"DELETE FROM {op[1]} WHERE id = ?", [(i,) for i in op[2]])
+        elif jenis == 'kode':
+            self._db.execute("UPDATE barang SET data = json_set(data, '$.local_id', ?, '$.kode', ?) WHERE id = ?",
+                             (op[2], op[3], op[1]))
+        elif jenis == 'stok':
+            self._db.execute("UPDATE barang SET data = json_set(data, '$.stok', json_extract(data, '$.stok') + ?) WHERE id = ?",
+                             (op[2], op[1]))
+        elif jenis == 'batch':
+            for sub in op[1]:
+                self._append(tuple(sub))
+        else:
+            raise ValueError(f"operasi tidak dikenal: {jenis}")
+
+    def commit(self, lsn=None):
+        with self._lock:
+            self._db.commit()
+
+    def tanda(self):
+        return [_identitas(self.path), _identitas(self.path + "-wal")]
+
+    def keadaan(self):
+        return {}
+
+    def buka(self, keadaan):
+        self._sambung()
+
+    def baca_penjualan(self):
+        with self._lock:
+            return [json.loads(d) for (d,) in self._db.execute("SELECT data FROM penjualan ORDER BY id")]
+
+    def perlu_snapshot(self):
+        return False
+
+    def potong_log(self):
+        # tidak ada log terpisah untuk dipotong; snapshot() langsung
+        return None
+
+    def snapshot(self, state):
+        # SQLite sudah menyimpan state lengkap, tidak perlu snapshot terpisah
+        self.commit()
+
+    def close(self):
+        if self._db:
+            self.commit()
+            self._db.close()
+            self._db = None
+
+
+# ============================================================
+#  warm start: state SimplePOS dalam satu file biner (pickle)
+# ============================================================
+# Ditulis saat tutup() setelah storage ditutup, bersama tanda storage (identitas file data).
+# Saat start, kalau tanda masih sama, state dipakai langsung tanpa parse snapshot JSON / replay log.
+# Crash atau proses lain yang menulis storage mengubah tanda, jadi file warm otomatis diabaikan.
+# Isi pickle ditandatangani HMAC-SHA256 dan diverifikasi sebelum pickle.loads: file yang ditimpa pihak lain (tanpa
+# kunci) ditolak, bukan dieksekusi. Kunci dari env KOPBOX_WARM_KEY, atau WARM_KEY_FILE (dibuat acak, mode 0600).
+WARM_MAGIC = b"KPBXWRM3"  # naik kalau bentuk objek yang di-pickle berubah
+WARM_KEY_FILE = os.path.join(os.path.expanduser("~"), ".kopbox", "warm.key")
+_kunci_file = None
+
+
+def _kunci_warm():
+    global _kunci_file
+    env = os.environ.get("KOPBOX_WARM_KEY")
+    if env:
+        return env.encode()
+    if _kunci_file is None:
+        try:
+            with open(WARM_KEY_FILE, "rb") as f:
+                _kunci_file = f.read()
+        except FileNotFoundError:
+            os.makedirs(os.path.dirname(WARM_KEY_FILE), mode=0o700, exist_ok=True)
+            kunci = os.urandom(32)
+            try:
+                fd = os.open(WARM_KEY_FILE, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+            except FileExistsError:  # proses lain baru saja membuatnya
+                with open(WARM_KEY_FILE, "rb") as f:
+                    kunci = f.read()
+            else:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(kunci)
+            _kunci_file = kunci
+    return _kunci_file
+
+
+def _mac_warm(isi):
+    return hmac.new(_kunci_warm(), isi, hashlib.sha256).digest()
+
+
+def tulis_warm(path, tanda, data):
+    isi = pickle.dumps((tanda, data), protocol=pickle.HIGHEST_PROTOCOL)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(WARM_MAGIC)
+        f.write(_mac_warm(isi))
+        f.write(isi)
+    os.replace(tmp, path)
+
+
+def baca_warm(path, tanda):
+    # return data, atau None kalau file tidak ada / rusak / tanda tangan salah / bukan untuk isi storage saat ini
+    try:
+        with open(path, "rb") as f:
+            buf = f.read()
+    except OSError:
+        return None
+    n = len(WARM_MAGIC)
+    if buf[:n] != WARM_MAGIC:
+        return None
+    isi = memoryview(buf)[n + 32:]
+    if not hmac.compare_digest(buf[n:n + 32], _mac_warm(isi)):
+        return None
+    try:
+        tanda_file, data = pickle.loads(isi)
+    except (pickle.UnpicklingError, EOFError, ValueError, TypeError, AttributeError, ImportError):
+        # ditulis versi kode lain (kelas pindah / berubah bentuk) -> load biasa
+        return None
+    return data if tanda_file == tanda else None
+
+
+# ============================================================
+#  baca penjualan baru dari luar proses (agregator multi-toko)
+# ============================================================
+# wm (watermark): {'id': id penjualan terakhir yang sudah dibaca, 'snap': identitas snapshot, 'offset': byte wal.log,
+# 'log': inode wal.log tempat offset itu}. Yang dibaca hanya ekor log sejak offset; snapshot dibaca ulang hanya
+# kalau toko baru saja membuat snapshot (log dimulai ulang). Snapshot latar memindah wal.log ke wal.old (inode
+# tetap), jadi sisa segmen lama dicari lewat inode. Baris dengan id <= wm['id'] selalu dilewati, jadi baca
+# ulang tidak menggandakan data.
+def _hapus(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _identitas(path):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return [st.st_mtime_ns, st.st_size, st.st_ino]
+
+
+def _baca_log(path, offset, last_id, hasil):
+    # return (offset baru, inode file yang dibaca); baris terakhir yang belum lengkap tidak dibaca
+    # (ditunggu sinkron berikutnya)
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        return 0, None
+    with f:
+        ino = os.fstat(f.fileno()).st_ino
+        f.seek(offset)
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            try:
+                op = json.loads(line)['op']
+            except ValueError:
+                break
+            offset += len(line)
+            if op[0] == 'put' and op[1] == 'penjualan' and op[2]['id'] > last_id:
+                hasil.append(op[2])
+    return offset, ino
+
+
+def baca_penjualan_baru(jenis, direktori, wm=None):
+    # return (rows penjualan baru urut id, watermark baru)
+    wm = dict(wm or {'id': 0, 'snap': None, 'offset': 0})
+    hasil = []
+    if jenis == "sqlite":
+        path = os.path.join(direktori, "kopbox.db")
+        if os.path.exists(path):
+            db = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+            try:
+                hasil = [json.loads(d) for (d,) in db.execute(
+                    "SELECT data FROM penjualan WHERE id > ? ORDER BY id", (wm['id'],))]
+            except sqlite3.OperationalError:
+                hasil = []  # tabel belum dibuat
+            finally:
+                db.close()
+    else:
+        path_log = os.path.join(direktori, "wal.log")
+        path_old = os.path.join(direktori, "wal.old")
+        path_snap = os.path.join(direktori, "snapshot.json")
+        for _ in range(5):
+            snap = _identitas(path_snap)
+            old = _identitas(path_old)
+            log = _identitas(path_log)
+            hasil = []
+            offset = wm['offset']
+            if snap != wm['snap'] or (log and log[2] == wm.get('log') and log[1] < offset):
+                # toko membuat snapshot sejak sinkron terakhir: ambil dari snapshot, segmen yang belum tercakup
+                # (wal.old, kalau snapshot latar sedang jalan) lalu log baru dari awal
+                offset = 0
+                if snap:
+                    with open(path_snap, "r", encoding="utf-8") as f:
+                        hasil = [r for r in json.load(f)['penjualan'] if r['id'] > wm['id']]
+                if old:
+                    _baca_log(path_old, 0, max([wm['id']] + [r['id'] for r in hasil]), hasil)
+            elif log and log[2] != wm.get('log'):
+                # log dipotong untuk snapshot latar: sisa segmen yang terakhir dibaca (kini wal.old) dari offset,
+                # lalu wal.log baru dari awal
+                if old and old[2] == wm.get('log'):
+                    _baca_log(path_old, offset, wm['id'], hasil)
+                offset = 0
+            offset, ino = _baca_log(path_log, offset, max([wm['id']] + [r['id'] for r in hasil]), hasil)
+            # snapshot diganti / log dipotong di tengah pembacaan -> offset bisa milik file lain, ulangi
+            if _identitas(path_snap) == snap and ino == (log[2] if log else None):
+                wm['snap'], wm['offset'], wm['log'] = snap, offset, ino
+                break
+    # penjualan yang sudah dipindah ke arsip bulanan (arsip.py) sebelum sempat tersinkron; dibaca sesudah
+    # storage supaya baris yang diarsip di tengah pembacaan tetap terbaca di salah satunya
+    hasil.extend(_baca_arsip(os.path.join(direktori, "arsip"), wm, {r['id'] for r in hasil}))
+    hasil.sort(key=lambda r: r['id'])
+    if hasil:
+        wm['id'] = hasil[-1]['id']
+    return hasil, wm
+
+
+def _baca_arsip(direktori, wm, sudah):
+    # hanya file arsip yang berubah sejak sinkron terakhir yang dibuka; wm['arsip'] = {nama file: identitas}
+    if not os.path.isdir(direktori):
+        return []
+    lama = wm.get('arsip') or {}
+    wm['arsip'] = baru = {}
+    hasil = []
+    for nama in sorted(os.listdir(direktori)):
+        if not nama.endswith(".bin"):
+            continue
+        path = os.path.join(direktori, nama)
+        baru[nama] = _identitas(path)
+        if baru[nama] == lama.get(nama):
+            continue
+        seg = ArsipPeriode(path)
+        try:
+            for i in range(len(seg)):
+                if seg.id[i] > wm['id'] and seg.id[i] not in sudah:
+                    hasil.append(seg.row(i).ke_dict())
+        finally:
+            seg.tutup()
+    return hasil
+
+
+def buat_storage(jenis, direktori):
+    if jenis == "wal":
+        return WalStorage(direktori)
+    if jenis == "sqlite":
+        os.makedirs(direktori, exist_ok=True)
+        return SqliteStorage(os.path.join(direktori, "kopbox.db"))
+    return None
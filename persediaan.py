@@ -0,0 +1,150 @@
+# persediaan.py
+# analitik stok dari aliran penjualan: laju jual per barang (EWMA waktu kontinu, qty/hari), perkiraan
+# hari sampai stok habis, dan min-heap barang yang paling cepat habis. Di-update per baris nota yang
+# di-commit (O(log n)), tidak pernah memindai katalog. Peringatan dikirim sekali saat barang masuk
+# ambang, dan bisa dikirim lagi setelah barang keluar ambang (restock / penjualan melambat).
+import heapq
+import math
+from array import array
+
+HARI = 86400
+
+
+class AnalitikStok:
+    def __init__(self, tau_hari=7, ambang_hari=7):
+        self.tau = tau_hari          # konstanta waktu EWMA: penjualan tau hari lalu bobotnya 1/e
+        self.ambang = ambang_hari    # peringatan kalau perkiraan habis <= sekian hari
+        self._laju = {}              # barang id -> [laju qty/hari, ts laju itu dihitung]
+        self._habis = {}             # barang id -> perkiraan epoch stok habis (entri heap yang berlaku)
+        self._heap = []              # (perkiraan habis, barang id); entri basi dilewati / dibuang saat dipadatkan
+        self._waspada = set()        # barang yang sedang di bawah ambang (peringatannya sudah dikirim)
+        self.pendengar = []          # fungsi(barang, hari_tersisa)
+
+    def __getstate__(self):
+        # pickle (warm start): laju & perkiraan habis diratakan ke array, heap dibangun ulang dari _habis.
+        # pendengar menunjuk objek POS, tidak ikut disimpan
+        laju = array('d')
+        for v in self._laju.values():
+            laju.extend(v)
+        return (self.tau, self.ambang, array('q', self._laju), laju,
+                array('q', self._habis), array('d', self._habis.values()), self._waspada)
+
+    def __setstate__(self, state):
+        self.tau, self.ambang, ids, laju, habis_ids, habis, self._waspada = state
+        it = iter(laju)
+        self._laju = dict(zip(ids, map(list, zip(it, it))))
+        self._habis = dict(zip(habis_ids, habis))
+        self.pendengar = []
+        self._padatkan()
+
+    # ----------------------------
+    # estimasi
+    # ----------------------------
+    def laju(self, barang_id, sekarang):
+        # qty/hari, meluruh sejak penjualan terakhir
+        v = self._laju.get(barang_id)
+        if v is None:
+            return 0.0
+        return v[0] * math.exp(-max(0, sekarang - v[1]) / (self.tau * HARI))
+
+    def hari_tersisa(self, b, sekarang):
+        if b.stok <= 0:
+            return 0.0
+        laju = self.laju(b.id, sekarang)
+        return b.stok / laju if laju > 0 else math.inf
+
+    def n_waspada(self):
+        return len(self._waspada)
+
+    # ----------------------------
+    # update
+    # ----------------------------
+    def latih(self, sumber, t0, sekarang):
+        # seed dari kolom ledger / segmen arsip (item, jumlah, ts), hanya baris ts >= t0.
+        # Jumlah terbobot tidak tergantung urutan baris, jadi tidak perlu urut waktu
+        skala = self.tau * HARI
+        acc = {}
+        for it, j, ts in zip(sumber.item, sumber.jumlah, sumber.ts):
+            if ts >= t0:
+                acc[it] = acc.get(it, 0.0) + j * math.exp(-max(0, sekarang - ts) / skala)
+        kunci = sumber.tabel_kunci()
+        for it, x in acc.items():
+            k = kunci[it]
+            if isinstance(k, int):
+                v = self._laju.setdefault(k, [0.0, sekarang])
+                v[0] = self.laju(k, sekarang) + x / self.tau
+                v[1] = sekarang
+
+    def catat(self, b, jumlah, ts):
+        # satu baris nota yang sudah di-commit (b.stok sudah berkurang); return hari tersisa
+        laju = self.laju(b.id, ts) + jumlah / self.tau
+        v = self._laju.get(b.id)
+        if v is None:
+            self._laju[b.id] = [laju, ts]
+        else:
+            v[0], v[1] = laju, max(v[1], ts)
+        return self._perbarui(b, ts)
+
+    def perbarui(self, b, sekarang):
+        # stok berubah di luar penjualan (edit / restock / barang baru)
+        if b.id in self._laju or b.stok <= 0 or b.id in self._waspada:
+            return self._perbarui(b, sekarang)
+        return math.inf
+
+    def ambil(self, barang_id):
+        # laju barang yang akan dihapus, disimpan jurnal undo (pasang() mengembalikannya)
+        v = self._laju.get(barang_id)
+        return tuple(v) if v else None
+
+    def pasang(self, barang_id, laju):
+        self._laju[barang_id] = list(laju)
+
+    def hapus(self, barang_id):
+        self._laju.pop(barang_id, None)
+        self._habis.pop(barang_id, None)
+        self._waspada.discard(barang_id)
+
+    def _perbarui(self, b, sekarang):
+        hari = self.hari_tersisa(b, sekarang)
+        if hari == math.inf:
+            self._habis.pop(b.id, None)
+        else:
+            habis = sekarang + hari * HARI
+            self._habis[b.id] = habis
+            heapq.heappush(self._heap, (habis, b.id))
+            if len(self._heap) > 2 * len(self._habis) + 1024:
+                self._padatkan()
+        if hari <= self.ambang:
+            if b.id not in self._waspada:
+                self._waspada.add(b.id)
+                for f in self.pendengar:
+                    f(b, hari)
+        else:
+            self._waspada.discard(b.id)
+        return hari
+
+    def _padatkan(self):
+        # buang entri basi (tiap penjualan menambah entri baru untuk barang yang sama); amortisasi O(1)
+        self._heap = [(habis, bid) for bid, habis in self._habis.items()]
+        heapq.heapify(self._heap)
+
+    # ----------------------------
+    # baca
+    # ----------------------------
+    def kritis(self, n, sekarang, barang_by_id):
+        # n barang yang paling cepat habis: [(barang, hari_tersisa, laju qty/hari)].
+        # Kunci heap = perkiraan saat penjualan terakhir barang itu; 2n kandidat teratas dihitung ulang
+        # dengan laju sekarang lalu diurutkan, jadi cukup O(n log m) tanpa melihat barang lain
+        heap = self._heap
+        kandidat, diambil = {}, []
+        while heap and len(kandidat) < 2 * n:
+            habis, bid = heapq.heappop(heap)
+            if self._habis.get(bid) != habis or bid in kandidat:
+                continue
+            diambil.append((habis, bid))
+            b = barang_by_id(bid)
+            if b is not None:
+                kandidat[bid] = (b, self.hari_tersisa(b, sekarang), self.laju(bid, sekarang))
+        for e in diambil:
+            heapq.heappush(heap, e)
+        return sorted(kandidat.values(), key=lambda x: x[1])[:n]
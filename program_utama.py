@@ -1,16 +1,63 @@
 #!/usr/bin/env python3
 # kopbox_pos_nodb_kodeperkategori.py
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
 from datetime import datetime, timedelta
+import copy
+import itertools
 import os
+import shutil
 import sys
+import threading
 import time
+import traceback
+
+from alias import TabelAlias
+from arsip import ArsipPenjualan, periode_ts
+from katalog_io import ekspor_barang, ekspor_penjualan, ekspor_ringkasan, impor_barang
+from ledger import LedgerPenjualan, RollupPenjualan
+from metrik import METRIK, OPERASI
+from jurnal import Jurnal, Transaksi, kebalikan
+from model import Barang, CartLine, Kategori, Keranjang, Penjualan, dari_epoch, epoch_tanggal
+from pencarian import IndexPencarian
+from persediaan import AnalitikStok
+from penyimpanan import baca_warm, buat_storage, tulis_warm
+from rekap_paralel import MesinRekap
+from reservasi import Reservasi
 
 # ---------- config ----------
 DBLESS_SAMPLE = True  # isi sample data awal
+STORAGE_BACKEND = "wal"  # "wal" (append-only log + snapshot), "sqlite", atau None (in-memory saja)
+STORAGE_PATH = "data_kopbox"
+KODE_TOKO = os.environ.get("KOPBOX_TOKO")  # mode multi-toko: data di data_kopbox/toko/<kode> (lihat cabang.py)
+HASIL_CARI = 50  # maksimal hasil pencarian barang di menu jual
+STOK_LOCK_STRIPES = 64  # jumlah lock stok (barang dibagi ke lock berdasarkan id)
+RESERVASI_TTL = 15 * 60  # detik; stok yang ditahan keranjang tanpa aktivitas selama ini dilepas otomatis
+LAJU_TAU_HARI = 7  # laju jual per barang = EWMA dengan konstanta waktu sekian hari (persediaan.py)
+AMBANG_HARI_HABIS = 7  # peringatan stok kalau perkiraan habis <= sekian hari
+HASIL_KRITIS = 20  # baris di menu Analitik Stok
+METRIK_AKTIF = False  # instrumentasi latensi sejak start (bisa dinyalakan juga dari menu Diagnostik)
+METRIK_FILE = None  # mis. "metrics.prom" -> ditulis ulang tiap kembali ke menu utama (node_exporter textfile)
+METRIK_PORT = None  # mis. 9108 -> endpoint http://127.0.0.1:9108/metrics
+WARM_START = True  # tutup() menulis state biner (warm.bin) supaya start berikutnya tanpa parse riwayat
+ARSIP_AKTIF = True  # penjualan bulan yang sudah lewat dipindah ke arsip mmap (<storage>/arsip), RAM hanya bulan berjalan
 
 # ---------- helper ----------
+def storage_path():
+    return os.path.join(STORAGE_PATH, "toko", KODE_TOKO) if KODE_TOKO else STORAGE_PATH
+
+ANSI_CLEAR = "\033[2J\033[H"
+
 def clear():
-    os.system("cls" if os.name == "nt" else "clear")
+    # ANSI escape, tidak perlu fork shell seperti os.system("clear")
+    sys.stdout.write(ANSI_CLEAR)
+    sys.stdout.flush()
+
+def tulis_layar(lines):
+    # satu write untuk seluruh layar (clear + isi) supaya redraw cepat & tidak berkedip
+    sys.stdout.write(ANSI_CLEAR + "\n".join(lines) + "\n")
+    sys.stdout.flush()
 
 def pause(msg="Tekan Enter untuk melanjutkan..."):
     input(msg)
@@ -21,48 +68,653 @@ def colored(text, color_code):
     except:
         return text
 
+class POSError(Exception):
+    # error transaksi (pesan siap tampil ke kasir / client API)
+    pass
+
+
+class KeranjangTidakAda(POSError):
+    # cart_id tidak dikenal / keranjangnya sudah kedaluwarsa (API: 404, bukan konflik)
+    pass
+
 # ============================================================
 #  SIMPLE POS (No DB) - local_id per kategori + kode prefix
 # ============================================================
 class SimplePOS:
-    def __init__(self):
-        # kategori: [{'id':1,'nama':'Makanan','kode':'MA','created_at':...}, ...]
+    def __init__(self, storage=None):
+        # kategori: [Kategori(id=1, nama='Makanan', kode='MA', created_at=epoch), ...]
         self.kategori = []
-        # barang: [{'id':global_id,'kategori_id':1,'local_id':1,'kode':'MA001','nama':..,'stok':..,'harga':..,'created_at':..}, ...]
+        # barang: [Barang(id=global_id, kategori_id=1, local_id=1, kode='MA001', nama=.., stok=.., harga=.., created_at=epoch), ...]
+        # record __slots__ (model.py); r['kode'] tetap jalan, created_at lewat r['created_at'] tampil sebagai string
         self.barang = []
-        # penjualan: [{'id':1,'kode_barang':'MA001','nama_barang':..,'jumlah':..,'harga_satuan':..,'total_harga':..,'created_at':..}, ...]
-        self.penjualan = []
-        self.keranjang = []
+        # penjualan: ledger kolumnar (ledger.py); iterasinya menghasilkan record Penjualan.
+        # Saat warm start ledger baru dimuat ketika pertama dipakai (lihat property penjualan)
+        self._penjualan = LedgerPenjualan()
+        self._penjualan_lock = threading.Lock()
+        self._tanda_warm = None
+        self._ts_awal_warm = None  # ts penjualan tertua di ledger yang belum dimuat
+        # reservasi stok per keranjang (reservasi.py): stok barang baru berkurang saat nota di-commit,
+        # sebelum itu qty hanya ditahan dan lepas sendiri kalau keranjang ditinggal lebih dari RESERVASI_TTL
+        self.reservasi = Reservasi(RESERVASI_TTL, STOK_LOCK_STRIPES)
+        self.keranjang = Keranjang(self.reservasi.buka())
+        # analitik stok (laju jual, perkiraan habis) & peringatan yang sudah dikirim: (no, epoch, barang_id, hari)
+        self.analitik = AnalitikStok(LAJU_TAU_HARI, AMBANG_HARI_HABIS)
+        self.peringatan = deque(maxlen=100)
+        self._no_peringatan = 0
+        # cache tampilan menu jual: barang_id -> (field, baris), kategori_id -> (field, header)
+        self._cache_baris = {}
+        self._cache_header = {}
+        # lock untuk bagian commit yang menyentuh data bersama (id, ledger, rollup)
+        self._commit_lock = threading.Lock()
+        # index barang: kode -> barang, id -> barang, kategori_id -> [barang urut local_id]
+        self._idx_kode = {}
+        self._idx_id = {}
+        self._idx_kategori = {}
+        # index pencarian prefix kode & nama mirip (pencarian.py)
+        self._cari = IndexPencarian()
+        # tabel alias kode -> id barang (alias.py); penjualan menunjuk id barang, bukan kode
+        self.alias = TabelAlias()
+        # sequence counter: id terakhir per koleksi & local_id terakhir per kategori
+        self._seq = {'kategori': 0, 'barang': 0, 'penjualan': 0}
+        self._seq_local = {}
+        # transaksi admin katalog yang sedang berjalan & jurnal undo/redo sesi ini (jurnal.py)
+        self._tx = None
+        self.jurnal = Jurnal()
+        # backend penyimpanan (lihat penyimpanan.py); None = in-memory saja
+        self.storage = storage
+        self._thread_snapshot = None  # penulis snapshot latar yang sedang jalan (lihat _simpan_snapshot)
+        # arsip periode tertutup (arsip.py), dibaca lewat mmap; None kalau tanpa storage
+        self.arsip = ArsipPenjualan(os.path.join(storage.direktori, "arsip")) if storage and ARSIP_AKTIF else None
 
-        if DBLESS_SAMPLE:
+        if storage and WARM_START and self._muat_warm():
+            self.analitik.pendengar.append(self._peringatan_stok)
+            self._arsipkan_periode_tertutup()
+            return
+        state = storage.load() if storage else None
+        if state:
+            self.kategori = [Kategori.dari_dict(k) for k in state['kategori']]
+            self.barang = [Barang.dari_dict(b) for b in state['barang']]
+            self.penjualan = LedgerPenjualan(state['penjualan'])
+            for nama in self._seq:
+                self._seq[nama] = state['seq'].get(nama, 0)
+        elif DBLESS_SAMPLE:
             self._init_sample_data()
+        self._rebuild_index()
+        self._sync_counters()
+        if storage and not state:
+            # data awal langsung dicatat supaya restart berikutnya tidak mengisi sample lagi
+            for nama in ('kategori', 'barang', 'penjualan'):
+                for rec in getattr(self, nama):
+                    self._log('put', nama, rec)
+        self._muat_alias(state['alias'] if state else [])
+        self._rebuild_rollup()
+        self._rebuild_analitik()
+        self.analitik.pendengar.append(self._peringatan_stok)
+        self._commit()
+        self._arsipkan_periode_tertutup()
+
+    # ----------------------------
+    # warm start: katalog, counter, index & rollup dari warm.bin; ledger dari warm_penjualan.bin saat dibutuhkan
+    # ----------------------------
+    @property
+    def penjualan(self):
+        if self._penjualan is None:
+            with self._penjualan_lock:
+                if self._penjualan is None:
+                    led = baca_warm(self._path_warm("warm_penjualan.bin"), self._tanda_warm)
+                    if led is None:
+                        # file ledger hilang / rusak: baca ulang dari storage
+                        led = LedgerPenjualan(self.storage.baca_penjualan())
+                    led.kode_kini = self.alias.kode
+                    self._penjualan = led
+        return self._penjualan
+
+    @penjualan.setter
+    def penjualan(self, ledger):
+        self._penjualan = ledger
+
+    def _path_warm(self, nama):
+        return os.path.join(self.storage.direktori, nama)
+
+    def _muat_warm(self):
+        # return True kalau state berhasil dipakai (storage dibuka tanpa load)
+        tanda = self.storage.tanda()
+        data = baca_warm(self._path_warm("warm.bin"), tanda)
+        if data is None or 'analitik' not in data:
+            return False
+        self.storage.buka(data['storage'])
+        self.kategori, self.barang = data['kategori'], data['barang']
+        self._idx_kode, self._idx_id, self._idx_kategori, self._cari = data['index']
+        self._seq, self._seq_local = data['seq'], data['seq_local']
+        self.rollup = data['rollup']
+        self.alias = data['alias']
+        self.analitik = data['analitik']
+        if self.arsip is not None:
+            self.arsip.pasang_resolver(self.alias.kode)
+        self._tanda_warm = tanda
+        self._ts_awal_warm = data['ts_awal']
+        self._penjualan = None
+        return True
+
+    def _simpan_warm(self):
+        # dipanggil dari tutup() setelah storage ditutup (tanda file sudah final)
+        tanda = self.storage.tanda()
+        led = self.penjualan
+        tulis_warm(self._path_warm("warm_penjualan.bin"), tanda, led)
+        tulis_warm(self._path_warm("warm.bin"), tanda, {
+            'storage': self.storage.keadaan(),
+            'kategori': self.kategori,
+            'barang': self.barang,
+            'index': (self._idx_kode, self._idx_id, self._idx_kategori, self._cari),
+            'seq': self._seq,
+            'seq_local': self._seq_local,
+            'rollup': self.rollup,
+            'alias': self.alias,
+            'analitik': self.analitik,
+            'ts_awal': min(led.ts) if len(led) else None,
+        })
+
+    # ----------------------------
+    # alias kode -> id barang (alias.py)
+    # ----------------------------
+    def _muat_alias(self, entri):
+        self.alias = TabelAlias.dari_entri(entri, self._idx_id)
+        # barang yang belum tercatat (data lama / sample baru) masuk sebagai entri baru
+        self._alias_catat([(b.id, b.kode) for b in self.barang])
+        self.penjualan.kode_kini = self.alias.kode
+        if self.arsip is not None:
+            self.arsip.pasang_resolver(self.alias.kode)
+        # migrasi sekali jalan: penjualan lama tanpa barang_id di-resolve dari kodenya lalu disimpan ulang
+        for r in self.penjualan.lengkapi_barang(self.alias.resolve):
+            self._log('put', 'penjualan', r)
+        if self.arsip is not None:
+            self.arsip.lengkapi_barang(self.alias.resolve)
+
+    def _alias_catat(self, pasangan):
+        # pasangan: [(barang_id, kode aktif), ...]; hanya yang berubah yang dicatat
+        for e in self.alias.catat(pasangan):
+            self._log('put', 'alias', e)
+
+    def _barang_kunci(self, kunci):
+        # kunci barang di rollup / rekap: id barang, atau kode untuk data lama tanpa id
+        return self._idx_id.get(kunci) if isinstance(kunci, int) else self._barang_by_kode(kunci)
 
     # ----------------------------
     # id helpers (global id only for internal lists)
     # ----------------------------
-    def _next_global_id(self, collection):
-        if not collection:
-            return 1
-        return max(item['id'] for item in collection) + 1
+    def _sync_counters(self):
+        # hitung ulang counter dari data (dipakai saat start / setelah load data)
+        for nama in self._seq:
+            if nama == 'penjualan':
+                last = max(self.penjualan.max_id(), self.arsip.max_id() if self.arsip is not None else 0)
+            else:
+                last = max((item['id'] for item in getattr(self, nama)), default=0)
+            self._seq[nama] = max(self._seq[nama], last)
+        self._seq_local = {}
+        for kategori_id, items in self._idx_kategori.items():
+            self._seq_local[kategori_id] = max((b['local_id'] for b in items), default=0)
+
+    def _alloc_ids(self, nama, n=1):
+        # ambil blok id berurutan sekaligus, mis. satu nota dengan banyak baris
+        start = self._seq[nama] + 1
+        self._seq[nama] += n
+        return range(start, start + n)
+
+    def _next_global_id(self, nama):
+        # id global tidak pernah dipakai ulang walaupun data terakhir dihapus
+        return self._alloc_ids(nama)[0]
+
+    def _alloc_local_ids(self, kategori_id, n=1):
+        start = self._seq_local.get(kategori_id, 0) + 1
+        self._set_seq_local(kategori_id, start + n - 1)
+        return range(start, start + n)
+
+    # ----------------------------
+    # persistensi: setiap mutasi dicatat ke storage, commit = fsync
+    # ----------------------------
+    def _log(self, *op):
+        if self.storage:
+            if op[0] == 'put':
+                # storage tetap menyimpan dict biasa (created_at string), record dikonversi di sini
+                op = (op[0], op[1], op[2].ke_dict())
+            if self._tx is not None and Transaksi.op_katalog(op):
+                self._tx.log.append(op)
+                return
+            self.storage.append(*op)
 
-    def _next_local_id_for_category(self, kategori_id):
-        local_ids = [b['local_id'] for b in self.barang if b['kategori_id'] == kategori_id]
-        if not local_ids:
-            return 1
-        return max(local_ids) + 1
+    def _commit(self):
+        if self.storage:
+            self.storage.commit()
+
+    def _simpan_snapshot(self, paksa=False):
+        # snapshot berkala ditulis thread latar: di bawah _commit_lock log dipotong (wal.old) & state diambil
+        # murah (salinan record katalog, potret kolom ledger); serialisasi JSON + fsync di luar lock, jadi
+        # penulis / kasir tidak tertahan O(riwayat). paksa (tutup, sesudah arsip) ditulis langsung
+        if not self.storage or self._tx is not None:
+            return
+        t = self._thread_snapshot
+        if t is not None and t.is_alive():
+            if not paksa:
+                return
+            t.join()
+        self._thread_snapshot = None
+        if not (paksa or self.storage.perlu_snapshot()):
+            return
+        with self._commit_lock:
+            lsn = None if paksa else self.storage.potong_log()
+            if lsn is None:
+                # paksa, atau snapshot latar sebelumnya gagal (wal.old masih ada): langsung di bawah lock
+                self.storage.snapshot(self._state_snapshot(self._potret_state()))
+                return
+            potret = self._potret_state()
+        self._thread_snapshot = threading.Thread(target=self._snapshot_latar, args=(potret, lsn),
+                                                 name="snapshot", daemon=True)
+        self._thread_snapshot.start()
+
+    def _potret_state(self):
+        return {
+            'seq': dict(self._seq),
+            'kategori': [copy.copy(k) for k in self.kategori],
+            'barang': [copy.copy(b) for b in self.barang],
+            'penjualan': self.penjualan.potret(),
+            'alias': list(self.alias.entri),
+        }
+
+    @staticmethod
+    def _state_snapshot(potret):
+        return {
+            'seq': potret['seq'],
+            'kategori': [k.ke_dict() for k in potret['kategori']],
+            'barang': [b.ke_dict() for b in potret['barang']],
+            'penjualan': list(potret['penjualan']),
+            'alias': [e.ke_dict() for e in potret['alias']],
+        }
+
+    def _snapshot_latar(self, potret, lsn):
+        try:
+            self.storage.snapshot_potongan(self._state_snapshot(potret), lsn)
+        except Exception:
+            # wal.old tetap ada & ikut di-replay; snapshot berikutnya ditulis langsung
+            print("snapshot latar gagal, log lama disimpan sampai snapshot berikutnya", file=sys.stderr)
+            traceback.print_exc()
+
+    # ----------------------------
+    # transaksi admin katalog (jurnal.py): semua berhasil atau tidak sama sekali, bisa di-undo / redo
+    # ----------------------------
+    def mulai_transaksi(self, judul):
+        if self._tx is not None:
+            raise POSError("Masih ada transaksi admin yang belum selesai.")
+        self._tx = Transaksi(judul, len(self.alias.entri))
+        return self._tx
+
+    def commit_transaksi(self, sync=True):
+        # op yang ditahan masuk storage sebagai satu op 'batch' (atomik saat replay)
+        tx, self._tx = self._tx, None
+        if tx.log and self.storage:
+            with self._commit_lock:
+                # stok di op put diambil ulang: delta 'stok' dari kasir selama transaksi sudah ada di log
+                # sebelum batch ini, jadi nilai terkini yang harus menimpa
+                for op in tx.log:
+                    if op[0] == 'put' and op[1] == 'barang' and op[2]['id'] in self._idx_id:
+                        op[2]['stok'] = self._idx_id[op[2]['id']].stok
+                self.storage.append('batch', tx.log)
+            if sync:
+                self._commit()
+        self.jurnal.catat(tx)
+
+    def rollback_transaksi(self):
+        # perubahan di memori dibatalkan lewat kebalikan diff; op yang ditahan belum pernah ditulis, jadi
+        # op dari pembatalan ini juga dibuang. Entri alias yang ditambah sejak awal transaksi (termasuk dari
+        # pembatalan ini) dipotong, supaya tidak ikut tersimpan di snapshot / warm.bin berikutnya
+        tx = self._tx
+        self._tx = Transaksi(None)
+        try:
+            self._terapkan_diff(kebalikan(tx.diff), ketat=False)
+        finally:
+            self._tx = None
+            self.alias.potong(tx.n_alias, self._idx_id)
+
+    @contextmanager
+    def transaksi(self, judul, sync=True):
+        if self._tx is not None:
+            # bersarang (mis. hapus barang -> reindex): ikut transaksi luar
+            yield self._tx
+            return
+        tx = self.mulai_transaksi(judul)
+        try:
+            yield tx
+        except BaseException:
+            self.rollback_transaksi()
+            raise
+        self.commit_transaksi(sync)
+
+    def undo(self):
+        # return judul transaksi yang dibatalkan, None kalau jurnal kosong
+        if not self.jurnal.undo:
+            return None
+        entri = self.jurnal.ambil_undo()
+        try:
+            with self.transaksi(None):
+                self._terapkan_diff(kebalikan(entri[1]))
+        except POSError:
+            self.jurnal.selesai_redo(entri)
+            raise
+        self.jurnal.selesai_undo(entri)
+        return entri[0]
+
+    def redo(self):
+        if not self.jurnal.redo:
+            return None
+        entri = self.jurnal.ambil_redo()
+        try:
+            with self.transaksi(None):
+                self._terapkan_diff(entri[1])
+        except POSError:
+            self.jurnal.selesai_undo(entri)
+            raise
+        self.jurnal.selesai_redo(entri)
+        return entri[0]
+
+    def _diff(self, *d):
+        if self._tx is not None:
+            self._tx.diff.append(d)
+
+    def _kategori_by_id(self, kategori_id):
+        return next((k for k in self.kategori if k.id == kategori_id), None)
+
+    # primitif mutasi katalog: ubah field, tambah / hapus record, seq local_id. Semua mencatat diff
+    # (kalau di dalam transaksi) dan op storage, dan menjaga index, pencarian, alias & analitik
+    def _ubah(self, rec, **nilai):
+        # dipanggil per barang saat reindex / ganti kode kategori, jadi dibuat ringan
+        ubah = []
+        for f, v in nilai.items():
+            lama = getattr(rec, f)
+            if lama != v:
+                ubah.append((f, lama, v))
+        if not ubah:
+            return
+        if not isinstance(rec, Barang):
+            self._diff('ubah', 'kategori', rec.id, tuple(ubah))
+            for f, _, v in ubah:
+                setattr(rec, f, v)
+            self._log('put', 'kategori', rec)
+            return
+        self._diff('ubah', 'barang', rec.id, tuple(ubah))
+        hanya_kode = True
+        for f, _, v in ubah:
+            if f == 'kode':
+                self._index_rekode(rec, v)
+                continue
+            setattr(rec, f, v)
+            if f == 'nama':
+                self._cari.ganti_nama(rec.id, v)
+            if f != 'local_id':
+                hanya_kode = False
+        if hanya_kode:
+            self._log('kode', rec.id, rec.local_id, rec.kode)
+        else:
+            self._log('put', 'barang', rec)
+            if 'stok' in nilai:
+                self.analitik.perbarui(rec, int(time.time()))
+
+    def _tambah_rec(self, koleksi, rec, ekstra=None):
+        self._diff('tambah', koleksi, tuple(getattr(rec, k) for k in rec.__slots__), ekstra)
+        getattr(self, koleksi).append(rec)
+        self._log('put', koleksi, rec)
+        if koleksi == 'barang':
+            self._index_add(rec)
+            if ekstra:
+                self.analitik.pasang(rec.id, ekstra)
+            self.analitik.perbarui(rec, int(time.time()))
+
+    def _hapus_rec(self, koleksi, recs):
+        # banyak record sekaligus: list koleksi cukup disaring sekali
+        if not recs:
+            return
+        dihapus = set()
+        for rec in recs:
+            ekstra = None
+            if koleksi == 'barang':
+                ekstra = self.analitik.ambil(rec.id)
+                self._index_remove(rec)
+                self.alias.lepas(rec.id)
+                self.analitik.hapus(rec.id)
+            self._diff('hapus', koleksi, tuple(getattr(rec, k) for k in rec.__slots__), ekstra)
+            dihapus.add(rec.id)
+        setattr(self, koleksi, [x for x in getattr(self, koleksi) if x.id not in dihapus])
+        self._log('del', koleksi, [rec.id for rec in recs])
+
+    def _set_seq_local(self, kategori_id, nilai):
+        lama = self._seq_local.get(kategori_id)
+        if lama == nilai:
+            return
+        self._diff('seq_local', kategori_id, lama, nilai)
+        if nilai is None:
+            self._seq_local.pop(kategori_id, None)
+        else:
+            self._seq_local[kategori_id] = nilai
+
+    def _terapkan_diff(self, diff, ketat=True):
+        # undo / redo / rollback. Stok diterapkan sebagai selisih (penjualan sejak itu tetap terhitung);
+        # hapus berurutan digabung supaya list katalog disaring sekali
+        kode, urut, hapus = [], set(), []
+        def flush():
+            if hapus:
+                self._hapus_rec(hapus[0][0], [rec for _, rec in hapus])
+                hapus.clear()
+        for d in diff:
+            jenis, koleksi = d[0], d[1]
+            if jenis != 'hapus' or (hapus and hapus[0][0] != koleksi):
+                flush()
+            if jenis == 'seq_local':
+                kategori_id, nilai = d[1], d[3]
+                if nilai is not None:
+                    # barang yang masuk setelah transaksi itu tetap memegang local_id-nya
+                    nilai = max([nilai] + [b.local_id for b in self._barang_in_kategori(kategori_id)])
+                self._set_seq_local(kategori_id, nilai)
+                continue
+            if jenis == 'tambah':
+                rec = (Barang if koleksi == 'barang' else Kategori)(*d[2])
+                if koleksi == 'barang':
+                    if ketat and (rec.id in self._idx_id or self._idx_kode.get(rec.kode.upper()) is not None):
+                        raise POSError(f"Barang {rec.kode} sudah ada lagi, tidak bisa dikembalikan.")
+                    kode.append((rec.id, rec.kode))
+                    urut.add(rec.kategori_id)
+                self._tambah_rec(koleksi, rec, d[3])
+                continue
+            rec = self._idx_id.get(d[2][0] if jenis == 'hapus' else d[2]) if koleksi == 'barang' else \
+                self._kategori_by_id(d[2][0] if jenis == 'hapus' else d[2])
+            if rec is None:
+                raise POSError("Data katalog sudah berubah (record tidak ditemukan), tidak bisa dibatalkan.")
+            if jenis == 'hapus':
+                hapus.append((koleksi, rec))
+                continue
+            nilai = {}
+            for f, lama, baru in d[3]:
+                if f == 'stok':
+                    baru = rec.stok + baru - lama
+                    if ketat and baru < self.reservasi.ditahan(rec.id):
+                        raise POSError(f"Stok {rec.kode} sudah terjual / ditahan keranjang, tidak bisa dibatalkan.")
+                nilai[f] = baru
+            self._ubah(rec, **nilai)
+            if koleksi == 'barang' and 'kode' in nilai:
+                kode.append((rec.id, rec.kode))
+            if koleksi == 'barang' and 'local_id' in nilai:
+                urut.add(rec.kategori_id)
+        flush()
+        for kategori_id in urut:
+            self._idx_kategori[kategori_id].sort(key=lambda x: x.local_id)
+        self._alias_catat(kode)
+
+    def tutup(self):
+        if self.storage:
+            self._simpan_snapshot(paksa=True)
+            self.storage.close()
+            if WARM_START:
+                try:
+                    self._simpan_warm()
+                except OSError:
+                    pass  # start berikutnya cukup load biasa
+        if self.arsip is not None:
+            self.arsip.tutup()
+        self._rollback_keranjang_stok()
+        self.keranjang.clear()
+        self.reservasi.berhenti()
+
+    # ----------------------------
+    # arsip: bulan yang sudah tutup keluar dari RAM
+    # ----------------------------
+    def _arsipkan_periode_tertutup(self):
+        # dipanggil saat start & tiap kembali ke menu utama; return jumlah baris yang diarsip.
+        # Urutan: tulis arsip (fsync) -> log hapus dari ledger -> snapshot. Crash di tengah jalan aman:
+        # baris yang masih ada di ledger diarsip ulang dan id yang sudah terarsip dilewati.
+        if self.arsip is None:
+            return 0
+        batas = epoch_tanggal(datetime.now().date().replace(day=1))
+        if self._penjualan is None and (self._ts_awal_warm is None or self._ts_awal_warm >= batas):
+            return 0  # ledger belum dimuat & tidak ada baris bulan lalu: tidak perlu dimuat hanya untuk cek ini
+        if not len(self.penjualan) or self.penjualan.rentang_waktu(None, batas)[1] == 0:
+            return 0
+        with self._commit_lock:
+            rows = self.penjualan.ambil_sebelum(batas)
+            per_periode = {}
+            for r in rows:
+                per_periode.setdefault(periode_ts(r[6]), []).append(r)
+            for periode, isi in sorted(per_periode.items()):
+                self.arsip.tambah(periode, isi)
+            self._log('del', 'penjualan', [r[0] for r in rows])
+            self._commit()
+        self._simpan_snapshot(paksa=True)
+        return len(rows)
+
+    def _riwayat_rows(self, t0=None, t1=None):
+        # penjualan [t0, t1): arsip (urut waktu) lalu ledger bulan berjalan
+        hot = iter(self.penjualan) if t0 is None and t1 is None else self.penjualan.rows_waktu(t0, t1)
+        if self.arsip is None:
+            return hot
+        return itertools.chain(self.arsip.rows_waktu(t0, t1), hot)
+
+    def _riwayat_total(self, t0=None, t1=None):
+        total = self.penjualan.total_waktu(t0, t1)
+        return total + self.arsip.total_waktu(t0, t1) if self.arsip is not None else total
+
+    # ----------------------------
+    # index barang: lookup O(1) by kode / id / kategori
+    # ----------------------------
+    def _rebuild_index(self):
+        self._idx_kode = {}
+        self._idx_id = {}
+        self._idx_kategori = {}
+        self._cari = IndexPencarian()
+        for b in sorted(self.barang, key=lambda x: (x.local_id, x.id)):
+            self._index_add(b)
+
+    def _index_add(self, b):
+        self._idx_kode[b.kode.upper()] = b
+        self._idx_id[b.id] = b
+        self._idx_kategori.setdefault(b.kategori_id, []).append(b)
+        self._cari.tambah(b)
+
+    def _index_remove(self, b):
+        self._cache_baris.pop(b.id, None)
+        self._cari.hapus(b)
+        if self._idx_kode.get(b.kode.upper()) is b:
+            del self._idx_kode[b.kode.upper()]
+        self._idx_id.pop(b.id, None)
+        items = self._idx_kategori.get(b.kategori_id)
+        if items is not None:
+            self._idx_kategori[b.kategori_id] = [x for x in items if x is not b]
+
+    def _index_rekode(self, b, kode_baru):
+        # ganti kode barang sekaligus key di index kode
+        if self._idx_kode.get(b.kode.upper()) is b:
+            del self._idx_kode[b.kode.upper()]
+        self._cari.ganti_kode(b.id, b.kode, kode_baru)
+        b.kode = kode_baru
+        self._idx_kode[kode_baru.upper()] = b
+
+    def _barang_by_kode(self, kode):
+        b = self._idx_kode.get(kode.upper())
+        if b is None:
+            # kode lama (sebelum reindex / ganti kode kategori) -> barang yang sama lewat tabel alias
+            b = self._idx_id.get(self.alias.resolve(kode))
+        return b
+
+    def _barang_by_id(self, barang_id):
+        return self._idx_id.get(barang_id)
+
+    def _barang_in_kategori(self, kategori_id):
+        return self._idx_kategori.get(kategori_id, [])
+
+    def _rebuild_rollup(self):
+        # rollup per hari/minggu/bulan/barang/kategori; setelah ini di-update per nota di cetak_nota
+        def kategori_kode(kunci):
+            b = self._barang_kunci(kunci)
+            return b.kategori_id if b else None
+        self.rollup = RollupPenjualan.dari_ledger(self.penjualan, kategori_kode, self.arsip.segmen if self.arsip is not None else ())
+
+    def _rebuild_analitik(self):
+        # laju jual cukup dari beberapa konstanta waktu terakhir (bobot penjualan lebih lama < 2%)
+        sekarang = int(time.time())
+        t0 = sekarang - 4 * LAJU_TAU_HARI * 86400
+        self.analitik = AnalitikStok(LAJU_TAU_HARI, AMBANG_HARI_HABIS)
+        for sumber in (self.arsip.segmen_waktu(t0, None) if self.arsip is not None else []) + [self.penjualan]:
+            self.analitik.latih(sumber, t0, sekarang)
+        for b in self.barang:
+            self.analitik.perbarui(b, sekarang)
+
+    def _peringatan_stok(self, b, hari):
+        self._no_peringatan += 1
+        self.peringatan.append((self._no_peringatan, int(time.time()), b.id, hari))
 
     # ----------------------------
     # reindex: rapikan local_id per kategori & regenerate kode
     # ----------------------------
-    def reindex_barang_per_kategori(self):
-        # for each category, enumerate its items in ascending old local_id or created_at and reassign local_id 1..n
-        for kat in sorted(self.kategori, key=lambda x: x['id']):
-            items = [b for b in self.barang if b['kategori_id'] == kat['id']]
-            # sort by (local_id if exists) then by global id to get stable order
-            items_sorted = sorted(items, key=lambda x: (x.get('local_id', 999999), x['id']))
-            for new_local, item in enumerate(items_sorted, start=1):
-                item['local_id'] = new_local
-                item['kode'] = f"{kat['kode'].upper()}{new_local:03d}"
+    def reindex_barang_per_kategori(self, kategori_id=None, mulai=1):
+        # kategori_id None = semua kategori; kalau diisi hanya kategori itu yang dirapikan, mulai dari
+        # local_id >= mulai (barang sebelum posisi itu tidak berubah). Return change set {kode_lama: kode_baru}.
+        if kategori_id is None:
+            kats = sorted(self.kategori, key=lambda x: x['id'])
+        else:
+            kats = [k for k in self.kategori if k['id'] == kategori_id]
+        perubahan = {}
+        with self.transaksi("rapikan kode barang"):
+            for kat in kats:
+                perubahan.update(self._reindex_kategori(kat, mulai))
+            self._terapkan_perubahan_kode(perubahan)
+        return perubahan
+
+    def _reindex_kategori(self, kat, mulai):
+        items = self._barang_in_kategori(kat.id)
+        if mulai <= 1:
+            # rapikan penuh: sort by (local_id if exists) then by global id to get stable order
+            items = sorted(items, key=lambda x: (x.local_id, x.id))
+            if items:
+                self._idx_kategori[kat.id] = items
+            pos = 0
+        else:
+            # list per kategori sudah urut local_id
+            pos = bisect_left(items, mulai, key=lambda x: x.local_id)
+        prefix = kat.kode.upper()
+        berubah = []
+        prev_local = items[pos - 1]['local_id'] if pos > 0 else 0
+        for item in items[pos:]:
+            prev_local += 1
+            kode_baru = f"{prefix}{prev_local:03d}"
+            if item.local_id != prev_local or item.kode != kode_baru:
+                berubah.append((item, prev_local, kode_baru))
+        # urut naik & kode hanya bergeser turun: kode tujuan sudah dilepas pemilik lamanya
+        # (_index_rekode hanya menghapus key yang masih menunjuk barang itu)
+        perubahan = {}
+        for item, new_local, kode_baru in berubah:
+            perubahan[item.kode] = kode_baru
+            self._ubah(item, local_id=new_local, kode=kode_baru)
+        self._set_seq_local(kat.id, items[-1]['local_id'] if items else 0)
+        return perubahan
+
+    def _terapkan_perubahan_kode(self, perubahan):
+        # penjualan, arsip & rollup menunjuk id barang jadi tidak disentuh; cukup entri alias baru, O(barang yang berubah)
+        self._alias_catat([(self._idx_kode[baru.upper()].id, baru) for baru in perubahan.values()])
 
     def reindex_all(self):
         # optional: reindex kategori ids (global) and barang local ids
@@ -73,18 +725,18 @@ class SimplePOS:
     # sample data
     # ----------------------------
     def _init_sample_data(self):
-        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        now = int(time.time())
         if not self.kategori:
-            self.kategori.append({'id': 1, 'nama': 'Makanan', 'kode': 'MA', 'created_at': now})
-            self.kategori.append({'id': 2, 'nama': 'Minuman', 'kode': 'MI', 'created_at': now})
-            self.kategori.append({'id': 3, 'nama': 'Snack', 'kode': 'SN', 'created_at': now})
+            self.kategori.append(Kategori(1, 'Makanan', 'MA', now))
+            self.kategori.append(Kategori(2, 'Minuman', 'MI', now))
+            self.kategori.append(Kategori(3, 'Snack', 'SN', now))
         if not self.barang:
             # note: assign local_id and kode via helper to keep consistent
-            self.barang.append({'id': 1, 'kategori_id': 1, 'local_id': 1, 'kode': 'MA001', 'nama': 'Nasi Goreng', 'stok': 20, 'harga': 20000, 'created_at': now})
-            self.barang.append({'id': 2, 'kategori_id': 1, 'local_id': 2, 'kode': 'MA002', 'nama': 'Mie Goreng', 'stok': 100, 'harga': 20000, 'created_at': now})
-            self.barang.append({'id': 3, 'kategori_id': 1, 'local_id': 3, 'kode': 'MA003', 'nama': 'Soto', 'stok': 100, 'harga': 13112, 'created_at': now})
-            self.barang.append({'id': 4, 'kategori_id': 2, 'local_id': 1, 'kode': 'MI001', 'nama': 'Es Teh', 'stok': 50, 'harga': 5000, 'created_at': now})
-            self.barang.append({'id': 5, 'kategori_id': 3, 'local_id': 1, 'kode': 'SN001', 'nama': 'Cici', 'stok': 100, 'harga': 10000, 'created_at': now})
+            self.barang.append(Barang(1, 1, 1, 'MA001', 'Nasi Goreng', 20, 20000, now))
+            self.barang.append(Barang(2, 1, 2, 'MA002', 'Mie Goreng', 100, 20000, now))
+            self.barang.append(Barang(3, 1, 3, 'MA003', 'Soto', 100, 13112, now))
+            self.barang.append(Barang(4, 2, 1, 'MI001', 'Es Teh', 50, 5000, now))
+            self.barang.append(Barang(5, 3, 1, 'SN001', 'Cici', 100, 10000, now))
             # jika nanti ada penghapusan, gunakan reindex_barang_per_kategori()
 
     # ============================================================
@@ -110,25 +762,141 @@ class SimplePOS:
 
     def main_menu(self):
         while True:
+            self._arsipkan_periode_tertutup()
+            self._simpan_snapshot()
+            if METRIK_FILE and METRIK.aktif(self):
+                METRIK.tulis_file(METRIK_FILE, self)
             clear()
             print(colored("==== MENU UTAMA KOPBOX POS (Kode per Kategori) ====", "94"))
+            if KODE_TOKO:
+                print(colored(f"Toko: {KODE_TOKO}", "90"))
+            if self.analitik.n_waspada():
+                print(colored(f"⚠ {self.analitik.n_waspada()} barang diperkirakan habis dalam "
+                              f"{AMBANG_HARI_HABIS} hari (menu 5)", "93"))
             print("1. Daftar Kategori & Barang")
             print("2. Jual Barang (pakai Kode)")
             print("3. Rekap Penjualan")
+            print("4. Diagnostik (latensi & memori)")
+            print("5. Analitik Stok (hampir habis)")
             print("0. Keluar")
-            pilih = input("\nPilih [0-3]: ").strip()
+            pilih = input("\nPilih [0-5]: ").strip()
             if pilih == "1":
                 self.menu_kategori()
             elif pilih == "2":
                 self.menu_jual()
             elif pilih == "3":
                 self.rekap_penjualan()
+            elif pilih == "4":
+                self.menu_diagnostik()
+            elif pilih == "5":
+                self.menu_analitik_stok()
             elif pilih == "0":
+                self.tutup()
                 print("Terima kasih.")
                 break
             else:
                 pause("Pilihan tidak valid.")
 
+    # ============================================================
+    # ANALITIK STOK (persediaan.py)
+    # ============================================================
+    def _teks_hari(self, hari):
+        if hari == 0:
+            return "sudah habis"
+        if hari == float('inf'):
+            return "-"
+        return "< 1 hari" if hari < 1 else f"± {hari:,.1f} hari"
+
+    def menu_analitik_stok(self):
+        # langsung dari heap analitik: tidak memindai katalog
+        clear()
+        sekarang = int(time.time())
+        print(colored(f"📦 ANALITIK STOK — {HASIL_KRITIS} barang paling cepat habis", "96"))
+        print(f"Laju = rata-rata bergerak eksponensial (τ {LAJU_TAU_HARI} hari), ambang peringatan {AMBANG_HARI_HABIS} hari")
+        print("-" * 100)
+        rows = self.analitik.kritis(HASIL_KRITIS, sekarang, self._barang_by_id)
+        if not rows:
+            pause("Belum ada data penjualan / semua stok aman.")
+            return
+        print(f"{'Kode':<8} {'Nama':<30} {'Stok':>6} {'Laju/hari':>10}  {'Sisa':<16} {'Perkiraan habis'}")
+        print("-" * 100)
+        for b, hari, laju in rows:
+            habis = dari_epoch(sekarang + int(hari * 86400))[:10] if hari != float('inf') else "-"
+            baris = f"{b.kode:<8} {b.nama[:30]:<30} {b.stok:>6} {laju:>10.2f}  {self._teks_hari(hari):<16} {habis}"
+            print(colored(baris, "93") if hari <= AMBANG_HARI_HABIS else baris)
+        print("-" * 100)
+        pause()
+
+    # ============================================================
+    # DIAGNOSTIK (metrik.py)
+    # ============================================================
+    def _layar_diagnostik(self):
+        out = [colored("🩺 DIAGNOSTIK", "96"), "=" * 78]
+        aktif = METRIK.aktif(self)
+        out.append(f"Instrumentasi: {colored('AKTIF', '92') if aktif else colored('nonaktif', '90')}"
+                   f"   |   cProfile: {'jalan' if METRIK.profil_jalan() else '-'}"
+                   f"   |   tracemalloc: {'jalan' if 'traced' in METRIK.memori() else '-'}")
+        out.append("-" * 78)
+        out.append(f"{'Operasi':<18} {'Jumlah':>9} {'Gagal':>7} {'Rata2 ms':>10} {'p50 ms':>10} {'p99 ms':>10}")
+        out.append("-" * 78)
+        for nama in OPERASI:
+            n, gagal, rata, p50, p99 = METRIK.rekaman[nama].ringkas()
+            out.append(f"{nama:<18} {n:>9,} {gagal:>7,} {rata * 1000:>10.3f} {p50 * 1000:>10.3f} {p99 * 1000:>10.3f}")
+        out.append("-" * 78)
+        mem = METRIK.memori()
+        baris = f"RSS: {mem['rss'] / 2**20:,.1f} MB" if mem['rss'] else "RSS: -"
+        if 'traced' in mem:
+            baris += f"  |  traced: {mem['traced'] / 2**20:,.1f} MB (puncak {mem['traced_puncak'] / 2**20:,.1f} MB)"
+        out.append(baris)
+        out.append(f"Data: {len(self.kategori)} kategori, {len(self.barang):,} barang, {len(self.penjualan):,} baris penjualan")
+        if self.arsip is not None:
+            out.append(f"Arsip: {len(self.arsip.segmen)} bulan, {len(self.arsip):,} baris (mmap, di luar RAM)")
+        res = self.reservasi.ringkas()
+        out.append(f"Reservasi: {res['keranjang']} keranjang aktif, {res['qty_ditahan']:,} qty ditahan, "
+                   f"{res['kedaluwarsa']:,} keranjang kedaluwarsa (TTL {RESERVASI_TTL // 60} menit)")
+        out.append("-" * 78)
+        out.append("1. Aktif/nonaktifkan instrumentasi   2. Mulai/stop cProfile   3. Mulai/stop tracemalloc")
+        out.append("4. Tulis metrik Prometheus ke file   5. Reset angka          Enter = refresh, 0 = kembali")
+        return out
+
+    def menu_diagnostik(self):
+        while True:
+            tulis_layar(self._layar_diagnostik())
+            pilih = input("\nPilih: ").strip()
+            if pilih == "0":
+                return
+            elif pilih == "1":
+                if METRIK.aktif(self):
+                    METRIK.lepas(self)
+                else:
+                    METRIK.pasang(self)
+            elif pilih == "2":
+                if METRIK.profil_jalan():
+                    path = datetime.now().strftime("profil_%Y%m%d_%H%M%S.prof")
+                    clear()
+                    print(METRIK.stop_profil(path))
+                    pause(f"Profil disimpan di {path}. Tekan Enter...")
+                else:
+                    METRIK.mulai_profil()
+            elif pilih == "3":
+                if 'traced' in METRIK.memori():
+                    clear()
+                    print(f"{'Lokasi':<60} {'KB':>10} {'Blok':>8}")
+                    for lokasi, size, count in METRIK.stop_tracemalloc():
+                        print(f"{lokasi[-60:]:<60} {size / 1024:>10,.1f} {count:>8,}")
+                    pause()
+                else:
+                    METRIK.mulai_tracemalloc()
+            elif pilih == "4":
+                path = input("Nama file [metrics.prom]: ").strip() or METRIK_FILE or "metrics.prom"
+                try:
+                    METRIK.tulis_file(path, self)
+                    pause(f"Metrik ditulis ke {path}.")
+                except OSError as e:
+                    pause(f"Gagal menulis file: {e}")
+            elif pilih == "5":
+                METRIK.reset()
+
     # ============================================================
     # KATEGORI (dgn kode prefix)
     # ============================================================
@@ -144,8 +912,12 @@ class SimplePOS:
             print("3. Hapus Kategori")
             print("4. Masuk Tabel Barang")
             print("5. Rapikan ID Barang per Kategori (reindex)")
+            print("6. Impor Barang dari File (CSV/JSONL)")
+            print("7. Ekspor Barang / Penjualan ke File")
+            print(f"8. Undo{' (' + self.jurnal.undo[-1][0] + ')' if self.jurnal.undo else ''}")
+            print(f"9. Redo{' (' + self.jurnal.redo[-1][0] + ')' if self.jurnal.redo else ''}")
             print("0. Kembali")
-            pilih = input("\nPilih [0-5]: ").strip()
+            pilih = input("\nPilih [0-9]: ").strip()
             if pilih == "1":
                 self.tambah_kategori()
             elif pilih == "2":
@@ -157,11 +929,72 @@ class SimplePOS:
             elif pilih == "5":
                 self.reindex_all()
                 pause("ID barang per kategori dirapikan.")
+            elif pilih == "6":
+                self.menu_impor()
+            elif pilih == "7":
+                self.menu_ekspor()
+            elif pilih in ("8", "9"):
+                self.menu_undo(pilih == "9")
             elif pilih == "0":
                 break
             else:
                 pause("Pilihan tidak valid.")
 
+    def menu_undo(self, redo=False):
+        try:
+            judul = self.redo() if redo else self.undo()
+        except POSError as e:
+            pause(str(e))
+            return
+        if judul is None:
+            pause("Tidak ada yang bisa di-redo." if redo else "Tidak ada yang bisa di-undo.")
+        else:
+            pause(f"{'Redo' if redo else 'Undo'}: {judul}.")
+
+    def menu_impor(self):
+        clear()
+        print(colored("📥 IMPOR BARANG (CSV / JSONL)", "92"))
+        print("Kolom: kode (prefix kategori, mis. MA), nama, stok, harga")
+        path = input("Path file: ").strip()
+        if not os.path.isfile(path):
+            pause("File tidak ditemukan.")
+            return
+        errors = []
+        def on_error(no, pesan):
+            # cukup simpan beberapa error pertama untuk ditampilkan
+            if len(errors) < 20:
+                errors.append(f"  baris {no}: {pesan}")
+        try:
+            hasil = impor_barang(self, path, on_error)
+        except (OSError, UnicodeDecodeError) as e:
+            pause(f"Gagal membaca file: {e}")
+            return
+        for e in errors:
+            print(e)
+        if hasil['gagal'] > len(errors):
+            print(f"  ... dan {hasil['gagal'] - len(errors)} baris gagal lainnya")
+        pause(f"Impor selesai: {hasil['ok']} barang masuk, {hasil['gagal']} baris gagal.")
+
+    def menu_ekspor(self):
+        clear()
+        print(colored("📤 EKSPOR (CSV / JSONL / TXT sesuai ekstensi file, tambah .gz untuk kompres)", "92"))
+        print("1. Barang")
+        print("2. Penjualan")
+        pilih = input("Pilih: ").strip()
+        if pilih not in ("1", "2"):
+            pause("Pilihan tidak valid.")
+            return
+        path = input("Path file tujuan (.csv / .jsonl / .txt): ").strip()
+        if not path:
+            pause("Path tidak boleh kosong.")
+            return
+        try:
+            n = ekspor_barang(self, path) if pilih == "1" else ekspor_penjualan(self, path)
+        except OSError as e:
+            pause(f"Gagal menulis file: {e}")
+            return
+        pause(f"{n} baris diekspor ke {path}.")
+
     def tampil_kategori(self):
         if not self.kategori:
             print("Belum ada kategori.")
@@ -185,11 +1018,16 @@ class SimplePOS:
         if any(k['kode'].upper() == kode for k in self.kategori):
             pause("Kode sudah digunakan. Pilih kode lain.")
             return
-        new_id = self._next_global_id(self.kategori)
-        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        self.kategori.append({'id': new_id, 'nama': nama, 'kode': kode, 'created_at': now})
+        self._buat_kategori(nama, kode)
         pause("Kategori berhasil ditambahkan.")
 
+    def _buat_kategori(self, nama, kode, sync=True):
+        new_id = self._next_global_id('kategori')
+        kat = Kategori(new_id, nama, kode, int(time.time()))
+        with self.transaksi(f"tambah kategori {kode}", sync):
+            self._tambah_rec('kategori', kat)
+        return kat
+
     def edit_kategori(self):
         try:
             idk = int(input("ID kategori: "))
@@ -208,13 +1046,16 @@ class SimplePOS:
         if any(k['kode'].upper() == kode_baru and k['id'] != idk for k in self.kategori):
             pause("Kode sudah digunakan kategori lain.")
             return
-        old_kode = kat['kode']
-        kat['nama'] = nama_baru
-        kat['kode'] = kode_baru
-        # update semua kode barang yang punya kategori ini
-        for b in self.barang:
-            if b['kategori_id'] == idk:
-                b['kode'] = f"{kode_baru}{b['local_id']:03d}"
+        with self.transaksi(f"edit kategori {kat['kode']}"):
+            self._ubah(kat, nama=nama_baru, kode=kode_baru)
+            # update semua kode barang yang punya kategori ini
+            perubahan = {}
+            for b in self._barang_in_kategori(idk):
+                kode_lama = b['kode']
+                self._ubah(b, kode=f"{kode_baru}{b['local_id']:03d}")
+                if kode_lama != b['kode']:
+                    perubahan[kode_lama] = b['kode']
+            self._terapkan_perubahan_kode(perubahan)
         pause("Kategori diperbarui.")
 
     def hapus_kategori(self):
@@ -231,13 +1072,13 @@ class SimplePOS:
         if kon != "y":
             pause("Dibatalkan.")
             return
-        # hapus barang kategori
-        self.barang = [b for b in self.barang if b['kategori_id'] != idk]
-        # hapus kategori
-        self.kategori = [k for k in self.kategori if k['id'] != idk]
-        # reindex barang
-        self.reindex_all()
-        pause("Kategori dan barang terkait dihapus & ID dirapikan.")
+        with self.transaksi(f"hapus kategori {kat['kode']}"):
+            # hapus barang kategori, lalu kategorinya
+            self._hapus_rec('barang', self._idx_kategori.pop(idk, []))
+            self._set_seq_local(idk, None)
+            self._hapus_rec('kategori', [kat])
+        # kategori lain tidak berubah, jadi tidak perlu reindex
+        pause("Kategori dan barang terkait dihapus.")
 
     # ============================================================
     # BARANG (local_id & kode per kategori)
@@ -271,7 +1112,7 @@ class SimplePOS:
             elif pilih == "3":
                 self.hapus_barang(idk)
             elif pilih == "4":
-                self.reindex_barang_per_kategori()
+                self.reindex_barang_per_kategori(idk)
                 pause("Local ID & kode barang dirapikan untuk kategori ini.")
             elif pilih == "0":
                 break
@@ -279,7 +1120,7 @@ class SimplePOS:
                 pause("Pilihan tidak valid.")
 
     def tampil_barang_by_kategori(self, kategori_id):
-        rows = [b for b in self.barang if b['kategori_id'] == kategori_id]
+        rows = self._barang_in_kategori(kategori_id)
         if not rows:
             print("Belum ada barang.")
             return
@@ -305,21 +1146,27 @@ class SimplePOS:
         except:
             pause("Stok/Harga harus angka.")
             return
-        local_id = self._next_local_id_for_category(kategori_id)
-        kode = f"{kat['kode'].upper()}{local_id:03d}"
-        new_global_id = self._next_global_id(self.barang)
-        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        self.barang.append({
-            'id': new_global_id,
-            'kategori_id': kategori_id,
-            'local_id': local_id,
-            'kode': kode,
-            'nama': nama,
-            'stok': stok,
-            'harga': harga,
-            'created_at': now
-        })
-        pause(f"Barang '{nama}' berhasil ditambahkan dengan kode {kode}.")
+        b = self._buat_barang(kat, nama, stok, harga)
+        pause(f"Barang '{nama}' berhasil ditambahkan dengan kode {b['kode']}.")
+
+    def _buat_barang(self, kat, nama, stok, harga, sync=True):
+        return self._buat_barang_batch(kat, [(nama, stok, harga)], sync=sync)[0]
+
+    def _buat_barang_batch(self, kat, rows, sync=True):
+        # rows: [(nama, stok, harga), ...] untuk satu kategori; local_id & id global dialokasikan per blok
+        global_ids = self._alloc_ids('barang', len(rows))
+        now = int(time.time())
+        prefix = kat.kode.upper()
+        hasil = []
+        judul = f"tambah barang {rows[0][0]}" if len(rows) == 1 else f"tambah {len(rows)} barang ke {kat.kode}"
+        with self.transaksi(judul, sync):
+            local_ids = self._alloc_local_ids(kat['id'], len(rows))
+            for local_id, new_global_id, (nama, stok, harga) in zip(local_ids, global_ids, rows):
+                b = Barang(new_global_id, kat.id, local_id, f"{prefix}{local_id:03d}", nama, stok, harga, now)
+                self._tambah_rec('barang', b)
+                hasil.append(b)
+            self._alias_catat([(b.id, b.kode) for b in hasil])
+        return hasil
 
     def edit_barang(self, kategori_id):
         try:
@@ -327,8 +1174,8 @@ class SimplePOS:
         except:
             pause("Input tidak valid.")
             return
-        b = next((x for x in self.barang if x['kode'].upper() == kode and x['kategori_id'] == kategori_id), None)
-        if not b:
+        b = self._barang_by_kode(kode)
+        if not b or b['kategori_id'] != kategori_id:
             pause("Barang tidak ditemukan di kategori ini.")
             return
         nama_lama, stok_lama, harga_lama = b['nama'], b['stok'], b['harga']
@@ -341,9 +1188,12 @@ class SimplePOS:
         except:
             pause("Stok/Harga harus angka.")
             return
-        b['nama'] = nama_baru
-        b['stok'] = stok_final
-        b['harga'] = harga_final
+        ditahan = self.reservasi.ditahan(b.id)
+        if stok_final < ditahan:
+            pause(f"Stok tidak boleh kurang dari qty yang sedang ditahan keranjang ({ditahan}).")
+            return
+        with self.transaksi(f"edit barang {b['kode']}"):
+            self._ubah(b, nama=nama_baru, stok=stok_final, harga=harga_final)
         pause("Barang diperbarui.")
 
     def hapus_barang(self, kategori_id):
@@ -352,75 +1202,136 @@ class SimplePOS:
         except:
             pause("Input tidak valid.")
             return
-        b = next((x for x in self.barang if x['kode'].upper() == kode and x['kategori_id'] == kategori_id), None)
-        if not b:
+        b = self._barang_by_kode(kode)
+        if not b or b['kategori_id'] != kategori_id:
             pause("Barang tidak ditemukan.")
             return
         kon = input(f"Hapus barang '{b['nama']}' [{b['kode']}]? (y/n): ").lower()
         if kon != "y":
             pause("Dibatalkan.")
             return
-        # hapus - PERBAIKAN: gunakan AND bukan OR
-        self.barang = [x for x in self.barang if not (x['kode'].upper() == kode and x['kategori_id'] == kategori_id)]
-        # hapus penjualan terkait jika diinginkan (di sini kita hapus riwayat barang itu)
-        self.penjualan = [p for p in self.penjualan if p['kode_barang'] != kode]
-        # rapikan local_id/ kode
-        self.reindex_barang_per_kategori()
+        # hapus + reindex satu transaksi (satu undo)
+        with self.transaksi(f"hapus barang {b['kode']}"):
+            # riwayat penjualan tetap (menunjuk id barang, tampil dengan kode terakhirnya), jadi omzet tidak hilang
+            self._hapus_rec('barang', [b])
+            # rapikan local_id/ kode: cukup barang setelah posisi yang dihapus di kategori ini
+            self.reindex_barang_per_kategori(kategori_id, mulai=b['local_id'])
         pause("Barang dihapus & local_id dirapikan untuk kategori ini.")
 
     # ============================================================
     # PENJUALAN (pilih barang pakai kode seperti MA001)
     # ============================================================
-    def tampil_barang_penjualan(self):
+    def _baris_jual(self, r):
+        # baris dibuat ulang hanya kalau kode/nama/stok tersedia/harga barang itu berubah
+        tersedia = self.reservasi.tersedia(r)
+        key = (r.local_id, r.kode, r.nama, tersedia, r.harga)
+        c = self._cache_baris.get(r.id)
+        if c is None or c[0] != key:
+            c = (key, f"  {r.local_id:<3} {r.kode:<8} {r.nama:<25} {tersedia:<5} Rp {r.harga:,}")
+            self._cache_baris[r.id] = c
+        return c[1]
+
+    def _header_jual(self, kat, lanjutan=False):
+        key = (kat.nama, kat.kode)
+        c = self._cache_header.get(kat.id)
+        if c is None or c[0] != key:
+            judul = f"\n== {kat.nama} (Kode: {kat.kode}) =="
+            c = (key, colored(judul, "96"), colored(judul + " (lanjutan)", "96"))
+            self._cache_header[kat.id] = c
+        return c[2] if lanjutan else c[1]
+
+    def _sumber_jual(self, cari=None):
+        # [(kategori, [barang urut local_id]), ...]
+        kats = sorted(self.kategori, key=lambda x: x['id'])
+        if not cari:
+            return [(kat, self._barang_in_kategori(kat['id'])) for kat in kats]
+        # hasil pencarian (kode diawali teks / nama mirip), dikelompokkan per kategori
+        per_kat = {}
+        for bid in self._cari.cari(cari, limit=HASIL_CARI):
+            b = self._barang_by_id(bid)
+            per_kat.setdefault(b['kategori_id'], []).append(b)
+        return [(kat, per_kat[kat['id']]) for kat in kats if kat['id'] in per_kat]
+
+    def _baris_per_halaman(self):
+        return max(5, shutil.get_terminal_size((80, 24)).lines - 12)
+
+    def tampil_barang_penjualan(self, halaman=0, cari=None, per_halaman=None):
+        # return (lines, halaman, jumlah_halaman); yang diformat hanya baris di halaman yang tampil
+        per_halaman = per_halaman or self._baris_per_halaman()
         if not self.barang:
-            print("Belum ada barang.")
-            return
+            return ["Belum ada barang."], 0, 1
+        sumber = self._sumber_jual(cari)
+        if not sumber:
+            return [f"Tidak ada barang yang cocok dengan '{cari}'."], 0, 1
+        # kategori kosong tetap makan satu baris ("Belum ada barang")
+        total = sum(max(1, len(rows)) for _, rows in sumber)
+        n_hal = (total + per_halaman - 1) // per_halaman
+        halaman = min(max(halaman, 0), n_hal - 1)
+        lewati = halaman * per_halaman
+        sisa = per_halaman
+        out = []
         # group by category for neat display
-        for kat in sorted(self.kategori, key=lambda x: x['id']):
-            print(colored(f"\n== {kat['nama']} (Kode: {kat['kode']}) ==", "96"))
-            rows = [b for b in self.barang if b['kategori_id'] == kat['id']]
+        for kat, rows in sumber:
+            if sisa <= 0:
+                break
+            n = max(1, len(rows))
+            if lewati >= n:
+                lewati -= n
+                continue
+            out.append(self._header_jual(kat, lanjutan=lewati > 0))
             if not rows:
-                print("  (Belum ada barang)")
+                out.append("  (Belum ada barang)")
+                sisa -= 1
                 continue
-            print(f"  {'No':<3} {'Kode':<8} {'Nama':<25} {'Stok':<5} {'Harga'}")
-            for r in sorted(rows, key=lambda x: x['local_id']):
-                print(f"  {r['local_id']:<3} {r['kode']:<8} {r['nama']:<25} {r['stok']:<5} Rp {r['harga']:,}")
+            out.append(f"  {'No':<3} {'Kode':<8} {'Nama':<25} {'Stok':<5} {'Harga'}")
+            for r in rows[lewati:lewati + sisa]:
+                out.append(self._baris_jual(r))
+                sisa -= 1
+            lewati = 0
+        return out, halaman, n_hal
 
     def menu_jual(self):
+        halaman = 0
+        cari = None
         while True:
-            clear()
-            print(colored("🛒 MENU PENJUALAN (Masukkan Kode barang, mis: MA001)", "94"))
-            self.tampil_barang_penjualan()
-            print("\nKetik 0 untuk kembali.")
+            lines, halaman, n_hal = self.tampil_barang_penjualan(halaman, cari)
+            layar = [colored("🛒 MENU PENJUALAN (Masukkan Kode barang, mis: MA001)", "94")]
+            if cari:
+                layar.append(colored(f"Pencarian: '{cari}'  (ketik / saja untuk reset)", "93"))
+            layar += lines
+            layar.append(f"\nHalaman {halaman + 1}/{n_hal}  |  N = berikutnya, P = sebelumnya, /teks = cari")
+            layar.append("Ketik 0 untuk kembali.")
+            tulis_layar(layar)
             kode = input("\nMasukkan Kode barang: ").strip().upper()
             if kode == "0" or kode == "":
                 return
-            b = next((x for x in self.barang if x['kode'].upper() == kode), None)
+            if kode == "N":
+                halaman += 1
+                continue
+            if kode == "P":
+                halaman -= 1
+                continue
+            if kode.startswith("/"):
+                cari = kode[1:].strip() or None
+                halaman = 0
+                continue
+            b = self._barang_by_kode(kode)
             if not b:
                 pause("Barang tidak ditemukan. Pastikan kode benar.")
                 continue
-            print(f"\nNama: {b['nama']}  |  Stok: {b['stok']}  |  Harga: Rp {b['harga']:,}")
+            ditahan = self.reservasi.ditahan(b.id)
+            print(f"\nNama: {b['nama']}  |  Stok: {self.reservasi.tersedia(b)}"
+                  f"{f' (+{ditahan} ditahan keranjang)' if ditahan else ''}  |  Harga: Rp {b['harga']:,}")
             try:
                 jumlah = int(input("Jumlah beli: "))
             except:
                 pause("Jumlah harus angka.")
                 continue
-            if jumlah <= 0:
-                pause("Jumlah harus > 0.")
-                continue
-            if jumlah > b['stok']:
-                pause(f"Stok tidak cukup. Stok tersedia: {b['stok']}")
+            try:
+                self._tambah_ke_keranjang(self.keranjang, b, jumlah)
+            except POSError as e:
+                pause(str(e))
                 continue
-            # kurangi stok
-            b['stok'] -= jumlah
-            item = {
-                "kode_barang": b['kode'],
-                "nama": b['nama'],
-                "jumlah": jumlah,
-                "harga_satuan": b['harga'],
-                "total": jumlah * b['harga']
-            }
-            self.keranjang.append(item)
             print("\nItem ditambahkan ke keranjang.")
             while True:
                 print("\n1. Tambah barang lagi")
@@ -440,11 +1351,68 @@ class SimplePOS:
                 else:
                     print("Pilihan tidak valid.")
 
-    def _rollback_keranjang_stok(self):
-        for it in self.keranjang:
-            b = next((x for x in self.barang if x['kode'] == it['kode_barang']), None)
+    # ----------------------------
+    # core transaksi (dipakai menu UI & TransactionEngine)
+    # ----------------------------
+    def _qty_ditahan(self):
+        return self.reservasi.qty_ditahan()
+
+    def _tambah_ke_keranjang(self, keranjang, b, jumlah):
+        # validasi lalu tahan stok untuk keranjang ini (b.stok belum berubah, yang turun qty tersedia);
+        # cek + tahan atomik di bawah lock barang itu, jadi barang tidak bisa oversell antar kasir
+        if jumlah <= 0:
+            raise POSError("Jumlah harus > 0.")
+        if not self.reservasi.tahan(keranjang.kunci, b, jumlah):
+            raise POSError(f"Stok tidak cukup. Stok tersedia: {self.reservasi.tersedia(b)}")
+        item = CartLine(b.id, b.kode, b.nama, jumlah, b.harga, jumlah * b.harga)
+        keranjang.append(item)
+        return item
+
+    def _kembalikan_item(self, keranjang, item):
+        self.reservasi.lepas(keranjang.kunci, item.barang_id, item.jumlah)
+
+    def _rollback_keranjang_stok(self, keranjang=None):
+        self.reservasi.batal((self.keranjang if keranjang is None else keranjang).kunci)
+
+    def _commit_keranjang(self, keranjang, sync=True):
+        # simpan isi keranjang sebagai penjualan; return (waktu, total).
+        # bagian yang menyentuh data bersama singkat & di bawah _commit_lock; fsync di luar lock
+        # supaya kasir lain bisa ikut group commit storage
+        # hold keranjang dipastikan masih utuh dulu (yang sudah kedaluwarsa ditahan ulang kalau stok masih ada)
+        butuh = {}
+        for it in keranjang:
+            b = self._barang_by_id(it.barang_id)
             if b:
-                b['stok'] += it['jumlah']
+                butuh[b.id] = (b, butuh.get(b.id, (b, 0))[1] + it.jumlah)
+        kurang = self.reservasi.ambil(keranjang.kunci, butuh.values())
+        if kurang is not None:
+            raise POSError(f"Keranjang kedaluwarsa & stok {kurang.kode} tidak cukup lagi. "
+                           f"Stok tersedia: {self.reservasi.tersedia(kurang)}")
+        ts = int(time.time())
+        waktu = dari_epoch(ts)
+        total_final = 0
+        lines = []
+        with self._commit_lock:
+            ids = self._alloc_ids('penjualan', len(keranjang))
+            for new_id, it in zip(ids, keranjang):
+                b = self._barang_by_id(it.barang_id)
+                if b:
+                    # kode bisa sudah berubah (reindex) sejak barang masuk keranjang
+                    it.kode_barang = b.kode
+                rec = Penjualan(new_id, it.kode_barang, it.nama, it.jumlah, it.harga_satuan, it.total, ts, it.barang_id)
+                self.penjualan.append(rec)
+                self._log('put', 'penjualan', rec)
+                if b:
+                    # qty yang ditahan keranjang jadi terjual: stok baru berkurang di sini
+                    self.reservasi.jual(b, it.jumlah)
+                    self._log('stok', b.id, -it.jumlah)
+                    self.analitik.catat(b, it.jumlah, ts)
+                lines.append((it.barang_id, b.kategori_id if b else None, it.jumlah, it.total))
+                total_final += it.total
+            self.rollup.catat(ts, lines)
+        if sync:
+            self._commit()
+        return waktu, total_final
 
     def menu_keranjang(self):
        while  True:
@@ -482,9 +1450,7 @@ class SimplePOS:
                     pause("Nomor item tidak valid.")
                     continue
                 item = self.keranjang.pop(idx - 1)
-                b = next((x for x in self.barang if x['kode'] == item['kode_barang']), None)
-                if b:
-                    b['stok'] += item['jumlah']
+                self._kembalikan_item(self.keranjang, item)
                 pause("Item dihapus & stok dikembalikan.")
             elif pilih == "0":
                 self._rollback_keranjang_stok()
@@ -498,21 +1464,12 @@ class SimplePOS:
         if not self.keranjang:
             pause("Keranjang kosong.")
             return
-        waktu = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        total_final = 0
-        for it in self.keranjang:
-            new_id = self._next_global_id(self.penjualan)
-            rec = {
-                'id': new_id,
-                'kode_barang': it['kode_barang'],
-                'nama_barang': it['nama'],
-                'jumlah': it['jumlah'],
-                'harga_satuan': it['harga_satuan'],
-                'total_harga': it['total'],
-                'created_at': waktu
-            }
-            self.penjualan.append(rec)
-            total_final += it['total']
+        no_awal = self._no_peringatan
+        try:
+            waktu, total_final = self._commit_keranjang(self.keranjang)
+        except POSError as e:
+            pause(str(e))
+            return
         clear()
         print(colored("🧾 NOTA PEMBELIAN", "92"))
         print(f"Tanggal: {waktu}")
@@ -521,29 +1478,193 @@ class SimplePOS:
         print("-" * 60)
         print(colored(f"TOTAL BAYAR: Rp {total_final:,}", "93"))
         print("-" * 60)
+        for no, _, barang_id, hari in self.peringatan:
+            b = self._barang_by_id(barang_id)
+            if no > no_awal and b:
+                print(colored(f"⚠ Stok {b.kode} - {b.nama} tinggal {b.stok}, perkiraan habis {self._teks_hari(hari)}", "93"))
         self.keranjang.clear()
-        pause("Transaksi selesai dan disimpan (in-memory).")
+        pause("Transaksi selesai dan disimpan." if self.storage else "Transaksi selesai dan disimpan (in-memory).")
 
     # ============================================================
     # REKAP PENJUALAN
     # ============================================================
-    def _print_rekap(self, rows, title):
+    def _print_rekap(self, rows, title, total=None, urut=True):
+        # total bisa dihitung di luar (agregasi ledger) supaya tidak dijumlah ulang per baris.
+        # urut=False: rows di-stream apa adanya (mis. ledger yang sudah urut id), ditulis per 1000 baris
         clear()
         print(colored(title, "96"))
         print("-" * 100)
-        if not rows:
+        if urut:
+            rows = sorted(rows, key=lambda x: x.id)
+        out = []
+        total_all = 0
+        ada = False
+        for r in rows:
+            if not ada:
+                out.append(f"{'ID':<4} {'Kode':<8} {'Barang':<30} {'Qty':<5} {'Harga':<12} {'Total':<12} {'Tanggal'}")
+                out.append("-" * 100)
+                ada = True
+            out.append(f"{r.id:<4} {r.kode_barang:<8} {r.nama_barang:<30} {r.jumlah:<5} Rp {r.harga_satuan:<10,} Rp {r.total_harga:<10,} {r['created_at']}")
+            if total is None:
+                total_all += r.total_harga
+            if len(out) >= 1000:
+                sys.stdout.write("\n".join(out) + "\n")
+                out = []
+        if out:
+            sys.stdout.write("\n".join(out) + "\n")
+        if not ada:
             print("Tidak ada transaksi untuk periode ini.")
             print("-" * 100)
             return
-        print(f"{'ID':<4} {'Kode':<8} {'Barang':<30} {'Qty':<5} {'Harga':<12} {'Total':<12} {'Tanggal'}")
+        if total is not None:
+            total_all = total
         print("-" * 100)
+        print(colored(f"TOTAL: Rp {total_all:,}", "93"))
+
+    def _rekap_rentang(self, d1, d2, title):
+        # d1..d2 inklusif; cukup binary search di time index ledger (dan arsip) lalu jumlahkan slice-nya.
+        # baris di-stream urut waktu (tanpa list / sort)
+        t0 = epoch_tanggal(d1)
+        t1 = epoch_tanggal(d2 + timedelta(days=1))
+        self._print_rekap(self._riwayat_rows(t0, t1), title, total=self._riwayat_total(t0, t1), urut=False)
+
+    def _print_ringkasan(self, dim, title, label=None, rows=None):
+        # ringkasan langsung dari rollup: O(jumlah bucket), tidak menyentuh baris penjualan
+        clear()
+        print(colored(title, "96"))
+        print("-" * 80)
+        if rows is None:
+            rows = self.rollup.ringkas(dim)
+            if label:
+                rows.sort(key=lambda r: label(r[0]))
+        if not rows:
+            print("Belum ada transaksi.")
+            print("-" * 80)
+            return
+        print(f"{'Periode / Item':<40} {'Trx':<6} {'Qty':<8} {'Omzet'}")
+        print("-" * 80)
         total_all = 0
-        for r in sorted(rows, key=lambda x: x['id']):
-            print(f"{r['id']:<4} {r['kode_barang']:<8} {r['nama_barang']:<30} {r['jumlah']:<5} Rp {r['harga_satuan']:<10,} Rp {r['total_harga']:<10,} {r['created_at']}")
-            total_all += r['total_harga']
-        print("-" * 100)
+        for key, omzet, qty, trx in rows:
+            nama = label(key) if label else str(key)
+            print(f"{nama:<40} {trx:<6} {qty:<8} Rp {omzet:,}")
+            total_all += omzet
+        print("-" * 80)
         print(colored(f"TOTAL: Rp {total_all:,}", "93"))
 
+    def _label_kode(self, kunci):
+        # kunci: id barang (atau kode untuk data lama); barang terhapus tampil dengan kode terakhirnya
+        b = self._barang_kunci(kunci)
+        if b:
+            return f"{b.kode} - {b.nama}"
+        kode = self.alias.kode_terakhir(kunci) if isinstance(kunci, int) else kunci
+        return f"{kode or f'#{kunci}'} (sudah dihapus)"
+
+    def _label_kategori(self, kategori_id):
+        kat = next((k for k in self.kategori if k['id'] == kategori_id), None)
+        return f"{kat['kode']} - {kat['nama']}" if kat else "(tanpa kategori)"
+
+    def menu_ringkasan(self):
+        while True:
+            clear()
+            print(colored("📈 RINGKASAN PENJUALAN (Rollup)", "96"))
+            print("1. Per Hari")
+            print("2. Per Minggu (ISO)")
+            print("3. Per Bulan")
+            print("4. Per Barang")
+            print("5. Per Kategori")
+            print("0. Kembali")
+            pilih = input("\nPilih: ").strip()
+            if pilih == "1":
+                self._print_ringkasan('hari', "📈 RINGKASAN PER HARI")
+            elif pilih == "2":
+                self._print_ringkasan('minggu', "📈 RINGKASAN PER MINGGU")
+            elif pilih == "3":
+                self._print_ringkasan('bulan', "📈 RINGKASAN PER BULAN")
+            elif pilih == "4":
+                self._print_ringkasan('kode', "📈 RINGKASAN PER BARANG", label=self._label_kode)
+            elif pilih == "5":
+                self._print_ringkasan('kategori', "📈 RINGKASAN PER KATEGORI", label=self._label_kategori)
+            elif pilih == "0":
+                return
+            else:
+                pause("Pilihan tidak valid.")
+                continue
+            pause()
+
+    def menu_rekap_paralel(self):
+        # agregasi ledger per partisi waktu di beberapa proses (rekap_paralel.py)
+        clear()
+        print(colored("⚙️  REKAP PARALEL", "96"))
+        t1 = input("Tanggal mulai (YYYY-MM-DD, kosong = semua): ").strip()
+        t2 = input("Tanggal akhir (YYYY-MM-DD, kosong = sampai sekarang): ").strip() if t1 else ""
+        if (t1 and not self._valid_date(t1)) or (t2 and not self._valid_date(t2)):
+            pause("Format tanggal tidak valid.")
+            return
+        print("Group by: 1. Barang  2. Kategori  3. Hari  4. Minggu  5. Bulan")
+        dim = {"1": 'kode', "2": 'kategori', "3": 'hari', "4": 'minggu', "5": 'bulan'}.get(input("Pilih: ").strip())
+        if not dim:
+            pause("Pilihan tidak valid.")
+            return
+        top = input("Top N omzet (kosong = semua): ").strip()
+        if top and not top.isdigit():
+            pause("Top N harus angka.")
+            return
+        a = epoch_tanggal(datetime.strptime(t1, "%Y-%m-%d").date()) if t1 else None
+        b = epoch_tanggal(datetime.strptime(t2, "%Y-%m-%d").date() + timedelta(days=1)) if t2 else None
+
+        def kategori_kode(kunci):
+            kat = self.rollup.kategori_terjual(kunci)
+            if kat is None:
+                brg = self._barang_kunci(kunci)
+                kat = brg.kategori_id if brg else None
+            return kat
+        t0 = time.perf_counter()
+        hasil = MesinRekap(self.penjualan, kategori_kode, arsip=self.arsip).agregasi(a, b)
+        durasi = time.perf_counter() - t0
+        rows = hasil.top(int(top), dim) if top else hasil.ringkas(dim)
+        label = {'kode': self._label_kode, 'kategori': self._label_kategori}.get(dim)
+        self._print_ringkasan(dim, f"⚙️  REKAP PARALEL per {dim} — {t1 or 'awal'} s/d {t2 or 'sekarang'}", label, rows)
+        pause(f"Selesai dalam {durasi:.2f} detik. Tekan Enter...")
+
+    def menu_ekspor_rekap(self):
+        # rekap ke file untuk akunting: di-stream (katalog_io), memori tetap walau jutaan baris
+        clear()
+        print(colored("📤 EKSPOR REKAP (CSV / JSONL / TXT sesuai ekstensi file, tambah .gz untuk kompres)", "96"))
+        print("1. Detail penjualan (per baris)")
+        print("2. Ringkasan per Hari/Minggu/Bulan/Barang/Kategori")
+        pilih = input("Pilih: ").strip()
+        if pilih == "1":
+            t1 = input("Tanggal mulai (YYYY-MM-DD, kosong = semua): ").strip()
+            t2 = input("Tanggal akhir (YYYY-MM-DD, kosong = sampai sekarang): ").strip() if t1 else ""
+            if (t1 and not self._valid_date(t1)) or (t2 and not self._valid_date(t2)):
+                pause("Format tanggal tidak valid.")
+                return
+            a = epoch_tanggal(datetime.strptime(t1, "%Y-%m-%d").date()) if t1 else None
+            b = epoch_tanggal(datetime.strptime(t2, "%Y-%m-%d").date() + timedelta(days=1)) if t2 else None
+            judul = f"REKAP PENJUALAN {t1 or 'awal'} s/d {t2 or 'sekarang'}"
+            ekspor = lambda path: ekspor_penjualan(self, path, a, b, judul)
+        elif pilih == "2":
+            print("Group by: 1. Hari  2. Minggu  3. Bulan  4. Barang  5. Kategori")
+            dim = {"1": 'hari', "2": 'minggu', "3": 'bulan', "4": 'kode', "5": 'kategori'}.get(input("Pilih: ").strip())
+            if not dim:
+                pause("Pilihan tidak valid.")
+                return
+            ekspor = lambda path: ekspor_ringkasan(self, path, dim)
+        else:
+            pause("Pilihan tidak valid.")
+            return
+        path = input("Path file tujuan (.csv / .jsonl / .txt, boleh + .gz): ").strip()
+        if not path:
+            pause("Path tidak boleh kosong.")
+            return
+        t0 = time.perf_counter()
+        try:
+            n = ekspor(path)
+        except OSError as e:
+            pause(f"Gagal menulis file: {e}")
+            return
+        pause(f"{n:,} baris diekspor ke {path} dalam {time.perf_counter() - t0:.2f} detik.")
+
     def _valid_date(self, s):
         try:
             datetime.strptime(s, "%Y-%m-%d")
@@ -559,20 +1680,22 @@ class SimplePOS:
             print("2. Rekap Mingguan")
             print("3. Rekap Bulanan")
             print("4. Rekap Semua")
+            print("5. Ringkasan per Hari/Minggu/Bulan/Barang/Kategori")
+            print("6. Rekap Paralel (group-by & top-N, untuk riwayat besar)")
+            print("7. Ekspor rekap ke file (CSV / JSONL / TXT, .gz)")
             print("0. Kembali")
             pilih = input("\nPilih: ").strip()
             if pilih == "1":
                 today = datetime.now().date()
-                rows = [p for p in self.penjualan if datetime.strptime(p['created_at'], "%Y-%m-%d %H:%M:%S").date() == today]
-                self._print_rekap(rows, "📅 REKAP HARIAN — Hari Ini")
+                self._rekap_rentang(today, today, "📅 REKAP HARIAN — Hari Ini")
                 ans = input("\nGunakan tanggal lain? (y/n): ").strip().lower()
                 if ans == "y":
                     t = input("Masukkan tanggal (YYYY-MM-DD): ").strip()
                     if not self._valid_date(t):
                         pause("Format tanggal tidak valid.")
                         continue
-                    rows2 = [p for p in self.penjualan if p['created_at'].startswith(t)]
-                    self._print_rekap(rows2, f"📅 REKAP HARIAN — {t}")
+                    d = datetime.strptime(t, "%Y-%m-%d").date()
+                    self._rekap_rentang(d, d, f"📅 REKAP HARIAN — {t}")
                     pause()
                 else:
                     pause()
@@ -580,8 +1703,7 @@ class SimplePOS:
                 today = datetime.now().date()
                 start_of_week = today - timedelta(days=today.weekday())
                 end_of_week = start_of_week + timedelta(days=6)
-                rows = [p for p in self.penjualan if start_of_week <= datetime.strptime(p['created_at'], "%Y-%m-%d %H:%M:%S").date() <= end_of_week]
-                self._print_rekap(rows, f"📅 REKAP MINGGUAN — {start_of_week} s/d {end_of_week}")
+                self._rekap_rentang(start_of_week, end_of_week, f"📅 REKAP MINGGUAN — {start_of_week} s/d {end_of_week}")
                 ans = input("\nGunakan rentang minggu lain? (y/n): ").strip().lower()
                 if ans == "y":
                     t1 = input("Masukkan tanggal mulai (YYYY-MM-DD): ").strip()
@@ -594,32 +1716,154 @@ class SimplePOS:
                     if d2 < d1:
                         pause("Tanggal akhir harus sama atau setelah tanggal mulai.")
                         continue
-                    rows2 = [p for p in self.penjualan if d1 <= datetime.strptime(p['created_at'], "%Y-%m-%d %H:%M:%S").date() <= d2]
-                    self._print_rekap(rows2, f"📅 REKAP MINGGUAN — {t1} s/d {t2}")
+                    self._rekap_rentang(d1, d2, f"📅 REKAP MINGGUAN — {t1} s/d {t2}")
                     pause()
                 else:
                     pause()
             elif pilih == "3":
                 now = datetime.now()
-                rows = [
-                    p for p in self.penjualan
-                    if datetime.strptime(p['created_at'], "%Y-%m-%d %H:%M:%S").month == now.month
-                    and datetime.strptime(p['created_at'], "%Y-%m-%d %H:%M:%S").year == now.year
-                ]
-                self._print_rekap(rows, f"📅 REKAP BULANAN — {now.strftime('%B %Y')}")
+                awal_bulan = now.date().replace(day=1)
+                akhir_bulan = (awal_bulan + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+                self._rekap_rentang(awal_bulan, akhir_bulan, f"📅 REKAP BULANAN — {now.strftime('%B %Y')}")
                 pause()
             elif pilih == "4":
-                self._print_rekap(self.penjualan, "📊 REKAP SEMUA PENJUALAN")
+                # arsip & ledger sudah urut: di-stream tanpa sort / list penuh
+                self._print_rekap(self._riwayat_rows(), "📊 REKAP SEMUA PENJUALAN", total=self._riwayat_total(), urut=False)
                 pause()
+            elif pilih == "5":
+                self.menu_ringkasan()
+            elif pilih == "6":
+                self.menu_rekap_paralel()
+            elif pilih == "7":
+                self.menu_ekspor_rekap()
             elif pilih == "0":
                 return
             else:
                 pause("Pilihan tidak valid.")
 
+# ============================================================
+#  TRANSACTION ENGINE (headless, tanpa input()/print)
+# ============================================================
+class TransactionEngine:
+    # API transaksi untuk scanner / terminal impor / load generator.
+    # Memakai reservasi stok & rollback yang sama dengan menu_jual/menu_keranjang.
+    # Aman dipakai banyak thread (satu thread / task per lajur kasir): tiap sesi punya keranjang sendiri,
+    # stok dikunci per barang di SimplePOS. cart_id = kunci reservasi; keranjang yang ditinggal lebih dari
+    # RESERVASI_TTL dibuang oleh expirer reservasi (stoknya dilepas).
+    def __init__(self, pos):
+        self.pos = pos
+        self._carts = {}
+        pos.reservasi.pendengar.append(self._kedaluwarsa)
+
+    def _kedaluwarsa(self, cart_id):
+        self._carts.pop(cart_id, None)
+
+    def _cart(self, cart_id):
+        cart = self._carts.get(cart_id)
+        if cart is None:
+            raise KeranjangTidakAda("Keranjang tidak ditemukan / sudah kedaluwarsa.")
+        return cart
+
+    def _barang(self, kode):
+        b = self.pos._barang_by_kode(kode.strip().upper())
+        if not b:
+            raise POSError("Barang tidak ditemukan. Pastikan kode benar.")
+        return b
+
+    def buka(self):
+        cart_id = self.pos.reservasi.buka()
+        self._carts[cart_id] = Keranjang(cart_id)
+        return cart_id
+
+    def cari(self, q, limit=20):
+        # pencarian kode (prefix) / nama (toleran typo) untuk scanner & terminal
+        return [self.pos._barang_by_id(bid) for bid in self.pos._cari.cari(q, limit)]
+
+    def isi(self, cart_id):
+        return list(self._cart(cart_id))
+
+    def tambah(self, cart_id, kode, jumlah):
+        cart = self._cart(cart_id)
+        return self.pos._tambah_ke_keranjang(cart, self._barang(kode), jumlah)
+
+    def hapus(self, cart_id, no):
+        # no: nomor baris mulai 1 (sama dengan tampilan keranjang)
+        cart = self._cart(cart_id)
+        if no < 1 or no > len(cart):
+            raise POSError("Nomor item tidak valid.")
+        item = cart.pop(no - 1)
+        self.pos._kembalikan_item(cart, item)
+        return item
+
+    def batal(self, cart_id):
+        cart = self._carts.pop(cart_id, None)
+        if cart:
+            self.pos._rollback_keranjang_stok(cart)
+
+    def commit(self, cart_id, sync=True):
+        cart = self._carts.pop(cart_id, None)
+        if cart is None:
+            raise KeranjangTidakAda("Keranjang tidak ditemukan / sudah kedaluwarsa.")
+        if not cart:
+            self._carts[cart_id] = cart
+            raise POSError("Keranjang kosong.")
+        try:
+            waktu, total = self.pos._commit_keranjang(cart, sync=sync)
+        except POSError:
+            self._carts[cart_id] = cart
+            raise
+        return {'waktu': waktu, 'items': cart, 'total': total}
+
+    def _validasi_basket(self, basket):
+        # basket: [(kode, jumlah), ...]; stok dicek untuk total qty per barang sekaligus
+        butuh = {}
+        for kode, jumlah in basket:
+            b = self._barang(kode)
+            if jumlah <= 0:
+                raise POSError("Jumlah harus > 0.")
+            butuh[b.id] = (b, butuh.get(b.id, (b, 0))[1] + jumlah)
+        for b, jumlah in butuh.values():
+            tersedia = self.pos.reservasi.tersedia(b)
+            if jumlah > tersedia:
+                raise POSError(f"Stok {b.kode} tidak cukup. Stok tersedia: {tersedia}")
+
+    def checkout(self, basket, sync=True):
+        # satu nota dalam satu panggilan: semua baris valid -> commit, satu saja gagal -> tidak ada yang berubah
+        if not basket:
+            raise POSError("Keranjang kosong.")
+        self._validasi_basket(basket)
+        cart = Keranjang(self.pos.reservasi.buka())
+        try:
+            for kode, jumlah in basket:
+                self.pos._tambah_ke_keranjang(cart, self._barang(kode), jumlah)
+            waktu, total = self.pos._commit_keranjang(cart, sync=sync)
+        except POSError:
+            # stok berubah oleh kasir lain di antara validasi & reservasi
+            self.pos._rollback_keranjang_stok(cart)
+            raise
+        return {'waktu': waktu, 'items': cart, 'total': total}
+
+    def checkout_banyak(self, baskets):
+        # banyak nota sekaligus, satu fsync di akhir; hasil per nota berupa dict nota atau POSError
+        hasil = []
+        for basket in baskets:
+            try:
+                hasil.append(self.checkout(basket, sync=False))
+            except POSError as e:
+                hasil.append(e)
+        self.pos._commit()
+        return hasil
+
 # ============================================================
 # RUN
 # ============================================================
 if __name__ == "__main__":
-    app = SimplePOS()
+    if os.name == "nt":
+        os.system("")  # aktifkan escape ANSI di console Windows
+    app = SimplePOS(buat_storage(STORAGE_BACKEND, storage_path()))
+    if METRIK_AKTIF:
+        METRIK.pasang(app)
+    if METRIK_PORT:
+        METRIK.layani(METRIK_PORT, app)
     app.welcome_screen()
     app.main_menu()
@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+# rekap_paralel.py
+# mesin rekap untuk riwayat besar: ledger dibagi per rentang waktu, tiap partisi diagregasi di proses
+# terpisah (ProcessPoolExecutor) langsung dari shared memory, hasil parsial digabung di proses utama.
+# Periode yang sudah diarsip (arsip.py) dibaca worker langsung lewat mmap file arsipnya.
+#   python rekap_paralel.py --rows 5000000 --workers 1,2,4,8     -> uji skala dengan ledger sintetis
+import argparse
+import heapq
+import itertools
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from multiprocessing import shared_memory
+
+from arsip import ArsipPeriode
+from ledger import LedgerPenjualan
+from model import epoch_tanggal
+
+MIN_PARALEL = 200_000     # di bawah ini agregasi di proses sendiri (biaya start worker lebih mahal)
+PARTISI_PER_WORKER = 4    # partisi lebih kecil dari jumlah worker supaya beban rata
+KOLOM = ('item', 'jumlah', 'total', 'ts')
+DIMENSI = ('kode', 'kategori', 'hari', 'minggu', 'bulan')
+# worker dibuat lewat forkserver (spawn di Windows), bukan fork: proses POS punya thread lain (expirer
+# reservasi, snapshot latar, server metrik) dan anak hasil fork bisa mewarisi lock yang sedang dipegang
+MP_START = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+
+# ============================================================
+#  worker
+# ============================================================
+def _lampirkan(spec):
+    # spec: {kolom: (nama shm, typecode)}; return (shm list, {kolom: memoryview bertipe})
+    shms, kol = [], {}
+    for nama, (shm_nama, typecode) in spec.items():
+        shm = shared_memory.SharedMemory(name=shm_nama)
+        shms.append(shm)
+        kol[nama] = shm.buf.cast(typecode)
+    return shms, kol
+
+
+def agregasi_partisi(kol, lo, hi):
+    # kol: kolom ledger (array / memoryview) + 'order' opsional (permutasi urut waktu)
+    # return ({item: [omzet, qty, trx]}, {hari 'YYYY-mm-dd': [omzet, qty, trx]}) untuk posisi [lo, hi)
+    item, jumlah, total, ts = kol['item'], kol['jumlah'], kol['total'], kol['ts']
+    order = kol.get('order')
+    per_item, per_hari = {}, {}
+    awal = batas = None
+    cur = None
+    for p in range(lo, hi):
+        i = order[p] if order is not None else p
+        t = total[i]
+        j = jumlah[i]
+        b = per_item.get(item[i])
+        if b is None:
+            b = per_item[item[i]] = [0, 0, 0]
+        b[0] += t
+        b[1] += j
+        b[2] += 1
+        s = ts[i]
+        if batas is None or s >= batas or s < awal:
+            # posisi urut waktu -> batas hari cukup dihitung ulang saat ganti hari
+            d = datetime.fromtimestamp(s).date()
+            awal, batas = epoch_tanggal(d), epoch_tanggal(d + timedelta(days=1))
+            cur = per_hari.setdefault(str(d), [0, 0, 0])
+        cur[0] += t
+        cur[1] += j
+        cur[2] += 1
+    return per_item, per_hari
+
+
+def _ke_kunci(per_item, kunci):
+    # index intern -> kunci barang (id barang; tabel intern berbeda per ledger / arsip)
+    hasil = {}
+    for it, v in per_item.items():
+        HasilRekap._gabung(hasil, kunci[it], v)
+    return hasil
+
+
+def _tugas(spec, lo, hi):
+    shms, kol = _lampirkan(spec)
+    try:
+        return agregasi_partisi(kol, lo, hi)
+    finally:
+        for v in kol.values():
+            v.release()
+        for shm in shms:
+            shm.close()
+
+
+def _tugas_arsip(path, lo, hi):
+    arsip = ArsipPeriode(path)
+    try:
+        per_item, per_hari = agregasi_partisi({nama: getattr(arsip, nama) for nama in KOLOM}, lo, hi)
+        return _ke_kunci(per_item, arsip.tabel_kunci()), per_hari
+    finally:
+        arsip.tutup()
+
+
+# ============================================================
+#  hasil
+# ============================================================
+class HasilRekap:
+    def __init__(self, per_kode, per_hari, kategori_kode=None):
+        self.per_kode = per_kode          # kunci barang (id barang / kode data lama) -> [omzet, qty, trx]
+        self.per_hari = per_hari          # 'YYYY-mm-dd' -> [omzet, qty, trx]
+        self.kategori_kode = kategori_kode or (lambda kode: None)
+
+    @staticmethod
+    def _gabung(hasil, key, v):
+        b = hasil.get(key)
+        if b is None:
+            hasil[key] = list(v)
+        else:
+            b[0] += v[0]
+            b[1] += v[1]
+            b[2] += v[2]
+
+    def total(self):
+        return sum(v[0] for v in self.per_hari.values())
+
+    def group(self, dim):
+        # {key: [omzet, qty, trx]}
+        hasil = {}
+        if dim == 'kode':
+            hasil = {k: list(v) for k, v in self.per_kode.items()}
+        elif dim == 'kategori':
+            for kode, v in self.per_kode.items():
+                self._gabung(hasil, self.kategori_kode(kode), v)
+        elif dim == 'hari':
+            hasil = {k: list(v) for k, v in self.per_hari.items()}
+        elif dim == 'bulan':
+            for hari, v in self.per_hari.items():
+                self._gabung(hasil, hari[:7], v)
+        elif dim == 'minggu':
+            for hari, v in self.per_hari.items():
+                iso = datetime.strptime(hari, "%Y-%m-%d").isocalendar()
+                self._gabung(hasil, f"{iso[0]}-W{iso[1]:02d}", v)
+        else:
+            raise ValueError(f"dimensi tidak dikenal: {dim}")
+        return hasil
+
+    def ringkas(self, dim):
+        # [(key, omzet, qty, trx)] urut key, sama bentuknya dengan RollupPenjualan.ringkas
+        return [(k, v[0], v[1], v[2]) for k, v in sorted(self.group(dim).items(), key=lambda x: str(x[0]))]
+
+    def top(self, n, dim='kode', by='omzet'):
+        # n item teratas berdasarkan omzet / qty / trx
+        i = ('omzet', 'qty', 'trx').index(by)
+        return [(k, v[0], v[1], v[2]) for k, v in heapq.nlargest(n, self.group(dim).items(), key=lambda x: x[1][i])]
+
+
+# ============================================================
+#  mesin rekap
+# ============================================================
+class MesinRekap:
+    def __init__(self, ledger, kategori_kode=None, workers=None, arsip=None):
+        self.ledger = ledger
+        self.arsip = arsip                # arsip.ArsipPenjualan (periode tertutup) atau None
+        self.kategori_kode = kategori_kode
+        self.workers = workers or os.cpu_count() or 1
+
+    def agregasi(self, t0=None, t1=None, paralel=None):
+        # rentang [t0, t1) epoch; paralel None = otomatis berdasarkan jumlah baris
+        led = self.ledger
+        lo, hi = led.rentang_waktu(t0, t1)
+        order = led._urutan()
+        segmen = []
+        if self.arsip is not None:
+            segmen = [(s, *s.rentang_waktu(t0, t1)) for s in self.arsip.segmen_waktu(t0, t1)]
+        n = hi - lo + sum(b - a for _, a, b in segmen)
+        if paralel is None:
+            paralel = self.workers > 1 and n >= MIN_PARALEL
+        kol = {nama: getattr(led, nama) for nama in KOLOM}
+        if order is not None:
+            kol['order'] = order
+        per_kode, per_hari = {}, {}
+
+        def gabung(p_kode, p_hari):
+            for k, v in p_kode.items():
+                HasilRekap._gabung(per_kode, k, v)
+            for k, v in p_hari.items():
+                HasilRekap._gabung(per_hari, k, v)
+
+        if not paralel or not n:
+            for s, a, b in segmen:
+                p_item, p_hari = agregasi_partisi({nama: getattr(s, nama) for nama in KOLOM}, a, b)
+                gabung(_ke_kunci(p_item, s.tabel_kunci()), p_hari)
+            p_item, p_hari = agregasi_partisi(kol, lo, hi)
+            gabung(_ke_kunci(p_item, led.tabel_kunci()), p_hari)
+            return HasilRekap(per_kode, per_hari, self.kategori_kode)
+        # ukuran partisi sama untuk ledger & arsip supaya beban worker rata
+        ukuran = max(1, -(-n // (self.workers * PARTISI_PER_WORKER)))
+        shms = []
+        try:
+            # kolom disalin ke shared memory tiap agregasi: satu memcpy per kolom, kecil dibanding agregasinya.
+            # Ledger sendiri tetap array biasa karena harus bisa tumbuh per nota
+            spec = {}
+            for nama, col in kol.items():
+                nbytes = max(1, len(col) * col.itemsize)
+                shm = shared_memory.SharedMemory(create=True, size=nbytes)
+                shms.append(shm)
+                if len(col):
+                    shm.buf[:len(col) * col.itemsize] = memoryview(col).cast("B")
+                spec[nama] = (shm.name, col.typecode)
+            with ProcessPoolExecutor(max_workers=self.workers,
+                                     mp_context=multiprocessing.get_context(MP_START)) as ex:
+                futures = [(ex.submit(_tugas_arsip, s.path, a, min(a + ukuran, b)), None)
+                           for s, lo_s, b in segmen for a in range(lo_s, b, ukuran)]
+                kunci = led.tabel_kunci()
+                futures += [(ex.submit(_tugas, spec, a, min(a + ukuran, hi)), kunci)
+                            for a in range(lo, hi, ukuran)]
+                for fut, kunci in futures:
+                    p_kode, p_hari = fut.result()
+                    gabung(p_kode if kunci is None else _ke_kunci(p_kode, kunci), p_hari)
+            return HasilRekap(per_kode, per_hari, self.kategori_kode)
+        finally:
+            for shm in shms:
+                shm.close()
+                shm.unlink()
+
+    def stream_rows(self, t0=None, t1=None, chunk=1000):
+        # baris detail urut waktu per potongan list (tidak pernah dimuat semua ke memori); arsip dulu
+        buf = []
+        sumber = self.ledger.rows_waktu(t0, t1)
+        if self.arsip is not None:
+            sumber = itertools.chain(self.arsip.rows_waktu(t0, t1), sumber)
+        for r in sumber:
+            buf.append(r)
+            if len(buf) >= chunk:
+                yield buf
+                buf = []
+        if buf:
+            yield buf
+
+
+def ledger_sintetis(n, n_barang=5000, hari=365):
+    led = LedgerPenjualan()
+    akhir = int(time.time())
+    awal = akhir - hari * 86400
+    langkah = (akhir - awal) / max(n, 1)
+    for i in range(n):
+        it = i * 7919 % n_barang
+        j = 1 + i % 3
+        led.tambah(i + 1, f"K{it // 100:02d}{it % 100:03d}", f"Barang {it}", j, 1000 + it, j * (1000 + it),
+                   awal + int(i * langkah))
+    return led
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Uji skala rekap paralel dengan ledger sintetis")
+    ap.add_argument("--rows", type=int, default=2_000_000)
+    ap.add_argument("--workers", default="1,2,4", help="daftar jumlah worker, pisah koma")
+    ap.add_argument("--top", type=int, default=5)
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    led = ledger_sintetis(args.rows)
+    print(f"ledger sintetis {args.rows:,} baris siap dalam {time.perf_counter() - t0:.1f}s")
+    print(f"{'Worker':<8} {'Detik':>8} {'Baris/detik':>14} {'Skala':>7}")
+    dasar = None
+    hasil = None
+    for w in [int(x) for x in args.workers.split(",")]:
+        mesin = MesinRekap(led, kategori_kode=lambda kode: kode[:3], workers=w)
+        t0 = time.perf_counter()
+        hasil = mesin.agregasi(paralel=w > 1)
+        durasi = time.perf_counter() - t0
+        dasar = dasar or durasi
+        print(f"{w:<8} {durasi:>8.2f} {args.rows / durasi:>14,.0f} {dasar / durasi:>6.2f}x")
+    assert hasil.total() == led.total_harga()
+    print(f"\nTop {args.top} barang (omzet):")
+    for kode, omzet, qty, trx in hasil.top(args.top):
+        print(f"  {kode:<10} Rp {omzet:>15,} {qty:>10,} qty {trx:>9,} trx")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+# reservasi.py
+# reservasi stok per keranjang dengan batas waktu (TTL). Stok barang (b.stok) hanya berubah saat nota
+# di-commit; selama belum dibayar qty cukup "ditahan": tersedia = stok - ditahan.
+# Keranjang yang ditinggal (sesi putus, tablet mati, kasir lupa) lepas sendiri setelah TTL lewat:
+# batas waktu tiap keranjang masuk min-heap, thread expirer tidur sampai batas terdekat lalu hanya
+# mengambil keranjang yang habis -> O(kedaluwarsa log n), tidak pernah memindai semua keranjang.
+import heapq
+import itertools
+import threading
+import time
+
+STRIPES = 64  # lock counter per barang di-stripe berdasarkan id (barang berbeda tidak saling menunggu)
+
+
+class Reservasi:
+    def __init__(self, ttl, stripes=STRIPES, jam=time.monotonic):
+        self.ttl = ttl
+        self._jam = jam
+        # counter per barang: qty ditahan semua keranjang & qty terjual sejak start (dijaga lock stripe)
+        self._locks = [threading.Lock() for _ in range(stripes)]
+        self._ditahan = {}
+        self._terjual = {}
+        # tabel keranjang: kunci -> {barang_id: qty}, kunci -> batas waktu; heap (batas, kunci).
+        # Keranjang yang disentuh lagi dapat batas baru, entri heap lamanya basi & dilewati saat keluar heap
+        self._lock = threading.Condition()
+        self._cart = {}
+        self._batas = {}
+        self._heap = []
+        self._ids = itertools.count(1)
+        self._thread = None
+        self._jalan = False
+        self.pendengar = []   # fungsi(kunci), dipanggil setelah keranjang itu kedaluwarsa
+        self.n_kedaluwarsa = 0
+
+    def _stripe(self, barang_id):
+        return self._locks[barang_id % len(self._locks)]
+
+    # ----------------------------
+    # counter per barang
+    # ----------------------------
+    def ditahan(self, barang_id):
+        return self._ditahan.get(barang_id, 0)
+
+    def terjual(self, barang_id):
+        return self._terjual.get(barang_id, 0)
+
+    def tersedia(self, b):
+        return max(0, b.stok - self._ditahan.get(b.id, 0))
+
+    def qty_ditahan(self):
+        return sum(self._ditahan.values())
+
+    def _kembalikan(self, isi):
+        for barang_id, q in isi.items():
+            with self._stripe(barang_id):
+                sisa = self._ditahan.get(barang_id, 0) - q
+                if sisa > 0:
+                    self._ditahan[barang_id] = sisa
+                else:
+                    self._ditahan.pop(barang_id, None)
+
+    # ----------------------------
+    # keranjang
+    # ----------------------------
+    def _perbarui(self, kunci):
+        # dipanggil di bawah self._lock
+        batas = self._jam() + self.ttl
+        self._batas[kunci] = batas
+        heapq.heappush(self._heap, (batas, kunci))
+        if self._heap[0] == (batas, kunci):
+            self._lock.notify()   # batas terdekat berubah, expirer tidur ulang
+        if self._thread is None:
+            self._mulai()
+
+    def buka(self):
+        # keranjang baru (kosong pun ikut kedaluwarsa, supaya sesi yang ditinggal tidak menumpuk)
+        kunci = next(self._ids)
+        with self._lock:
+            self._cart[kunci] = {}
+            self._perbarui(kunci)
+        return kunci
+
+    def aktif(self, kunci):
+        return kunci in self._cart
+
+    def tahan(self, kunci, b, jumlah):
+        # cek + tahan atomik di bawah lock barang itu; return False kalau stok tersedia tidak cukup
+        with self._stripe(b.id):
+            ditahan = self._ditahan.get(b.id, 0)
+            if jumlah > b.stok - ditahan:
+                return False
+            self._ditahan[b.id] = ditahan + jumlah
+            with self._lock:
+                isi = self._cart.setdefault(kunci, {})
+                isi[b.id] = isi.get(b.id, 0) + jumlah
+                self._perbarui(kunci)
+        return True
+
+    def lepas(self, kunci, barang_id, jumlah):
+        # sebagian hold keranjang dilepas (item dihapus); hold yang sudah kedaluwarsa tidak dikembalikan dua kali
+        with self._lock:
+            isi = self._cart.get(kunci)
+            q = min(jumlah, isi.get(barang_id, 0)) if isi else 0
+            if q:
+                if isi[barang_id] == q:
+                    del isi[barang_id]
+                else:
+                    isi[barang_id] -= q
+                self._perbarui(kunci)
+        if q:
+            self._kembalikan({barang_id: q})
+        return q
+
+    def batal(self, kunci):
+        with self._lock:
+            isi = self._cart.pop(kunci, None)
+            self._batas.pop(kunci, None)
+        if isi:
+            self._kembalikan(isi)
+
+    def ambil(self, kunci, butuh):
+        # persiapan commit. butuh: [(barang, qty total)]. Hold yang kurang (kedaluwarsa) ditahan ulang;
+        # kalau stok tidak cukup lagi return barang itu (keranjang tetap utuh). Kalau berhasil keranjang
+        # keluar dari tabel (tidak bisa kedaluwarsa lagi) dan qty-nya tetap ditahan sampai jual().
+        # Cek cukup & keluar dari tabel satu critical section: kalau expirer melepas keranjang di antara
+        # tahan ulang dan pop, hold ditahan ulang lagi, tidak pernah commit dengan hold yang sudah lepas
+        while True:
+            with self._lock:
+                isi = self._cart.get(kunci) or {}
+                if all(q <= isi.get(b.id, 0) for b, q in butuh):
+                    self._cart.pop(kunci, None)
+                    self._batas.pop(kunci, None)
+                    break
+                if kunci in self._cart:
+                    self._perbarui(kunci)
+                isi = dict(isi)
+            for b, q in butuh:
+                if q > isi.get(b.id, 0) and not self.tahan(kunci, b, q - isi.get(b.id, 0)):
+                    return b
+        for b, q in butuh:
+            isi[b.id] = isi.get(b.id, 0) - q
+        # sisa hold (mis. barang yang sudah dihapus) dikembalikan
+        self._kembalikan({barang_id: q for barang_id, q in isi.items() if q > 0})
+        return None
+
+    def jual(self, b, jumlah):
+        # qty yang sudah di-ambil() keluar dari ditahan & stok
+        with self._stripe(b.id):
+            sisa = self._ditahan.get(b.id, 0) - jumlah
+            if sisa > 0:
+                self._ditahan[b.id] = sisa
+            else:
+                self._ditahan.pop(b.id, None)
+            b.stok -= jumlah
+            self._terjual[b.id] = self._terjual.get(b.id, 0) + jumlah
+
+    # ----------------------------
+    # expirer
+    # ----------------------------
+    def kedaluwarsa(self, sekarang=None):
+        # lepas semua keranjang yang batasnya sudah lewat; return jumlah keranjang
+        if sekarang is None:
+            sekarang = self._jam()
+        habis = []
+        with self._lock:
+            heap = self._heap
+            while heap and heap[0][0] <= sekarang:
+                batas, kunci = heapq.heappop(heap)
+                if self._batas.get(kunci) == batas:
+                    del self._batas[kunci]
+                    habis.append((kunci, self._cart.pop(kunci)))
+        for kunci, isi in habis:
+            self._kembalikan(isi)
+            for f in self.pendengar:
+                f(kunci)
+        self.n_kedaluwarsa += len(habis)
+        return len(habis)
+
+    def _mulai(self):
+        # dipanggil di bawah self._lock saat keranjang pertama dibuka
+        self._jalan = True
+        self._thread = threading.Thread(target=self._loop, name="reservasi-expirer", daemon=True)
+        self._thread.start()
+
+    def _loop(self):
+        while True:
+            with self._lock:
+                if not self._jalan:
+                    return
+                tunggu = self._heap[0][0] - self._jam() if self._heap else None
+                if tunggu is None or tunggu > 0:
+                    self._lock.wait(tunggu)
+                    continue
+            self.kedaluwarsa()
+
+    def berhenti(self):
+        with self._lock:
+            self._jalan = False
+            self._lock.notify()
+            t = self._thread
+        if t is not None and t is not threading.current_thread():
+            t.join()
+
+    def ringkas(self):
+        return {'keranjang': len(self._cart), 'qty_ditahan': self.qty_ditahan(), 'kedaluwarsa': self.n_kedaluwarsa}
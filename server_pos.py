@@ -0,0 +1,456 @@
+#!/usr/bin/env python3
+# server_pos.py
+# layanan HTTP/JSON (asyncio, tanpa dependensi) di atas SimplePOS untuk tablet kasir & back office.
+#   python server_pos.py                         -> http://127.0.0.1:8080
+#   python server_pos.py --host 0.0.0.0 --port 9000
+#
+# Semua mutasi (keranjang, checkout) lewat satu task penulis: request diantrikan, dijalankan berurutan
+# di event loop, lalu satu fsync untuk seluruh batch sebelum dijawab (group commit).
+# Baca (katalog, rekap) langsung dijawab dari memori tanpa antri.
+#
+#   GET    /kategori
+#   GET    /barang?q=&kategori=&offset=&limit=      katalog / pencarian kode-nama
+#   GET    /barang/<kode>
+#   POST   /keranjang                               -> {"cart_id": 1}
+#   GET    /keranjang/<id>
+#   POST   /keranjang/<id>/item                     {"kode": "MA001", "jumlah": 2}
+#   DELETE /keranjang/<id>/item/<no>
+#   DELETE /keranjang/<id>                          batal, stok dikembalikan (keranjang diam > TTL lepas sendiri)
+#   POST   /keranjang/<id>/checkout
+#   POST   /checkout                                {"items": [{"kode": "MA001", "jumlah": 2}, ...]}
+#   POST   /checkout/bulk                           {"nota": [{"items": [...]}, ...]}
+#   GET    /rekap?dari=YYYY-MM-DD&sampai=YYYY-MM-DD&limit=
+#   GET    /ringkasan/<hari|minggu|bulan|kode|kategori>
+#   GET    /stok/kritis?limit=                      barang paling cepat habis (laju jual & perkiraan habis)
+#   GET    /metrics                                 format Prometheus (metrik.py)
+import argparse
+import asyncio
+import itertools
+import json
+import re
+import sys
+import time
+import traceback
+from datetime import datetime, timedelta
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from ledger import RollupPenjualan
+from metrik import METRIK
+from model import epoch_tanggal
+from program_utama import KeranjangTidakAda, POSError, TransactionEngine
+
+BATCH_TULIS = 256        # maksimal request mutasi per fsync
+IDLE_TIMEOUT = 30        # detik koneksi keep-alive boleh diam
+MAKS_BODY = 8 << 20
+MAKS_BARIS = 8 << 10     # panjang maksimal satu baris request / header (limit StreamReader)
+MAKS_HEADER = 100        # jumlah header maksimal per request
+MAKS_HEADER_TOTAL = 32 << 10
+LIMIT_DEFAULT = 100
+
+STATUS = {200: "OK", 201: "Created", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+          409: "Conflict", 411: "Length Required", 413: "Payload Too Large", 414: "URI Too Long",
+          431: "Request Header Fields Too Large", 500: "Internal Server Error"}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, pesan):
+        super().__init__(pesan)
+        self.status = status
+
+
+# ============================================================
+#  task penulis tunggal
+# ============================================================
+class Penulis:
+    def __init__(self, pos):
+        self.pos = pos
+        self.antrian = asyncio.Queue()
+        self._task = None
+
+    def mulai(self):
+        self._task = asyncio.create_task(self._jalan())
+
+    async def kirim(self, fungsi, *args):
+        fut = asyncio.get_running_loop().create_future()
+        await self.antrian.put((fungsi, args, fut))
+        return await fut
+
+    async def _jalan(self):
+        while True:
+            batch = [await self.antrian.get()]
+            while len(batch) < BATCH_TULIS and not self.antrian.empty():
+                batch.append(self.antrian.get_nowait())
+            hasil = []
+            for fungsi, args, fut in batch:
+                try:
+                    hasil.append((fut, fungsi(*args), None))
+                except Exception as e:  # dikembalikan ke request masing-masing
+                    hasil.append((fut, None, e))
+            if self.pos.storage:
+                # fsync di thread lain; request baca tetap dilayani selama menunggu disk
+                try:
+                    await asyncio.to_thread(self.pos._commit)
+                except Exception as e:
+                    hasil = [(fut, None, e) for fut, _, _ in hasil]
+            # batch sudah durable: jawab dulu, baru pekerjaan pemeliharaan
+            for fut, nilai, err in hasil:
+                if fut.cancelled():
+                    continue
+                if err is None:
+                    fut.set_result(nilai)
+                else:
+                    fut.set_exception(err)
+            if self.pos.storage:
+                # pergantian bulan: arsipkan di loop ini (jarang, dan request baca tidak melihat ledger setengah jadi).
+                # Gagal di sini (disk penuh, arsip rusak) dicatat saja: data sudah aman di log, penulis harus tetap jalan
+                try:
+                    self.pos._arsipkan_periode_tertutup()
+                    await asyncio.to_thread(self.pos._simpan_snapshot)
+                except Exception:
+                    print("penulis: arsip / snapshot gagal, dicoba lagi di batch berikutnya", file=sys.stderr)
+                    traceback.print_exc()
+
+    async def berhenti(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+
+# ============================================================
+#  layanan
+# ============================================================
+def _nota(hasil):
+    return {'waktu': hasil['waktu'], 'total': hasil['total'], 'items': [it.ke_dict() for it in hasil['items']]}
+
+
+def _barang(pos, b):
+    # stok = stok fisik; tersedia = stok dikurangi qty yang ditahan keranjang yang belum dibayar
+    d = b.ke_dict()
+    d['ditahan'] = pos.reservasi.ditahan(b.id)
+    d['tersedia'] = pos.reservasi.tersedia(b)
+    return d
+
+
+def _int(query, nama, default):
+    try:
+        return int(query.get(nama, [default])[0])
+    except ValueError:
+        raise HTTPError(400, f"Parameter {nama} harus angka.")
+
+
+def _tanggal(query, nama, default):
+    t = query.get(nama, [None])[0]
+    if not t:
+        return default
+    try:
+        return datetime.strptime(t, "%Y-%m-%d").date()
+    except ValueError:
+        raise HTTPError(400, f"Parameter {nama} harus YYYY-MM-DD.")
+
+
+def _basket(nota):
+    items = nota.get('items') if isinstance(nota, dict) else None
+    if not isinstance(items, list):
+        raise HTTPError(400, "Field items harus list.")
+    try:
+        return [(str(it['kode']), int(it['jumlah'])) for it in items]
+    except (KeyError, TypeError, ValueError):
+        raise HTTPError(400, "Setiap item butuh kode & jumlah (angka).")
+
+
+class LayananPOS:
+    def __init__(self, pos):
+        self.pos = pos
+        self.engine = TransactionEngine(pos)
+        self.penulis = Penulis(pos)
+        self.rute = [
+            ("GET", r"/kategori", self.get_kategori),
+            ("GET", r"/barang", self.get_barang),
+            ("GET", r"/barang/([^/]+)", self.get_barang_kode),
+            ("POST", r"/keranjang", self.post_keranjang),
+            ("GET", r"/keranjang/(\d+)", self.get_keranjang),
+            ("POST", r"/keranjang/(\d+)/item", self.post_item),
+            ("DELETE", r"/keranjang/(\d+)/item/(\d+)", self.delete_item),
+            ("DELETE", r"/keranjang/(\d+)", self.delete_keranjang),
+            ("POST", r"/keranjang/(\d+)/checkout", self.post_commit),
+            ("POST", r"/checkout", self.post_checkout),
+            ("POST", r"/checkout/bulk", self.post_checkout_bulk),
+            ("GET", r"/rekap", self.get_rekap),
+            ("GET", r"/ringkasan/(\w+)", self.get_ringkasan),
+            ("GET", r"/stok/kritis", self.get_stok_kritis),
+        ]
+        self.rute = [(m, re.compile(p + "$"), h) for m, p, h in self.rute]
+
+    # ----------------------------
+    # baca (langsung dari memori)
+    # ----------------------------
+    async def get_kategori(self, query, body):
+        return 200, [k.ke_dict() for k in sorted(self.pos.kategori, key=lambda x: x.id)]
+
+    async def get_barang(self, query, body):
+        offset = _int(query, 'offset', 0)
+        limit = min(_int(query, 'limit', LIMIT_DEFAULT), 1000)
+        q = query.get('q', [None])[0]
+        kategori = query.get('kategori', [None])[0]
+        sumber = self.pos._sumber_jual(q)
+        if kategori:
+            sumber = [(kat, items) for kat, items in sumber if kat.kode.upper() == kategori.upper()]
+        total = sum(len(items) for _, items in sumber)
+        hasil = []
+        for kat, items in sumber:
+            if offset >= len(items):
+                offset -= len(items)
+                continue
+            for b in items[offset:offset + limit - len(hasil)]:
+                hasil.append(_barang(self.pos, b))
+            offset = 0
+            if len(hasil) >= limit:
+                break
+        return 200, {'total': total, 'items': hasil}
+
+    async def get_barang_kode(self, query, body, kode):
+        b = self.pos._barang_by_kode(unquote(kode))
+        if not b:
+            raise HTTPError(404, "Barang tidak ditemukan.")
+        return 200, _barang(self.pos, b)
+
+    async def get_keranjang(self, query, body, cart_id):
+        items = self.engine.isi(int(cart_id))
+        return 200, {'cart_id': int(cart_id), 'items': [it.ke_dict() for it in items],
+                     'total': sum(it.total for it in items)}
+
+    async def get_rekap(self, query, body):
+        hari_ini = datetime.now().date()
+        d1 = _tanggal(query, 'dari', hari_ini)
+        d2 = _tanggal(query, 'sampai', d1)
+        limit = _int(query, 'limit', LIMIT_DEFAULT)
+        t0, t1 = epoch_tanggal(d1), epoch_tanggal(d2 + timedelta(days=1))
+        pos = self.pos
+        n = len(pos.penjualan.posisi_waktu(t0, t1))
+        if pos.arsip is not None:
+            n += sum(b - a for a, b in (s.rentang_waktu(t0, t1) for s in pos.arsip.segmen_waktu(t0, t1)))
+        rows = [r.ke_dict() for r in itertools.islice(pos._riwayat_rows(t0, t1), max(limit, 0))]
+        return 200, {'dari': str(d1), 'sampai': str(d2), 'jumlah_baris': n,
+                     'total': pos._riwayat_total(t0, t1), 'rows': rows}
+
+    async def get_ringkasan(self, query, body, dim):
+        if dim not in RollupPenjualan.DIMENSI:
+            raise HTTPError(404, f"Dimensi harus salah satu dari {', '.join(RollupPenjualan.DIMENSI)}.")
+        rows = self.pos.rollup.ringkas(dim)
+        if dim == 'kode':
+            # bucket barang di-key id barang; key tetap kode (aktif / terakhir) supaya klien lama tidak berubah
+            alias = self.pos.alias
+            return 200, [{'key': alias.kode_terakhir(k) if isinstance(k, int) else k,
+                          'barang_id': k if isinstance(k, int) else None, 'omzet': o, 'qty': q, 'trx': t}
+                         for k, o, q, t in rows]
+        return 200, [{'key': k, 'omzet': o, 'qty': q, 'trx': t} for k, o, q, t in rows]
+
+    async def get_stok_kritis(self, query, body):
+        limit = min(_int(query, 'limit', 20), 1000)
+        pos = self.pos
+        rows = pos.analitik.kritis(limit, int(time.time()), pos._barang_by_id)
+        return 200, [dict(_barang(pos, b), laju_per_hari=round(laju, 3),
+                          hari_tersisa=round(hari, 2), waspada=hari <= pos.analitik.ambang)
+                     for b, hari, laju in rows]
+
+    # ----------------------------
+    # mutasi (lewat task penulis)
+    # ----------------------------
+    async def post_keranjang(self, query, body):
+        return 201, {'cart_id': await self.penulis.kirim(self.engine.buka)}
+
+    async def post_item(self, query, body, cart_id):
+        if not isinstance(body, dict):
+            raise HTTPError(400, "Body harus JSON object.")
+        try:
+            kode, jumlah = str(body['kode']), int(body['jumlah'])
+        except (KeyError, TypeError, ValueError):
+            raise HTTPError(400, "Butuh kode & jumlah (angka).")
+        item = await self.penulis.kirim(self.engine.tambah, int(cart_id), kode, jumlah)
+        return 201, item.ke_dict()
+
+    async def delete_item(self, query, body, cart_id, no):
+        item = await self.penulis.kirim(self.engine.hapus, int(cart_id), int(no))
+        return 200, item.ke_dict()
+
+    async def delete_keranjang(self, query, body, cart_id):
+        await self.penulis.kirim(self.engine.batal, int(cart_id))
+        return 200, {'cart_id': int(cart_id), 'batal': True}
+
+    async def post_commit(self, query, body, cart_id):
+        return 201, _nota(await self.penulis.kirim(self.engine.commit, int(cart_id), False))
+
+    async def post_checkout(self, query, body):
+        return 201, _nota(await self.penulis.kirim(self.engine.checkout, _basket(body), False))
+
+    async def post_checkout_bulk(self, query, body):
+        nota = body.get('nota') if isinstance(body, dict) else None
+        if not isinstance(nota, list):
+            raise HTTPError(400, "Field nota harus list.")
+        baskets = [_basket(n) for n in nota]
+        hasil = await self.penulis.kirim(self._checkout_bulk, baskets)
+        return 200, {'hasil': hasil, 'ok': sum(1 for h in hasil if 'error' not in h)}
+
+    def _checkout_bulk(self, baskets):
+        # satu item antrian untuk banyak nota: tiap nota atomik sendiri, fsync sekali untuk semua
+        hasil = []
+        for basket in baskets:
+            try:
+                hasil.append(_nota(self.engine.checkout(basket, sync=False)))
+            except POSError as e:
+                hasil.append({'error': str(e)})
+        return hasil
+
+    # ----------------------------
+    # HTTP
+    # ----------------------------
+    async def _dispatch(self, method, target, body):
+        url = urlsplit(target)
+        if url.path == "/metrics" and method == "GET":
+            return 200, METRIK.teks_prometheus(self.pos)
+        query = parse_qs(url.query)
+        path = url.path.rstrip("/") or "/"
+        cocok_path = False
+        for m, pola, handler in self.rute:
+            hasil = pola.match(path)
+            if not hasil:
+                continue
+            cocok_path = True
+            if m == method:
+                return await handler(query, body, *hasil.groups())
+        if cocok_path:
+            raise HTTPError(405, "Method tidak didukung untuk path ini.")
+        raise HTTPError(404, "Path tidak ditemukan.")
+
+    async def _baca_request(self, reader):
+        # return (method, target, headers, body) atau None kalau koneksi ditutup client
+        # baris lebih panjang dari MAKS_BARIS: readline melempar ValueError (LimitOverrunError di dalamnya)
+        try:
+            line = await asyncio.wait_for(reader.readline(), IDLE_TIMEOUT)
+        except (ValueError, asyncio.LimitOverrunError):
+            raise HTTPError(414, "Request line terlalu panjang.")
+        if not line:
+            return None
+        try:
+            method, target, versi = line.decode("latin-1").split()
+        except ValueError:
+            raise HTTPError(400, "Request line tidak valid.")
+        headers = {}
+        n_header = total = 0
+        while True:
+            try:
+                h = await reader.readline()
+            except (ValueError, asyncio.LimitOverrunError):
+                raise HTTPError(431, "Header terlalu besar.")
+            if h in (b"\r\n", b"\n", b""):
+                break
+            n_header += 1
+            total += len(h)
+            if n_header > MAKS_HEADER or total > MAKS_HEADER_TOTAL:
+                raise HTTPError(431, "Header terlalu banyak / terlalu besar.")
+            k, _, v = h.decode("latin-1").partition(":")
+            headers[k.strip().lower()] = v.strip()
+        headers[':versi'] = versi
+        if 'chunked' in headers.get('transfer-encoding', '').lower():
+            raise HTTPError(411, "Gunakan Content-Length, chunked tidak didukung.")
+        try:
+            n = int(headers.get('content-length') or 0)
+        except ValueError:
+            raise HTTPError(400, "Content-Length tidak valid.")
+        if n < 0:
+            raise HTTPError(400, "Content-Length tidak valid.")
+        if n > MAKS_BODY:
+            raise HTTPError(413, "Body terlalu besar.")
+        body = await reader.readexactly(n) if n else b""
+        return method.upper(), target, headers, body
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    req = await self._baca_request(reader)
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except HTTPError as e:
+                    await self._kirim(writer, e.status, {'error': str(e)}, False)
+                    break
+                if req is None:
+                    break
+                method, target, headers, raw = req
+                koneksi = headers.get('connection', '').lower()
+                keep_alive = koneksi != 'close' if headers[':versi'] == "HTTP/1.1" else koneksi == 'keep-alive'
+                try:
+                    body = json.loads(raw) if raw else None
+                except ValueError:
+                    body = HTTPError(400, "Body bukan JSON yang valid.")
+                try:
+                    if isinstance(body, HTTPError):
+                        raise body
+                    status, data = await self._dispatch(method, target, body)
+                except HTTPError as e:
+                    status, data = e.status, {'error': str(e)}
+                except KeranjangTidakAda as e:
+                    status, data = 404, {'error': str(e)}
+                except POSError as e:
+                    status, data = 409, {'error': str(e)}
+                except Exception as e:
+                    status, data = 500, {'error': f"{type(e).__name__}: {e}"}
+                await self._kirim(writer, status, data, keep_alive)
+                if not keep_alive:
+                    break
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    @staticmethod
+    async def _kirim(writer, status, data, keep_alive):
+        if isinstance(data, str):
+            body, jenis = data.encode("utf-8"), "text/plain; version=0.0.4; charset=utf-8"
+        else:
+            body, jenis = json.dumps(data, ensure_ascii=False).encode("utf-8"), "application/json"
+        writer.write(
+            f"HTTP/1.1 {status} {STATUS.get(status, '')}\r\n"
+            f"Content-Type: {jenis}\r\nContent-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1") + body)
+        await writer.drain()
+
+    async def layani(self, host="127.0.0.1", port=8080, siap=None):
+        self.penulis.mulai()
+        server = await asyncio.start_server(self.handle, host, port, backlog=1024, limit=MAKS_BARIS)
+        if siap:
+            siap(server)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            await self.penulis.berhenti()
+
+
+def main():
+    from penyimpanan import buat_storage
+    from program_utama import STORAGE_BACKEND, SimplePOS, storage_path
+
+    ap = argparse.ArgumentParser(description="Layanan HTTP/JSON KOPBOX POS")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8080)
+    args = ap.parse_args()
+
+    pos = SimplePOS(buat_storage(STORAGE_BACKEND, storage_path()))
+    layanan = LayananPOS(pos)
+    try:
+        asyncio.run(layanan.layani(args.host, args.port,
+                                   lambda s: print(f"KOPBOX POS melayani di http://{args.host}:{args.port}")))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        pos.tutup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+# modul POS ada di root repo (bukan paket), jadi root dimasukkan ke sys.path
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import program_utama  # noqa: E402
+from penyimpanan import buat_storage  # noqa: E402
+from model import Barang  # noqa: E402
+from program_utama import SimplePOS  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def kunci_warm(monkeypatch):
+    # kunci HMAC warm.bin dari env, supaya test tidak membuat ~/.kopbox/warm.key
+    monkeypatch.setenv("KOPBOX_WARM_KEY", "kunci-uji")
+
+
+@pytest.fixture
+def buka_pos(tmp_path):
+    # buka_pos(backend='wal') -> SimplePOS di tmp_path (sample data kalau store masih kosong); None = in-memory.
+    # Thread expirer reservasi tiap POS yang dibuka dihentikan di akhir test
+    dibuka = []
+
+    def buka(backend='wal'):
+        pos = SimplePOS(buat_storage(backend, str(tmp_path / backend)) if backend else None)
+        dibuka.append(pos)
+        return pos
+    yield buka
+    for pos in dibuka:
+        pos.reservasi.berhenti()
+
+
+@pytest.fixture
+def buat_barang():
+    # buat_barang(id, stok) -> Barang lepas (tanpa POS) di kategori 1
+    return lambda id, stok=10: Barang(id, 1, id, f"MA{id:03d}", "x", stok, 100, 0)
+
+
+@pytest.fixture
+def t0():
+    # epoch tetap (2023-11-14) untuk data uji yang tidak bergantung jam sekarang
+    return 1_700_000_000
+
+
+@pytest.fixture
+def jawab(monkeypatch):
+    # jawab("1", "y") -> input() menjawab berurutan; clear/pause dibisukan supaya menu bisa dijalankan
+    antrian = []
+    monkeypatch.setattr("builtins.input", lambda prompt="": antrian.pop(0))
+    monkeypatch.setattr(program_utama, "clear", lambda: None)
+    monkeypatch.setattr(program_utama, "pause", lambda msg="": None)
+    return lambda *isi: antrian.extend(isi)
+
+
+@pytest.fixture
+def jual(jawab):
+    # jual(pos, ("MA002", 2), ...) -> satu nota lewat menu penjualan
+    def jual(pos, *items):
+        for i, (kode, jumlah) in enumerate(items):
+            jawab(kode, str(jumlah), "1" if i < len(items) - 1 else "2")
+        jawab("2")
+        pos.menu_jual()
+    return jual
+
+
+@pytest.fixture
+def isi_katalog():
+    # ringkasan katalog + index untuk membandingkan state sebelum / sesudah
+    def isi(pos):
+        return (sorted(repr(sorted(k.ke_dict().items())) for k in pos.kategori),
+                sorted(repr(sorted(b.ke_dict().items())) for b in pos.barang),
+                dict(pos._seq_local), sorted(pos._idx_kode), sorted(pos._idx_id),
+                {k: [b['kode'] for b in v] for k, v in pos._idx_kategori.items() if v})
+    return isi
@@ -0,0 +1,50 @@
+import time
+
+from arsip import ArsipPenjualan, periode_ts
+from program_utama import TransactionEngine
+
+
+def _row(id, ts, total=100, barang_id=1, kode='MA001'):
+    return (id, kode, 'Nasi', 1, total, total, ts, barang_id)
+
+
+def test_tambah_gabung_tanpa_duplikat_dan_buka_ulang(tmp_path, t0):
+    a = ArsipPenjualan(str(tmp_path))
+    p = periode_ts(t0)
+    a.tambah(p, [_row(2, t0 + 5), _row(1, t0)])
+    a.tambah(p, [_row(2, t0 + 5), _row(3, t0 + 9, total=50)])  # diulang setelah crash: id 2 dilewati
+    assert len(a) == 3 and a.max_id() == 3
+    assert [r.id for r in a.rows_waktu()] == [1, 2, 3]
+    assert a.total_waktu(t0 + 1, None) == 150
+    a.tutup()
+    b = ArsipPenjualan(str(tmp_path))
+    assert [s.periode for s in b.segmen] == [p] and len(b) == 3
+    b.pasang_resolver({1: 'MK001'}.get)
+    assert {r.kode_barang for r in b.rows_waktu()} == {'MK001'}
+    b.tutup()
+
+
+def test_arsip_kosong_tetap_objek(tmp_path, t0):
+    a = ArsipPenjualan(str(tmp_path))
+    assert len(a) == 0 and a.max_id() == 0 and a.total_waktu() == 0
+    a.pasang_resolver({1: 'MK001'}.get)
+    a.tambah(periode_ts(t0), [_row(1, t0)])
+    assert next(a.rows_waktu()).kode_barang == 'MK001'  # segmen baru ikut resolver yang sudah dipasang
+    a.tutup()
+
+
+def test_pos_mengarsip_bulan_lalu(buka_pos):
+    pos = buka_pos()
+    engine = TransactionEngine(pos)
+    engine.checkout([("MA002", 1)])
+    pos.penjualan.ts[-1] = int(time.time()) - 62 * 86400  # jadikan penjualan bulan lalu
+    engine.checkout([("SN001", 2)])
+    assert pos._arsipkan_periode_tertutup() == 1
+    assert [r.id for r in pos.penjualan] == [2] and len(pos.arsip) == 1
+    assert pos._riwayat_total() == 40000
+    assert pos.rollup.get('kode', 2) == (20000, 1, 1)
+    pos.tutup()
+    pos = buka_pos()
+    assert len(pos.arsip) == 1 and [r.kode_barang for r in pos._riwayat_rows()] == ["MA002", "SN001"]
+    assert TransactionEngine(pos).checkout([("MI001", 1)])['items'][0].kode_barang == "MI001"
+    assert pos.penjualan.max_id() == 3  # id tidak mundur walaupun baris lama sudah keluar dari RAM
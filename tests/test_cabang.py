@@ -0,0 +1,26 @@
+from cabang import Agregator
+from penyimpanan import buat_storage
+from program_utama import SimplePOS, TransactionEngine
+
+
+def _jual(direktori, backend, basket):
+    pos = SimplePOS(buat_storage(backend, str(direktori)))
+    try:
+        TransactionEngine(pos).checkout(basket)
+    finally:
+        pos.tutup()
+
+
+def test_sinkron_incremental_dua_backend(tmp_path):
+    _jual(tmp_path / "A", 'wal', [("MA002", 2)])     # 2 x 20.000
+    _jual(tmp_path / "B", 'sqlite', [("MI001", 3)])  # 3 x 5.000
+    agg = Agregator(str(tmp_path), workers=1)
+    assert agg.sinkron() == {'A': 1, 'B': 1}
+    assert dict((k, o) for k, o, _, _ in agg.rekap('toko')) == {'A': 40000, 'B': 15000}
+    assert agg.sinkron() == {'A': 0, 'B': 0}
+
+    _jual(tmp_path / "A", 'wal', [("MA002", 1), ("SN001", 1)])
+    agg = Agregator(str(tmp_path), workers=1)  # restart: watermark dari agregat.json
+    assert agg.sinkron() == {'A': 2, 'B': 0}
+    assert dict((k, (o, q, t)) for k, o, q, t in agg.rekap('toko'))['A'] == (70000, 4, 3)
+    assert agg.rekap('kategori')[0] == ('MA', 60000, 3, 2)
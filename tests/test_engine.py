@@ -0,0 +1,52 @@
+import pytest
+
+from program_utama import POSError, TransactionEngine
+
+
+def test_buka_tambah_hapus_commit(buka_pos):
+    pos = buka_pos(None)
+    engine = TransactionEngine(pos)
+    b = pos._barang_by_kode("MA002")
+    cart = engine.buka()
+    engine.tambah(cart, "ma002", 3)
+    engine.tambah(cart, "MI001", 1)
+    assert b['stok'] == 100 and pos.reservasi.tersedia(b) == 97 and pos._qty_ditahan() == 4
+    assert engine.hapus(cart, 2)['kode_barang'] == "MI001"
+    with pytest.raises(POSError):
+        engine.hapus(cart, 5)
+    with pytest.raises(POSError):
+        engine.tambah(cart, "MA002", 1000)
+    nota = engine.commit(cart)
+    assert nota['total'] == 60000 and [it['jumlah'] for it in nota['items']] == [3]
+    assert b['stok'] == 97 and pos._qty_ditahan() == 0
+    assert pos._barang_by_kode("MI001")['stok'] == 50
+    assert [r['kode_barang'] for r in pos.penjualan] == ["MA002"]
+    with pytest.raises(POSError):
+        engine.isi(cart)  # keranjang selesai ditutup
+
+
+def test_batal_mengembalikan_stok(buka_pos):
+    pos = buka_pos(None)
+    engine = TransactionEngine(pos)
+    cart = engine.buka()
+    engine.tambah(cart, "SN001", 10)
+    engine.batal(cart)
+    engine.batal(cart)  # dua kali tidak apa-apa
+    assert pos._barang_by_kode("SN001")['stok'] == 100 and pos._qty_ditahan() == 0
+    with pytest.raises(POSError):
+        engine.commit(cart)
+    with pytest.raises(POSError):
+        engine.commit(engine.buka())  # keranjang kosong
+
+
+def test_checkout_semua_atau_tidak_sama_sekali(buka_pos):
+    pos = buka_pos(None)
+    engine = TransactionEngine(pos)
+    with pytest.raises(POSError):
+        engine.checkout([("MA001", 15), ("MA001", 6)])  # total per barang melebihi stok 20
+    with pytest.raises(POSError):
+        engine.checkout([("MA002", 1), ("XX999", 1)])
+    assert len(pos.penjualan) == 0 and pos._barang_by_kode("MA002")['stok'] == 100
+    hasil = engine.checkout_banyak([[("MA001", 20)], [("MA001", 1)], [("SN001", 2)]])
+    assert isinstance(hasil[1], POSError) and [h['total'] for h in (hasil[0], hasil[2])] == [400000, 20000]
+    assert pos.rollup.get('kode', 1) == (400000, 20, 1)
@@ -0,0 +1,116 @@
+import pytest
+
+import katalog_io
+from jurnal import Jurnal, Transaksi, kebalikan
+from katalog_io import impor_barang
+from persediaan import AnalitikStok
+
+
+def test_kebalikan_urutan_dan_jenis():
+    diff = [('seq_local', 1, 3, 5), ('tambah', 'barang', (9,), None), ('ubah', 'barang', 9, (('stok', 1, 2),))]
+    assert kebalikan(diff) == [('ubah', 'barang', 9, (('stok', 2, 1),)), ('hapus', 'barang', (9,), None),
+                               ('seq_local', 1, 5, 3)]
+
+
+def test_jurnal_dibatasi_jumlah_diff():
+    j = Jurnal(maks=3, maks_diff=10)
+    for i in range(5):
+        tx = Transaksi(f"tx{i}")
+        tx.diff = [('seq_local', 1, i, i + 1)] * 4
+        j.catat(tx)
+    assert [judul for judul, _ in j.undo] == ['tx3', 'tx4']
+    besar = Transaksi("besar")
+    besar.diff = [('seq_local', 1, 0, 1)] * 11
+    j.catat(besar)
+    assert not j.undo and not j.redo
+
+
+def test_undo_redo_edit_kategori(buka_pos, isi_katalog):
+    pos = buka_pos()
+    awal = isi_katalog(pos)
+    kat = pos._kategori_by_id(1)
+    with pos.transaksi("edit kategori MA"):
+        pos._ubah(kat, kode='MK')
+        for b in pos._barang_in_kategori(1):
+            pos._ubah(b, kode=f"MK{b.local_id:03d}")
+    sesudah = isi_katalog(pos)
+    assert pos.undo() == "edit kategori MA"
+    assert isi_katalog(pos) == awal
+    assert pos.redo() == "edit kategori MA"
+    assert isi_katalog(pos) == sesudah
+
+
+def test_undo_stok_sebagai_selisih(buka_pos):
+    pos = buka_pos()
+    b = pos._barang_by_kode("MA002")
+    with pos.transaksi("edit barang MA002"):
+        pos._ubah(b, stok=b.stok + 100)
+    b.stok -= 5  # penjualan setelah edit
+    pos.undo()
+    assert b.stok == 95
+
+
+def test_rollback_mengembalikan_katalog(buka_pos, isi_katalog):
+    pos = buka_pos()
+    awal = isi_katalog(pos)
+    with pytest.raises(RuntimeError):
+        with pos.transaksi("gagal"):
+            pos._ubah(pos._kategori_by_id(1), kode='MK')
+            pos._hapus_rec('barang', [pos._barang_by_kode("MI001")])
+            raise RuntimeError("gagal di tengah")
+    assert isi_katalog(pos) == awal and not pos.jurnal.undo
+    pos.tutup()
+    assert isi_katalog(buka_pos()) == awal
+
+
+def test_impor_per_chunk(buka_pos, tmp_path, monkeypatch):
+    monkeypatch.setattr(katalog_io, "CHUNK", 10)
+    pos = buka_pos()
+    n = len(pos.barang)
+    path = tmp_path / "impor.csv"
+    path.write_text("kode,nama,stok,harga\n" + "".join(f"SN,Item {i},5,100\n" for i in range(25)))
+    assert impor_barang(pos, str(path))['ok'] == 25
+    assert len(pos.barang) == n + 25
+    assert len(pos.jurnal.undo) == 3
+    assert pos.undo().endswith("(21-25)")
+    assert len(pos.barang) == n + 20
+
+
+def test_analitik_ambil_pasang(buat_barang, t0):
+    a = AnalitikStok()
+    a.catat(buat_barang(1, 10), 5, t0)
+    laju = a.ambil(1)
+    a.hapus(1)
+    assert a.laju(1, t0) == 0.0
+    a.pasang(1, laju)
+    assert a.laju(1, t0) == laju[0]
+
+
+def test_rollback_membuang_alias_baru(buka_pos, isi_katalog):
+    pos = buka_pos()
+    n_alias = len(pos.alias.entri)
+    kat = pos._kategori_by_id(3)
+    awal = isi_katalog(pos)
+    with pytest.raises(RuntimeError):
+        with pos.transaksi("gagal"):
+            pos._buat_barang_batch(kat, [(f"Item {i}", 1, 100) for i in range(20)])
+            raise RuntimeError("file rusak")
+    assert isi_katalog(pos) == awal
+    assert len(pos.alias.entri) == n_alias
+    assert pos.alias.resolve("SN002") is None
+
+
+def test_rollback_alias_tidak_masuk_storage(buka_pos, isi_katalog):
+    pos = buka_pos()
+    awal = isi_katalog(pos)
+    n_alias = len(pos.alias.entri)
+    with pytest.raises(RuntimeError):
+        with pos.transaksi("gagal"):
+            pos._hapus_rec('barang', list(pos._idx_kategori.pop(1)))
+            pos._buat_barang_batch(pos._kategori_by_id(2), [("Jus", 3, 9000)])
+            raise RuntimeError
+    assert isi_katalog(pos) == awal
+    pos.tutup()
+    pos2 = buka_pos()
+    assert isi_katalog(pos2) == awal
+    assert len(pos2.alias.entri) == n_alias
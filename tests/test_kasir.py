@@ -0,0 +1,39 @@
+import threading
+
+import pytest
+
+from program_utama import POSError, TransactionEngine
+
+
+def test_lajur_paralel_tidak_oversell(buka_pos):
+    pos = buka_pos()
+    b = pos._barang_by_kode("MI001")  # stok 50
+    engine = TransactionEngine(pos)
+    laku = []
+
+    def lajur():
+        for _ in range(30):
+            try:
+                engine.checkout([("MI001", 1)])
+                laku.append(1)
+            except POSError:
+                pass
+
+    threads = [threading.Thread(target=lajur) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(laku) == 50 and b['stok'] == 0
+    assert pos.penjualan.total_jumlah() == 50
+    assert pos._qty_ditahan() == 0
+
+
+def test_checkout_gagal_tidak_menahan_stok(buka_pos):
+    pos = buka_pos()
+    b = pos._barang_by_kode("MA001")  # stok 20
+    engine = TransactionEngine(pos)
+    with pytest.raises(POSError):
+        engine.checkout([("MA002", 1), ("MA001", 21)])
+    assert b['stok'] == 20 and pos._qty_ditahan() == 0
+    assert len(pos.penjualan) == 0
@@ -0,0 +1,65 @@
+def _index_sama_dengan_bangun_ulang(pos, isi_katalog):
+    isi = isi_katalog(pos)
+    pos._rebuild_index()
+    assert isi_katalog(pos) == isi
+
+
+def test_edit_kategori_mengganti_kode_di_index(buka_pos, jawab, isi_katalog):
+    pos = buka_pos()
+    jawab("1", "", "mk")
+    pos.edit_kategori()
+    assert [b['kode'] for b in pos._barang_in_kategori(1)] == ['MK001', 'MK002', 'MK003']
+    assert pos._barang_by_kode("mk002")['nama'] == "Mie Goreng"
+    assert pos._barang_by_kode("MA002") is pos._barang_by_kode("MK002")  # kode lama lewat alias
+    _index_sama_dengan_bangun_ulang(pos, isi_katalog)
+
+
+def test_hapus_kategori_membuang_barangnya_dari_index(buka_pos, jawab, isi_katalog):
+    pos = buka_pos()
+    jawab("2", "y")
+    pos.hapus_kategori()
+    assert pos._barang_by_kode("MI001") is None and pos._barang_by_id(4) is None
+    assert pos._barang_in_kategori(2) == [] and len(pos.barang) == 4
+    _index_sama_dengan_bangun_ulang(pos, isi_katalog)
+
+
+def test_tambah_lalu_hapus_barang(buka_pos, jawab, isi_katalog):
+    pos = buka_pos()
+    jawab("Bakso", "5", "15000", "MA002", "y")
+    pos.tambah_barang(1)
+    assert pos._barang_by_kode("MA004")['nama'] == "Bakso"
+    pos.hapus_barang(1)
+    assert [(b['kode'], b['nama']) for b in pos._barang_in_kategori(1)] == [
+        ("MA001", "Nasi Goreng"), ("MA002", "Soto"), ("MA003", "Bakso")]  # kode dirapikan setelah hapus
+    _index_sama_dengan_bangun_ulang(pos, isi_katalog)
+
+
+def test_id_tidak_dipakai_ulang_setelah_hapus(buka_pos, jawab):
+    pos = buka_pos()
+    jawab("1", "y")  # kategori 1 beserta barang id 1-3
+    pos.hapus_kategori()
+    jawab("Bakery", "BK")
+    pos.tambah_kategori()
+    assert pos.kategori[-1]['id'] == 4
+    jawab("Roti", "5", "8000")
+    pos.tambah_barang(4)
+    b = pos._barang_by_kode("BK001")
+    assert b['id'] == 6 and b['local_id'] == 1
+
+
+def test_counter_local_ikut_reindex(buka_pos, jawab):
+    pos = buka_pos()
+    jawab("MA001", "y")
+    pos.hapus_barang(1)
+    assert pos._seq_local[1] == 2
+    jawab("Bakso", "5", "15000")
+    pos.tambah_barang(1)
+    assert pos._barang_by_kode("MA003")['nama'] == "Bakso"
+
+
+def test_satu_nota_satu_blok_id(buka_pos, jual):
+    pos = buka_pos()
+    jual(pos, ("MA002", 2), ("MI001", 1))
+    jual(pos, ("SN001", 1))
+    assert [r['id'] for r in pos.penjualan] == [1, 2, 3]
+    assert pos._seq['penjualan'] == 3 and pos._barang_by_kode("MA002")['stok'] == 98
@@ -0,0 +1,80 @@
+import csv
+import gzip
+import json
+
+import katalog_io
+from katalog_io import baca_rows, ekspor_barang, ekspor_penjualan, ekspor_ringkasan, impor_barang
+from program_utama import TransactionEngine
+
+
+def test_impor_melaporkan_baris_gagal(buka_pos, tmp_path, monkeypatch):
+    monkeypatch.setattr(katalog_io, "CHUNK", 2)
+    pos = buka_pos()
+    path = tmp_path / "supplier.csv"
+    path.write_text("kode,nama,stok,harga\n"
+                    "MA,Bakso,5,15000\n"
+                    "ZZ9,Entah,1,1\n"       # kategori tidak ada
+                    "SN,,1,1\n"             # nama kosong
+                    "MI123,Jus Jeruk,3,9000\n"
+                    "SN,Kacang,x,100\n"     # stok bukan angka
+                    "SN,Keripik,-1,100\n"   # negatif
+                    "SN,Wafer,7,3000\n")
+    error = []
+    assert impor_barang(pos, str(path), lambda no, pesan: error.append((no, pesan))) == {'ok': 3, 'gagal': 4}
+    assert [no for no, _ in error] == [3, 4, 6, 7]
+    assert "ZZ" in error[0][1]
+    assert [pos._barang_by_kode(k)['nama'] for k in ("MA004", "MI002", "SN002")] == ["Bakso", "Jus Jeruk", "Wafer"]
+    pos.tutup()
+    assert buka_pos()._barang_by_kode("SN002")['stok'] == 7  # tersimpan lewat storage
+
+
+def test_jsonl_rusak_dan_ekspor(buka_pos, tmp_path):
+    pos = buka_pos(None)
+    path = tmp_path / "barang.jsonl"
+    path.write_text('{"kode": "MA", "nama": "Sate", "stok": 2, "harga": 25000}\n{rusak\n\n')
+    error = []
+    assert impor_barang(pos, str(path), lambda no, pesan: error.append(no)) == {'ok': 1, 'gagal': 1}
+    assert error == [2]
+    p_barang = tmp_path / "ekspor.csv"
+    assert ekspor_barang(pos, str(p_barang)) == len(pos.barang)
+    with open(p_barang, encoding="utf-8", newline="") as f:
+        assert [r['kode'] for r in csv.DictReader(f)][:4] == ["MA001", "MA002", "MA003", "MA004"]
+    pos.penjualan.tambah(1, "MA004", "Sate", 1, 25000, 25000, 1_700_000_000)
+    p_jual = tmp_path / "jual.jsonl"
+    assert ekspor_penjualan(pos, str(p_jual)) == 1
+    assert [json.loads(line)['kode_barang'] for line in p_jual.read_text().splitlines()] == ["MA004"]
+    assert [r['nama_barang'] for _, r in baca_rows(str(p_jual))] == ["Sate"]
+
+
+def _pos_dengan_penjualan(buka_pos):
+    pos = buka_pos()
+    engine = TransactionEngine(pos)
+    engine.checkout([("MA002", 2), ("MI001", 1)])
+    engine.checkout([("SN001", 3)])
+    return pos
+
+
+def test_ekspor_penjualan_csv_dan_jsonl_gz(buka_pos, tmp_path):
+    pos = _pos_dengan_penjualan(buka_pos)
+    p_csv, p_gz = str(tmp_path / "jual.csv"), str(tmp_path / "jual.jsonl.gz")
+    assert ekspor_penjualan(pos, p_csv) == 3
+    with open(p_csv, encoding="utf-8", newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert [r['kode_barang'] for r in rows] == ['MA002', 'MI001', 'SN001']
+    assert ekspor_penjualan(pos, p_gz) == 3
+    with gzip.open(p_gz, "rt", encoding="utf-8") as f:
+        assert sum(json.loads(line)['total_harga'] for line in f) == 40000 + 5000 + 30000
+    assert [r['kode_barang'] for _, r in baca_rows(p_gz)] == ['MA002', 'MI001', 'SN001']
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_ekspor_teks_dan_ringkasan(buka_pos, tmp_path):
+    pos = _pos_dengan_penjualan(buka_pos)
+    p_txt = tmp_path / "rekap.txt"
+    ekspor_penjualan(pos, str(p_txt), judul="REKAP UJI")
+    teks = p_txt.read_text(encoding="utf-8")
+    assert teks.startswith("REKAP UJI\n") and "TOTAL: Rp 75,000" in teks
+    p_ring = tmp_path / "ringkasan.csv"
+    assert ekspor_ringkasan(pos, str(p_ring), 'kode') == 3
+    with open(p_ring, encoding="utf-8", newline="") as f:
+        assert {r['key']: int(r['omzet']) for r in csv.DictReader(f)}['MA002'] == 40000
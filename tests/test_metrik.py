@@ -0,0 +1,28 @@
+import pytest
+
+from metrik import Metrik, persentil
+from program_utama import POSError, TransactionEngine
+
+
+def test_persentil():
+    assert persentil([], 0.5) == 0.0
+    assert persentil([3, 1, 2], 0.5) == 2
+
+
+def test_pasang_ukur_lalu_lepas(buka_pos):
+    pos = buka_pos()
+    m = Metrik()
+    m.pasang(pos)
+    m.pasang(pos)  # dua kali tidak membungkus dua kali
+    engine = TransactionEngine(pos)
+    engine.checkout([("MA002", 1)])
+    with pytest.raises(POSError):
+        engine.checkout([("MA002", 10 ** 6)])
+    n, gagal, _, _, _ = m.rekaman['commit_nota'].ringkas()
+    assert n == 1 and gagal == 0
+    assert m.rekaman['keranjang_tambah'].ringkas()[:2] == (1, 0)  # basket gagal ditolak sebelum masuk keranjang
+    teks = m.teks_prometheus(pos)
+    assert 'kopbox_operasi_detik_count{operasi="commit_nota"} 1' in teks
+    assert 'kopbox_data{koleksi="penjualan"} 1' in teks
+    m.lepas(pos)
+    assert '_commit_keranjang' not in vars(pos) and not m.aktif(pos)
@@ -0,0 +1,22 @@
+import pytest
+
+from model import Barang, CartLine, Penjualan, dari_epoch
+
+
+def test_akses_atribut_dan_gaya_dict(t0):
+    b = Barang(1, 1, 1, "MA001", "Nasi Goreng", 20, 20000, t0)
+    assert b.kode == b['kode'] == "MA001" and b.get('tidak_ada', 0) == 0
+    assert b['created_at'] == dari_epoch(t0)  # waktu disimpan epoch, tampil sebagai string
+    b['created_at'] = dari_epoch(t0 + 60)
+    assert b.created_at == t0 + 60
+    with pytest.raises(KeyError):
+        b['tidak_ada']
+    assert not hasattr(b, '__dict__')
+
+
+def test_dari_dict_dan_ke_dict(t0):
+    p = Penjualan(1, "MA001", "Nasi", 2, 100, 200, t0, 10)
+    d = p.ke_dict()
+    assert d['created_at'] == dari_epoch(t0) and Penjualan.dari_dict(d) == p and p == d
+    line = CartLine(barang_id=1, kode_barang="MA001", nama="Nasi", jumlah=2, harga_satuan=100, total=200)
+    assert dict(line.ke_dict(), jumlah=3) != line.ke_dict() and line['total'] == 200
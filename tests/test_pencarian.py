@@ -0,0 +1,57 @@
+import pickle
+
+from pencarian import BATAS_PENDING, IndexPencarian
+from program_utama import TransactionEngine
+
+
+def _barang(i, nama, kode=None):
+    return {'id': i, 'kode': kode or f"MA{i:03d}", 'nama': nama}
+
+
+def _index(nama):
+    idx = IndexPencarian()
+    for i, n in enumerate(nama, start=1):
+        idx.tambah(_barang(i, n))
+    return idx
+
+
+def test_prefix_kode_dan_nama_typo():
+    idx = _index(["Nasi Goreng", "Mie Goreng", "Es Teh Manis", "Soto Ayam"])
+    assert idx.cari_kode("ma00") == [1, 2, 3, 4]
+    assert idx.cari("goreng")[:2] == [1, 2]
+    assert idx.cari("sotto ayam")[0] == 4  # salah ketik tetap ketemu
+    assert idx.cari("zzz") == []
+
+
+def test_ganti_kode_nama_dan_hapus():
+    idx = _index(["Nasi Goreng", "Mie Goreng"])
+    idx.ganti_kode(1, "MA001", "MK001")
+    idx.ganti_nama(2, "Kwetiau")
+    assert idx.cari_kode("MK") == [1] and idx.cari_kode("MA") == [2]
+    assert idx.cari("kwetiau") == [2] and 2 not in [b for _, b in idx.cari_nama("mie")]
+    idx.hapus(_barang(1, "Nasi Goreng", "MK001"))
+    assert idx.cari_kode("M") == [2] and idx.cari("nasi") == []
+
+
+def test_merge_banyak_perubahan_kode_dan_pickle():
+    idx = _index([f"Barang {i}" for i in range(BATAS_PENDING * 2)])
+    idx = pickle.loads(pickle.dumps(idx))
+    for i in range(1, BATAS_PENDING + 10):
+        idx.ganti_kode(i, f"MA{i:03d}", f"ZZ{i:03d}")
+    assert len(idx.cari_kode("ZZ", limit=1000)) == BATAS_PENDING + 9
+    assert idx.cari_kode("MA", limit=1000)[0] == BATAS_PENDING + 10
+    assert idx.cari("barang 5")[0] == 6  # trigram nama dibangun ulang setelah unpickle
+
+
+def test_index_pos_ikut_edit(buka_pos, jawab):
+    pos = buka_pos(None)
+    engine = TransactionEngine(pos)
+    jawab("1", "", "MK", "MK002", "Mie Kuah", "", "")
+    pos.edit_kategori()
+    pos.edit_barang(1)
+    assert [b['kode'] for b in engine.cari("mk00")] == ["MK001", "MK002", "MK003"]
+    assert engine.cari("mie kuah")[0]['kode'] == "MK002"
+    assert not any(b['kode'] == "MK002" for b in engine.cari("mie goreng"))
+    jawab("MK001", "y")
+    pos.hapus_barang(1)
+    assert [b['nama'] for b in engine.cari("mk00")] == ["Mie Kuah", "Soto"]
@@ -0,0 +1,132 @@
+import pytest
+
+from penyimpanan import apply_op, baca_penjualan_baru, buat_storage, state_kosong
+from program_utama import TransactionEngine
+
+
+def _isi(storage):
+    storage.append('put', 'kategori', {'id': 1, 'nama': 'Makanan', 'kode': 'MA'})
+    for i in (1, 2, 3):
+        storage.append('put', 'barang', {'id': i, 'kategori_id': 1, 'local_id': i, 'kode': f"MA00{i}", 'stok': 10})
+    storage.append('stok', 2, -4)
+    storage.append('del', 'barang', [1])
+    storage.append('kode', 2, 1, 'MA001')
+    storage.append('kode', 3, 2, 'MA002')
+    storage.commit()
+
+
+@pytest.mark.parametrize('backend', ['wal', 'sqlite'])
+def test_replay_setelah_buka_ulang(tmp_path, backend):
+    s = buat_storage(backend, str(tmp_path))
+    assert s.load() is None
+    _isi(s)
+    s.close()
+    s = buat_storage(backend, str(tmp_path))
+    state = s.load()
+    assert [(b['id'], b['kode'], b['stok']) for b in state['barang']] == [(2, 'MA001', 6), (3, 'MA002', 10)]
+    assert state['seq']['barang'] == 3
+    s.close()
+
+
+def test_wal_baris_terpotong_dibuang(tmp_path):
+    s = buat_storage('wal', str(tmp_path))
+    s.load()
+    _isi(s)
+    s.close()
+    path = tmp_path / "wal.log"
+    data = path.read_bytes()
+    terakhir = data.rstrip(b"\n").rsplit(b"\n", 1)[1]
+    path.write_bytes(data[:len(data) - len(terakhir) // 2 - 1])
+    s = buat_storage('wal', str(tmp_path))
+    state = s.load()
+    assert [b['kode'] for b in state['barang']] == ['MA001', 'MA003']  # kode MA003 -> MA002 hilang bersama ekornya
+    s.append('stok', 3, 1)  # log bisa ditulis lagi setelah ekor yang rusak dipotong
+    s.close()
+    assert [b['stok'] for b in buat_storage('wal', str(tmp_path)).load()['barang']] == [6, 11]
+
+
+def test_wal_snapshot_lalu_ekor_log(tmp_path):
+    s = buat_storage('wal', str(tmp_path))
+    s.load()
+    _isi(s)
+    s.snapshot({'seq': {'barang': 9}, 'kategori': [], 'barang': [{'id': 9, 'kode': 'X', 'stok': 1}], 'penjualan': []})
+    s.append('stok', 9, 2)
+    s.close()
+    state = buat_storage('wal', str(tmp_path)).load()
+    assert state['barang'] == [{'id': 9, 'kode': 'X', 'stok': 3}]
+
+
+def _jual(storage, id):
+    storage.append('put', 'penjualan', {'id': id, 'kode_barang': 'MA001', 'total_harga': 100})
+    storage.commit()
+
+
+def test_wal_snapshot_latar(tmp_path):
+    s = buat_storage('wal', str(tmp_path))
+    s.load()
+    _isi(s)
+    _jual(s, 1)
+    lsn = s.potong_log()
+    assert s.potong_log() is None  # segmen sebelumnya belum dibuatkan snapshot
+    _jual(s, 2)
+    # crash sebelum snapshot latar selesai: wal.old + wal.log sama-sama di-replay
+    assert [r['id'] for r in buat_storage('wal', str(tmp_path)).load()['penjualan']] == [1, 2]
+    state = buat_storage('wal', str(tmp_path)).load()
+    state['penjualan'] = state['penjualan'][:1]  # state saat potong_log
+    s.snapshot_potongan(state, lsn)
+    assert not (tmp_path / "wal.old").exists() and not s.perlu_snapshot()
+    _jual(s, 3)
+    s.close()
+    assert [r['id'] for r in buat_storage('wal', str(tmp_path)).load()['penjualan']] == [1, 2, 3]
+
+
+def test_agregator_membaca_melewati_potongan_log(tmp_path):
+    s = buat_storage('wal', str(tmp_path))
+    s.load()
+    _jual(s, 1)
+    rows, wm = baca_penjualan_baru('wal', str(tmp_path))
+    assert [r['id'] for r in rows] == [1]
+    _jual(s, 2)        # masuk segmen lama setelah sinkron terakhir
+    lsn = s.potong_log()
+    _jual(s, 3)
+    rows, wm = baca_penjualan_baru('wal', str(tmp_path), wm)
+    assert [r['id'] for r in rows] == [2, 3]
+    s.snapshot_potongan({'seq': {}, 'penjualan': [{'id': 1}, {'id': 2}]}, lsn)
+    _jual(s, 4)
+    rows, wm = baca_penjualan_baru('wal', str(tmp_path), wm)
+    assert [r['id'] for r in rows] == [4]
+    s.close()
+
+
+def test_op_tidak_dikenal():
+    with pytest.raises(ValueError):
+        apply_op(state_kosong(), ('rekode', {'MA002': 'MA001'}))
+    with pytest.raises(ValueError):
+        apply_op(state_kosong(), ('rekode_penjualan', {'MA002': 'MA001'}))
+
+
+@pytest.mark.parametrize('backend', ['wal', 'sqlite'])
+def test_pos_buka_ulang_sama(buka_pos, jawab, jual, isi_katalog, backend):
+    pos = buka_pos(backend)
+    jawab("1", "", "MK")
+    pos.edit_kategori()
+    jual(pos, ("MK002", 2), ("SN001", 1))
+    katalog, penjualan = isi_katalog(pos), list(pos.penjualan)
+    pos.tutup()
+    pos = buka_pos(backend)
+    assert isi_katalog(pos) == katalog and list(pos.penjualan) == penjualan
+    assert pos._barang_by_kode("MK002")['stok'] == 98
+
+
+def test_pos_snapshot_latar(buka_pos, monkeypatch):
+    pos = buka_pos()
+    monkeypatch.setattr(pos.storage, "snapshot_every", 1)
+    stok = pos._barang_by_kode("MA002").stok
+    TransactionEngine(pos).checkout([("MA002", 2)])
+    pos._simpan_snapshot()
+    pos._thread_snapshot.join()
+    assert not pos.storage.perlu_snapshot()
+    TransactionEngine(pos).checkout([("MA002", 1)])
+    pos.storage.close()  # crash tanpa snapshot akhir: snapshot latar + ekor log
+    pos = buka_pos()
+    assert [r.jumlah for r in pos.penjualan] == [2, 1] and pos._barang_by_kode("MA002").stok == stok - 3
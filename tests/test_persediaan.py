@@ -0,0 +1,51 @@
+import math
+import pickle
+
+from persediaan import HARI, AnalitikStok
+from program_utama import TransactionEngine
+
+
+def test_peringatan_sekali_sampai_keluar_ambang(buat_barang, t0):
+    a = AnalitikStok(tau_hari=7, ambang_hari=7)
+    peringatan = []
+    a.pendengar.append(lambda b, hari: peringatan.append(b.id))
+    b = buat_barang(1, 100)
+    for i in range(30):
+        b.stok -= 3
+        a.catat(b, 3, t0 + i * HARI)
+    assert peringatan == [1] and a.n_waspada() == 1
+    b.stok = 1000  # restock
+    a.perbarui(b, t0 + 30 * HARI)
+    assert a.n_waspada() == 0
+    b.stok = 5
+    a.catat(b, 1, t0 + 31 * HARI)
+    assert peringatan == [1, 1]
+
+
+def test_kritis_urut_hari_tersisa_dan_pickle(buat_barang, t0):
+    a = AnalitikStok()
+    barang = {i: buat_barang(i, stok) for i, stok in ((1, 100), (2, 10), (3, 50), (4, 7))}
+    for b in barang.values():
+        a.catat(b, 7, t0)
+    a.catat(barang[4], 0, t0)
+    a = pickle.loads(pickle.dumps(a))
+    hasil = a.kritis(2, t0, barang.get)
+    assert [b.id for b, _, _ in hasil] == [4, 2]
+    assert hasil[0][1] == barang[4].stok / a.laju(4, t0)
+    assert a.hari_tersisa(buat_barang(9, 5), t0) == math.inf
+
+
+def test_hapus(buat_barang, t0):
+    a = AnalitikStok()
+    b = buat_barang(1, 10)
+    a.catat(b, 5, t0)
+    a.hapus(1)
+    assert a.laju(1, t0) == 0.0 and a.kritis(5, t0, {1: b}.get) == [] and a.n_waspada() == 0
+
+
+def test_checkout_memicu_peringatan_pos(buka_pos):
+    pos = buka_pos()
+    b = pos._barang_by_kode("MA002")
+    TransactionEngine(pos).checkout([("MA002", b.stok - 1)])  # sisa 1, laju (stok-1)/7 per hari
+    assert pos.analitik.n_waspada() == 1
+    assert [p[2] for p in pos.peringatan] == [b.id]
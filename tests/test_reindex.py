@@ -0,0 +1,36 @@
+def test_reindex_sebagian_dan_change_set(buka_pos, jawab, jual, isi_katalog):
+    pos = buka_pos()
+    jawab("Bakso", "5", "15000", "Sate", "5", "25000")
+    pos.tambah_barang(1)
+    pos.tambah_barang(1)
+    jual(pos, ("MA003", 1), ("MA005", 2))
+    assert pos.reindex_barang_per_kategori(1, mulai=2) == {}
+    jawab("MA002", "y")
+    pos.hapus_barang(1)  # hanya MA003.. yang bergeser
+    assert [b['kode'] for b in pos._barang_in_kategori(1)] == ['MA001', 'MA002', 'MA003', 'MA004']
+    assert pos._seq_local[1] == 4
+    # riwayat tampil dengan kode baru, kode lama tetap bisa dipakai lewat alias
+    assert [r['kode_barang'] for r in pos.penjualan] == ['MA002', 'MA004']
+    assert pos._barang_by_kode("MA005").nama == "Sate"
+    assert pos.rollup.get('kode', pos._barang_by_kode("MA004").id) == (50000, 2, 1)
+    katalog, penjualan = isi_katalog(pos), list(pos.penjualan)
+    pos.tutup()
+    pos = buka_pos()
+    assert isi_katalog(pos) == katalog and list(pos.penjualan) == penjualan
+
+
+def test_reindex_penuh_tanpa_perubahan(buka_pos, isi_katalog):
+    pos = buka_pos(None)
+    awal = isi_katalog(pos)
+    assert pos.reindex_barang_per_kategori() == {}
+    assert isi_katalog(pos) == awal
+
+
+def test_edit_kategori_mengganti_kode_riwayat(buka_pos, jawab, jual):
+    pos = buka_pos('sqlite')
+    jual(pos, ("MA002", 1), ("MI001", 1))
+    jawab("1", "", "MK")
+    pos.edit_kategori()
+    assert [r['kode_barang'] for r in pos.penjualan] == ['MK002', 'MI001']
+    pos.tutup()
+    assert [r['kode_barang'] for r in buka_pos('sqlite').penjualan] == ['MK002', 'MI001']
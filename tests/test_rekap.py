@@ -0,0 +1,36 @@
+import re
+from datetime import date
+
+from ledger import RollupPenjualan
+from model import epoch_tanggal
+
+
+def _total_tercetak(out):
+    return [int(x.replace(",", "")) for x in re.findall(r"TOTAL: Rp ([\d,]+)", out)]
+
+
+def test_rekap_harian_dan_rentang_tanggal(buka_pos, jawab, capsys):
+    pos = buka_pos(None)
+    t = epoch_tanggal(date(2024, 3, 10))
+    pos.penjualan.tambah(1, 'MA001', 'Nasi Goreng', 1, 20000, 20000, t + 3600)
+    pos.penjualan.tambah(2, 'MI001', 'Es Teh', 2, 5000, 10000, t + 86400 + 60)  # 11 Maret
+    pos.penjualan.tambah(3, 'MA002', 'Mie Goreng', 1, 20000, 20000, t - 60)     # 9 Maret, masuk terlambat
+    jawab("1", "y", "2024-03-10", "2", "y", "2024-03-09", "2024-03-10", "4", "0")
+    pos.rekap_penjualan()
+    # hari ini & minggu ini kosong (tanpa baris TOTAL); 10 Maret, 9-10 Maret, semua
+    assert _total_tercetak(capsys.readouterr().out) == [20000, 40000, 50000]
+
+
+def test_rollup_ikut_nota_dan_hapus_barang(buka_pos, jawab, jual):
+    pos = buka_pos(None)
+    jual(pos, ("MA002", 2), ("MI001", 3))
+    jual(pos, ("MA002", 1))
+    assert pos.rollup.get('kode', 2) == (60000, 3, 2)
+    assert pos.rollup.get('kategori', 2) == (15000, 3, 1)
+    assert pos.rollup.ringkas('bulan')[0][1:] == (75000, 6, 3)
+    jawab("MA002", "y")
+    pos.hapus_barang(1)  # riwayat barang tetap, omzetnya tidak hilang
+    assert pos.rollup.get('kode', 2) == (60000, 3, 2)
+    assert pos.rollup.ringkas('hari')[0][1:] == (75000, 6, 3)
+    ulang = RollupPenjualan.dari_ledger(pos.penjualan, {2: 1, 4: 2}.get)
+    assert ulang.data == pos.rollup.data
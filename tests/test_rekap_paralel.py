@@ -0,0 +1,54 @@
+from arsip import ArsipPenjualan, periode_ts
+from ledger import RollupPenjualan
+from rekap_paralel import MesinRekap, ledger_sintetis
+
+
+def test_paralel_sama_dengan_serial_dan_rollup():
+    led = ledger_sintetis(5000, n_barang=50, hari=60)
+    mesin = MesinRekap(led, kategori_kode=lambda kode: kode[:3], workers=2)
+    serial = mesin.agregasi(paralel=False)
+    paralel = mesin.agregasi(paralel=True)
+    rollup = RollupPenjualan.dari_ledger(led, lambda kode: kode[:3])
+    for dim in ('kode', 'kategori', 'hari', 'minggu', 'bulan'):
+        assert paralel.ringkas(dim) == serial.ringkas(dim)
+    assert serial.ringkas('hari') == rollup.ringkas('hari')
+    assert serial.total() == led.total_harga()
+    top = serial.top(3, by='qty')
+    assert [q for _, _, q, _ in top] == sorted((q for _, _, q, _ in serial.ringkas('kode')), reverse=True)[:3]
+
+
+def test_rentang_waktu_dan_stream():
+    led = ledger_sintetis(3000, n_barang=20, hari=90)
+    t_awal, t_akhir = led.ts[1000], led.ts[2000]
+    mesin = MesinRekap(led, workers=2)
+    hasil = mesin.agregasi(t_awal, t_akhir, paralel=True)
+    assert hasil.total() == led.total_waktu(t_awal, t_akhir)
+    assert sum(len(b) for b in mesin.stream_rows(chunk=700)) == 3000
+    assert [r.id for b in mesin.stream_rows(t_awal, t_akhir, chunk=300) for r in b] == \
+        [r.id for r in led.rows_waktu(t_awal, t_akhir)]
+
+
+def test_arsip_ikut_dihitung(tmp_path):
+    led = ledger_sintetis(3000, n_barang=20, hari=90)
+    t_batas = led.ts[1000]
+    arsip = ArsipPenjualan(str(tmp_path))
+    per_periode = {}
+    for r in led.ambil_sebelum(t_batas):
+        per_periode.setdefault(periode_ts(r[6]), []).append(r)
+    for periode, rows in per_periode.items():
+        arsip.tambah(periode, rows)
+    total = led.total_harga() + arsip.total_waktu()
+    mesin = MesinRekap(led, workers=2, arsip=arsip)
+    assert mesin.agregasi(paralel=False).total() == mesin.agregasi(paralel=True).total() == total
+    assert sum(len(b) for b in mesin.stream_rows(chunk=700)) == 3000
+    arsip.tutup()
+
+
+def test_menu_rekap_paralel_per_kategori(buka_pos, jawab, jual, capsys):
+    pos = buka_pos()
+    jual(pos, ("MA002", 2), ("MI001", 1))
+    capsys.readouterr()
+    jawab("", "2", "")
+    pos.menu_rekap_paralel()
+    out = capsys.readouterr().out
+    assert "40,000" in out and "5,000" in out
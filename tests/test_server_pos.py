@@ -0,0 +1,130 @@
+import asyncio
+import json
+
+from server_pos import LayananPOS
+
+
+async def _kirim(port, mentah):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(mentah)
+    await writer.drain()
+    data = await reader.read()
+    writer.close()
+    kepala, _, body = data.partition(b"\r\n\r\n")
+    return int(kepala.split()[1]), json.loads(body)
+
+
+def _request(method, path, body=None, **headers):
+    raw = json.dumps(body).encode() if body is not None else b""
+    headers.setdefault('Content_Length', str(len(raw)))
+    baris = "".join(f"{k.replace('_', '-')}: {v}\r\n" for k, v in headers.items())
+    return f"{method} {path} HTTP/1.1\r\nConnection: close\r\n{baris}\r\n".encode() + raw
+
+
+def _jalankan(pos, *requests):
+    layanan = LayananPOS(pos)
+
+    async def uji():
+        siap = asyncio.get_running_loop().create_future()
+        task = asyncio.create_task(layanan.layani("127.0.0.1", 0, siap.set_result))
+        server = await siap
+        port = server.sockets[0].getsockname()[1]
+        try:
+            hasil = []
+            for r in requests:
+                # request boleh berupa fungsi dari hasil sebelumnya (mis. path dengan cart_id yang baru dibuka)
+                hasil.append(await _kirim(port, r(hasil) if callable(r) else r))
+            return hasil
+        finally:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+    return asyncio.run(uji())
+
+
+def test_checkout_dan_baca(buka_pos):
+    pos = buka_pos()
+    stok = pos._barang_by_kode("MA002").stok
+    (s1, kat), (s2, nota), (s3, barang) = _jalankan(
+        pos, _request("GET", "/kategori"),
+        _request("POST", "/checkout", {"items": [{"kode": "MA002", "jumlah": 2}]}),
+        _request("GET", "/barang/MA002"))
+    assert s1 == 200 and len(kat) == 3
+    assert s2 == 201 and nota["total"] == 40000
+    assert s3 == 200 and barang['stok'] == stok - 2
+
+
+def test_penulis_tetap_jalan_kalau_snapshot_gagal(buka_pos, monkeypatch, capsys):
+    pos = buka_pos()
+
+    def gagal(paksa=False):
+        raise OSError("disk penuh")
+    monkeypatch.setattr(pos, "_simpan_snapshot", gagal)
+    checkout = _request("POST", "/checkout", {"items": [{"kode": "MA002", "jumlah": 1}]})
+    hasil = _jalankan(pos, checkout, checkout)
+    assert [s for s, _ in hasil] == [201, 201]
+    assert "disk penuh" in capsys.readouterr().err
+    assert len(pos.penjualan) == 2
+
+
+def test_keranjang_dan_error(buka_pos):
+    pos = buka_pos()
+
+    def keranjang(method, sub="", body=None):
+        return lambda hasil: _request(method, f"/keranjang/{hasil[0][1]['cart_id']}{sub}", body)
+
+    hasil = _jalankan(
+        pos, _request("POST", "/keranjang"),
+        keranjang("POST", "/item", {"kode": "MA002", "jumlah": 2}),
+        keranjang("POST", "/item", {"kode": "MI001", "jumlah": 1}),
+        keranjang("POST", "/item", {"kode": "MI001", "jumlah": 999}),
+        keranjang("DELETE", "/item/2"),
+        keranjang("GET"),
+        keranjang("POST", "/checkout"),
+        _request("GET", "/ringkasan/kode"),
+        _request("GET", "/tidak-ada"),
+        _request("PUT", "/kategori"))
+    assert [s for s, _ in hasil] == [201, 201, 201, 409, 200, 200, 201, 200, 404, 405]
+    assert hasil[5][1]['total'] == 40000 and hasil[6][1]['total'] == 40000
+    assert hasil[7][1] == [{'key': 'MA002', 'barang_id': 2, 'omzet': 40000, 'qty': 2, 'trx': 1}]
+    assert pos._barang_by_kode("MI001").stok == 50 and pos._qty_ditahan() == 0
+
+
+def test_content_length_tidak_valid(buka_pos):
+    pos = buka_pos()
+    hasil = _jalankan(pos, _request("POST", "/checkout", Content_Length="abc"),
+                      _request("POST", "/checkout", Content_Length="-5"),
+                      _request("POST", "/checkout", Content_Length=str(1 << 30)))
+    assert [s for s, _ in hasil] == [400, 400, 413]
+    assert all('error' in data for _, data in hasil)
+
+
+def test_header_terlalu_besar(buka_pos):
+    pos = buka_pos()
+    banyak = {f"X_{i}": "1" for i in range(150)}
+    hasil = _jalankan(pos, _request("GET", "/kategori", X_Panjang="a" * 20000),
+                      _request("GET", "/kategori", **banyak),
+                      _request("GET", "/" + "a" * 20000),
+                      _request("GET", "/kategori"))
+    assert [s for s, _ in hasil] == [431, 431, 414, 200]
+
+
+def test_keranjang_tidak_ada_404(buka_pos):
+    pos = buka_pos()
+
+    def kedaluwarsa(hasil):
+        pos.reservasi._jam = lambda: float("inf")  # lewat TTL: keranjang dibuang expirer
+        pos.reservasi.kedaluwarsa()
+        return _request("GET", f"/keranjang/{hasil[0][1]['cart_id']}")
+
+    hasil = _jalankan(pos, _request("POST", "/keranjang"),
+                      lambda h: _request("GET", f"/keranjang/{h[0][1]['cart_id'] + 1}"),
+                      _request("POST", "/keranjang/999/item", {"kode": "MA002", "jumlah": 1}),
+                      _request("DELETE", "/keranjang/999/item/1"),
+                      _request("POST", "/keranjang/999/checkout"),
+                      lambda h: _request("GET", f"/keranjang/{h[0][1]['cart_id']}"),
+                      kedaluwarsa)
+    assert [s for s, _ in hasil] == [201, 404, 404, 404, 404, 200, 404]
+    assert 'kedaluwarsa' in hasil[-1][1]['error']
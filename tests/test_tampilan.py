@@ -0,0 +1,49 @@
+from program_utama import TransactionEngine
+
+
+def _pos_banyak_snack(buka_pos):
+    pos = buka_pos(None)
+    pos._buat_barang_batch(pos.kategori[2], [(f"Snack {i}", 10, 1000) for i in range(20)])
+    return pos
+
+
+def test_halaman_dan_header_lanjutan(buka_pos):
+    pos = _pos_banyak_snack(buka_pos)  # 3 MA + 1 MI + 21 SN = 25 baris
+    lines, hal, n_hal = pos.tampil_barang_penjualan(0, per_halaman=5)
+    assert (hal, n_hal) == (0, 5)
+    assert sum(" SN001 " in x for x in lines) == 1 and not any("SN002" in x for x in lines)
+    lines, hal, _ = pos.tampil_barang_penjualan(1, per_halaman=5)
+    assert "(lanjutan)" in lines[0] and [x.split()[1] for x in lines[2:]] == [f"SN00{i}" for i in range(2, 7)]
+    lines, hal, _ = pos.tampil_barang_penjualan(99, per_halaman=5)
+    assert hal == 4 and lines[-1].split()[1] == "SN021"
+    lines, _, n_hal = pos.tampil_barang_penjualan(0, cari="goreng", per_halaman=5)
+    assert n_hal == 1 and [x.split()[1] for x in lines[2:]] == ["MA001", "MA002"]
+
+
+def test_cache_baris_diperbarui_saat_barang_berubah(buka_pos, jawab):
+    pos = buka_pos(None)
+    pos.tampil_barang_penjualan(0, per_halaman=50)
+    b = pos._barang_by_kode("MA002")
+    lama = pos._cache_baris[b['id']][1]
+    pos.tampil_barang_penjualan(0, per_halaman=50)
+    assert pos._cache_baris[b['id']][1] is lama  # tidak diformat ulang
+    TransactionEngine(pos).checkout([("MA002", 3)])
+    lines, _, _ = pos.tampil_barang_penjualan(0, per_halaman=50)
+    assert any("Mie Goreng" in x and " 97 " in x for x in lines)
+    jawab("1", "Makan Berat", "MK")
+    pos.edit_kategori()
+    lines, _, _ = pos.tampil_barang_penjualan(0, per_halaman=50)
+    assert "Makan Berat (Kode: MK)" in lines[0] and any(" MK002 " in x for x in lines)
+    jawab("MK002", "y")
+    pos.hapus_barang(1)
+    assert b['id'] not in pos._cache_baris
+
+
+def test_menu_jual_navigasi(buka_pos, jawab, capsys, monkeypatch):
+    pos = _pos_banyak_snack(buka_pos)
+    monkeypatch.setattr(pos, "_baris_per_halaman", lambda: 5)
+    jawab("N", "N", "P", "/es", "0")
+    pos.menu_jual()
+    out = capsys.readouterr().out
+    assert [x.split()[1] for x in out.splitlines() if x.startswith("Halaman")] == ["1/5", "2/5", "3/5", "2/5", "1/1"]
+    assert "Pencarian: 'ES'" in out
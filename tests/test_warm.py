@@ -0,0 +1,53 @@
+import os
+import pickle
+
+import pytest
+
+from program_utama import TransactionEngine
+
+
+def test_warm_start_sama_dengan_load_biasa(buka_pos, isi_katalog, tmp_path):
+    pos = buka_pos()
+    TransactionEngine(pos).checkout([("MA002", 2), ("SN001", 1)])
+    katalog = isi_katalog(pos)
+    rows = [r.ke_dict() for r in pos.penjualan]
+    pos.tutup()
+
+    warm = buka_pos()
+    assert warm._penjualan is None  # ledger belum dimuat
+    assert isi_katalog(warm) == katalog
+    assert warm.rollup.get('kode', warm._barang_by_kode("MA002").id) == (40000, 2, 1)
+    assert [r.ke_dict() for r in warm.penjualan] == rows
+    warm.tutup()
+
+    os.remove(tmp_path / "wal" / "warm.bin")
+    dingin = buka_pos()
+    assert dingin._penjualan is not None
+    assert isi_katalog(dingin) == katalog and [r.ke_dict() for r in dingin.penjualan] == rows
+
+
+def test_warm_bin_basi_tidak_dipakai(buka_pos, tmp_path):
+    pos = buka_pos()
+    pos.tutup()
+    # storage berubah setelah warm.bin ditulis (mis. proses lain): tanda tidak cocok, load biasa
+    with open(tmp_path / "wal" / "wal.log", "a", encoding="utf-8") as f:
+        f.write('{"lsn":999999,"op":["stok",1,-5]}\n')
+    pos2 = buka_pos()
+    assert pos2._penjualan is not None
+    assert pos2._barang_by_kode("MA001").stok == 15
+
+
+def test_warm_bin_diubah_tidak_di_unpickle(buka_pos, tmp_path, monkeypatch):
+    pos = buka_pos()
+    pos.tutup()
+    path = tmp_path / "wal" / "warm.bin"
+    data = bytearray(path.read_bytes())
+    data[-2] ^= 0xFF  # isi diubah tanpa kunci: HMAC tidak cocok
+    path.write_bytes(bytes(data))
+    monkeypatch.setattr(pickle, "loads", lambda *a: pytest.fail("pickle.loads dipanggil untuk warm.bin palsu"))
+    assert buka_pos()._penjualan is not None
+
+    pos = buka_pos()
+    pos.tutup()
+    monkeypatch.setenv("KOPBOX_WARM_KEY", "kunci-lain")  # ditandatangani kunci lain
+    assert buka_pos()._penjualan is not None